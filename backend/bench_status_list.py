@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /api/status on large pages, standard vs fast JSON path.
+
+Drives the ASGI app in-process and reports requests/sec for the default
+response_model path and for STATUS_FAST_JSON, once per Accept-Encoding
+(identity, gzip and, when installed, br) so compression cost is visible.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python bench_status_list.py --rows 10000
+    python bench_status_list.py --memory  # rows served from memory, no mongod
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+
+class MemoryCursor:
+    """Stands in for a Motor cursor over pre-decoded rows.
+
+    With --memory the benchmark measures validation and serialization alone,
+    without database time drowning out the difference.
+    """
+
+    def __init__(self, rows, limit=None):
+        self.rows = rows[:limit] if limit else rows
+
+    async def to_list(self, length):
+        return [dict(row) for row in self.rows[:length]]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for row in self.rows:
+            yield dict(row)
+
+
+def make_rows(rows: int) -> list:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "client_name": f"node-{i % 25}",
+            "timestamp": now - timedelta(seconds=i),
+        }
+        for i in range(rows)
+    ]
+
+
+async def seed(server, docs: list) -> None:
+    await server.db.status_checks.delete_many({})
+    for start in range(0, len(docs), 1000):
+        await server.db.status_checks.insert_many([dict(doc) for doc in docs[start:start + 1000]])
+
+
+async def measure(server, rows: int, requests: int, concurrency: int, encoding: str) -> dict:
+    import httpx
+
+    transport = httpx.ASGITransport(app=server.app)
+    # httpx asks for gzip by default; be explicit about what is measured
+    headers = {"Accept-Encoding": encoding}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        # Warm-up request, also checks the page is complete
+        response = await client.get("/api/status", params={"limit": rows})
+        response.raise_for_status()
+        assert len(response.json()) == rows, "page is truncated"
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                r = await client.get("/api/status", params={"limit": rows})
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(requests)])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests_per_sec": round(requests / elapsed, 2),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "bytes": len(response.content),
+        "wire_bytes": int(response.headers.get("content-length", len(response.content))),
+    }
+
+
+async def main(args) -> None:
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ["DB_NAME"] = args.db
+    os.environ["STATUS_MAX_PAGE_LIMIT"] = str(max(args.rows, 1000))
+    # Measure encoding, not the read cache
+    os.environ["READ_CACHE_TTL"] = "0"
+    sys.path.insert(0, str(Path(__file__).parent))
+    import server
+
+    docs = make_rows(args.rows)
+    if args.memory:
+        server.find_status_checks = lambda query, limit=None, projection=None: MemoryCursor(docs, limit)
+    else:
+        await server.connect_mongo()
+        await seed(server, docs)
+
+    encodings = args.encodings or ["identity", "gzip"] + (["br"] if server.brotli else [])
+    results = {}
+    for encoding in encodings:
+        results[encoding] = {}
+        for mode, fast in (("standard", False), ("fast", True)):
+            server.STATUS_FAST_JSON = fast
+            results[encoding][mode] = await measure(server, args.rows, args.requests, args.concurrency, encoding)
+        results[encoding]["speedup"] = round(
+            results[encoding]["fast"]["requests_per_sec"] / results[encoding]["standard"]["requests_per_sec"], 2,
+        )
+    results["rows"] = args.rows
+    results["orjson"] = server.orjson is not None
+    results["backend"] = "memory" if args.memory else "mongod"
+
+    if not args.memory:
+        await server.db.status_checks.delete_many({})
+        server.client.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GET /api/status serialization benchmark")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--db", default="omega_bench")
+    parser.add_argument("--memory", action="store_true", help="Serve rows from memory instead of a live mongod")
+    parser.add_argument("--encodings", nargs="+", help="Accept-Encoding values to measure (default: identity, gzip, br)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Load test for the status check API: write-heavy, read-heavy and mixed traffic.
+
+Each scenario runs a closed loop of --concurrency workers for --duration
+seconds and reports throughput, errors and p50/p95/p99 latency per operation
+as JSON. Scenarios run once per --encodings value (Accept-Encoding; identity
+and gzip by default) and are reported as "<scenario>/<encoding>", so response
+compression cost is measured separately. Save a run with --out and pass it to --compare on a later commit to
+see the change.
+
+The app is driven in-process through its ASGI interface by default. --url
+targets a server already listening on localhost instead. With --memory the
+database is mongomock, which filters and sorts in Python: those runs show the
+app's own overhead, and read latencies grow with --seed far faster than on a
+real mongod.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python loadtest.py
+    python loadtest.py --memory --scenarios mixed --concurrency 32  # needs mongomock-motor
+    python loadtest.py --url http://localhost:8001 --duration 30
+    python loadtest.py --memory --out before.json
+    python loadtest.py --memory --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+# Weighted operations per scenario
+SCENARIOS = {
+    "write": {"create": 1.0},
+    "read": {"list": 0.7, "list_next": 0.2, "rollup": 0.1},
+    "mixed": {"create": 0.3, "list": 0.45, "list_next": 0.15, "rollup": 0.1},
+}
+CLIENT_NAMES = [f"load-{i:02d}" for i in range(50)]
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "requests_per_sec": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+class Operations:
+    """The requests a scenario can issue, against one shared client."""
+
+    def __init__(self, client: httpx.AsyncClient, page_size: int):
+        self.client = client
+        self.page_size = page_size
+        self.next_cursor = None  # Most recent X-Next-Cursor, shared by all workers
+
+    async def create(self) -> httpx.Response:
+        return await self.client.post("/api/status", json={"client_name": random.choice(CLIENT_NAMES)})
+
+    async def list(self) -> httpx.Response:
+        response = await self.client.get("/api/status", params={"limit": self.page_size})
+        self.next_cursor = response.headers.get("X-Next-Cursor") or self.next_cursor
+        return response
+
+    async def list_next(self) -> httpx.Response:
+        # Keyset pagination: the second page of a listing
+        if self.next_cursor is None:
+            return await self.list()
+        return await self.client.get("/api/status", params={"limit": self.page_size, "after": self.next_cursor})
+
+    async def rollup(self) -> httpx.Response:
+        return await self.client.get("/api/status/rollup", params={"bucket": 60})
+
+
+async def reset(server) -> None:
+    # Dropping is quicker than deleting every row; the indexes are put back after
+    await server.db.status_checks.drop()
+    await server.db.status_rollups.drop()
+    await server.ensure_indexes()
+    server.read_cache.invalidate("status", "rollup")
+
+
+async def seed(client: httpx.AsyncClient, rows: int) -> None:
+    """Preload status checks through the batch endpoint so reads have pages to serve"""
+    for start in range(0, rows, 1000):
+        items = [{"client_name": CLIENT_NAMES[i % len(CLIENT_NAMES)]} for i in range(start, min(start + 1000, rows))]
+        response = await client.post("/api/status/batch", json=items)
+        response.raise_for_status()
+
+
+async def run_scenario(ops: Operations, name: str, concurrency: int, duration: float, warmup: float) -> dict:
+    weights = SCENARIOS[name]
+    names, op_weights = list(weights), list(weights.values())
+    latencies = {op: [] for op in names}
+    errors = {op: 0 for op in names}
+    error_samples = []
+    recording = False
+
+    async def worker(deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            op = random.choices(names, op_weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await getattr(ops, op)()
+                ok = response.status_code < 400
+                detail = f"HTTP {response.status_code}"
+            except httpx.HTTPError as e:
+                ok, detail = False, str(e) or type(e).__name__
+            if not recording:
+                continue
+            if ok:
+                latencies[op].append(time.perf_counter() - started)
+            else:
+                errors[op] += 1
+                if len(error_samples) < 5:
+                    error_samples.append(f"{op}: {detail}")
+
+    if warmup > 0:
+        await asyncio.gather(*[worker(time.perf_counter() + warmup) for _ in range(concurrency)])
+    recording = True
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(started + duration) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    result = summarize([t for op in names for t in latencies[op]], sum(errors.values()), elapsed)
+    result["operations"] = {op: summarize(latencies[op], errors[op], elapsed) for op in names}
+    result["error_samples"] = error_samples
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    """Relative change per scenario versus a previous --out file (positive = higher)"""
+    def change(new, old):
+        return round((new - old) / old * 100, 1) if old else None
+
+    deltas = {}
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        deltas[name] = {
+            "requests_per_sec_pct": change(current["requests_per_sec"], previous["requests_per_sec"]),
+            "p50_ms_pct": change(current["p50_ms"], previous["p50_ms"]),
+            "p95_ms_pct": change(current["p95_ms"], previous["p95_ms"]),
+            "p99_ms_pct": change(current["p99_ms"], previous["p99_ms"]),
+        }
+    return {"baseline_commit": baseline.get("commit"), "scenarios": deltas}
+
+
+async def load_app(args):
+    """Import the app and connect it to mongod or the in-memory stand-in"""
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ["DB_NAME"] = args.db
+    if args.no_cache:
+        os.environ["READ_CACHE_TTL"] = "0"
+    sys.path.insert(0, str(Path(__file__).parent))
+    import server
+
+    if args.memory:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("--memory needs mongomock-motor: pip install mongomock-motor")
+        # Same API, no server; latencies then cover the app alone
+        memory_client = AsyncMongoMockClient(tz_aware=True)
+        server.AsyncIOMotorClient = lambda url, **kwargs: memory_client
+        await server.connect_mongo()
+    else:
+        if not await server.connect_mongo():
+            sys.exit(f"MongoDB not reachable at {server.mongo_url}")
+    return server
+
+
+async def main(args) -> None:
+    server = None
+    if args.url:
+        transport, base_url, target = None, args.url, args.url
+    else:
+        server = await load_app(args)
+        transport, base_url, target = httpx.ASGITransport(app=server.app), "http://loadtest", "in-process"
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=30) as client:
+        ops = Operations(client, args.page_size)
+        scenarios = {}
+        runs = [(name, encoding) for name in args.scenarios for encoding in args.encodings]
+        for i, (name, encoding) in enumerate(runs):
+            # In-process, every scenario starts from the same seeded collection so
+            # runs compare across commits; a remote server is only seeded once
+            if server is not None:
+                await reset(server)
+            if args.seed and (server is not None or i == 0):
+                await seed(client, args.seed)
+            # httpx asks for gzip unless told otherwise
+            client.headers["Accept-Encoding"] = encoding
+            print(f"Running {name} ({encoding}) for {args.duration}s at concurrency {args.concurrency}...", file=sys.stderr)
+            scenarios[f"{name}/{encoding}"] = await run_scenario(ops, name, args.concurrency, args.duration, args.warmup)
+
+    results = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "target": target,
+        "backend": "remote" if args.url else ("memory" if args.memory else "mongod"),
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "seed_rows": args.seed,
+            "page_size": args.page_size,
+            "read_cache": not args.no_cache,
+            "encodings": args.encodings,
+        },
+        "scenarios": scenarios,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            results["comparison"] = compare(results, json.load(f))
+
+    if server is not None:
+        await reset(server)
+        server.client.close()
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        Path(args.out).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Status API load test")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16, help="Workers issuing requests back to back")
+    parser.add_argument("--duration", type=float, default=10, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2, help="Unmeasured seconds before each scenario")
+    parser.add_argument("--seed", type=int, default=5000, help="Status checks inserted before the first scenario")
+    parser.add_argument("--page-size", type=int, default=100, help="limit= for listing requests")
+    parser.add_argument("--encodings", nargs="+", default=["identity", "gzip"],
+                        help="Accept-Encoding values to run every scenario with (e.g. identity gzip br)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the server's read cache (in-process only)")
+    parser.add_argument("--db", default="omega_loadtest")
+    parser.add_argument("--memory", action="store_true", help="Use an in-memory MongoDB stand-in instead of mongod")
+    parser.add_argument("--url", help="Load a running server instead of the in-process app")
+    parser.add_argument("--out", help="Also write the JSON report to this file")
+    parser.add_argument("--compare", help="Earlier --out report to compute changes against")
+    asyncio.run(main(parser.parse_args()))
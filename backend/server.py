@@ -1,26 +1,559 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, CollectionInvalid, ConnectionFailure, DuplicateKeyError, OperationFailure, PyMongoError
 import os
+import json
+import time
+import bisect
+import asyncio
 import logging
+import threading
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List
+from pydantic import BaseModel, Field, ConfigDict, ValidationError, field_validator
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
 import uuid
-from datetime import datetime, timezone
+import zlib
+import socket
+import httpx
+import numpy as np
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; the stdlib encoder is used without it
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional; responses fall back to gzip without it
+    brotli = None
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection, opened and closed by lifespan()
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '20'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '2'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '10000'))
+# Bounds how long a request waits for a pooled connection when all are busy
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000'))
+client: Optional[AsyncIOMotorClient] = None
+db = None
+# When Mongo is down at boot, index and capped-collection setup is retried this
+# often (and on the first successful readiness probe) until it has run once;
+# the status migrations then follow, retried as often while Mongo is away
+MONGO_SETUP_RETRY_SECONDS = float(os.environ.get('MONGO_SETUP_RETRY_SECONDS', '10'))
+mongo_setup_done = False
+mongo_setup_lock = asyncio.Lock()
+
+# Age out raw status checks after this many days via a TTL index; 0 keeps them
+# forever. Materialized rollups are kept regardless.
+STATUS_RETENTION_DAYS = float(os.environ.get('STATUS_RETENTION_DAYS', '0'))
+
+# Pagination limits for status check listings
+STATUS_PAGE_LIMIT = int(os.environ.get('STATUS_PAGE_LIMIT', '100'))
+STATUS_MAX_PAGE_LIMIT = int(os.environ.get('STATUS_MAX_PAGE_LIMIT', '1000'))
+
+# Opt-in fast path for status listings: trusted DB rows are encoded directly
+# (orjson when installed) instead of being re-validated against StatusCheck
+STATUS_FAST_JSON = os.environ.get('STATUS_FAST_JSON', '0') == '1'
+# Rows encoded per chunk when streaming NDJSON on the fast path
+STATUS_STREAM_CHUNK_ROWS = int(os.environ.get('STATUS_STREAM_CHUNK_ROWS', '500'))
+
+# Bulk ingest limits for POST /api/status/batch
+STATUS_BATCH_MAX_ITEMS = int(os.environ.get('STATUS_BATCH_MAX_ITEMS', '10000'))
+STATUS_BATCH_CHUNK_SIZE = int(os.environ.get('STATUS_BATCH_CHUNK_SIZE', '500'))
+
+# Batch size for the one-time string -> BSON date timestamp migration
+TIMESTAMP_MIGRATION_BATCH_SIZE = 500
+
+# Bucket widths (seconds) kept incrementally in db.status_rollups; other widths
+# requested from GET /api/status/rollup are aggregated on the fly
+STATUS_ROLLUP_WIDTHS = [int(w) for w in os.environ.get('STATUS_ROLLUP_WIDTHS', '60,3600').split(',')]
+STATUS_ROLLUP_DEFAULT_WINDOW = int(os.environ.get('STATUS_ROLLUP_DEFAULT_WINDOW', '3600'))
+
+# Live push on GET /api/status/stream. STATUS_STREAM_SOURCE is "local" (publish
+# from this process's write path) or "changestream" (watch MongoDB, needs a
+# replica set; falls back to local when unavailable)
+STATUS_STREAM_SOURCE = os.environ.get('STATUS_STREAM_SOURCE', 'local')
+STATUS_STREAM_QUEUE_SIZE = int(os.environ.get('STATUS_STREAM_QUEUE_SIZE', '100'))
+STATUS_STREAM_KEEPALIVE = float(os.environ.get('STATUS_STREAM_KEEPALIVE', '15'))
+
+# In-process read cache for GET routes; READ_CACHE_TTL=0 disables it
+READ_CACHE_TTL = float(os.environ.get('READ_CACHE_TTL', '2'))
+READ_CACHE_MAX_ENTRIES = int(os.environ.get('READ_CACHE_MAX_ENTRIES', '256'))
+
+# Polled read routes answer If-None-Match / If-Modified-Since with 304 from a
+# write version instead of rerunning the query. While the status change stream
+# runs, "auto" uses in-process versions it keeps current; without it, a write
+# counter every worker bumps in MongoDB (one find_one per poll). "1" forces the
+# in-process versions for single-process deployments, "0" turns validators off.
+CONDITIONAL_GET = os.environ.get('CONDITIONAL_GET', 'auto')
+
+# JSON and text bodies of at least COMPRESS_MIN_BYTES are sent brotli (when
+# installed) or gzip encoded, whichever the client accepts. Server-sent event
+# streams are never compressed.
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', '5'))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', '4'))
+# Recently compressed bodies, reused when the same bytes are sent again
+COMPRESS_CACHE_MAX_ENTRIES = int(os.environ.get('COMPRESS_CACHE_MAX_ENTRIES', '64'))
+
+# Ally chat is kept in a capped collection, so the oldest messages are
+# overwritten once it reaches CHAT_CAPPED_BYTES or CHAT_CAPPED_MAX_DOCS. A GET
+# that is already caught up waits up to `wait` seconds (at most
+# CHAT_LONG_POLL_MAX) for the next message.
+CHAT_CAPPED_BYTES = int(os.environ.get('CHAT_CAPPED_BYTES', str(16 * 1024 * 1024)))
+CHAT_CAPPED_MAX_DOCS = int(os.environ.get('CHAT_CAPPED_MAX_DOCS', '50000'))
+CHAT_PAGE_LIMIT = int(os.environ.get('CHAT_PAGE_LIMIT', '200'))
+CHAT_LONG_POLL_MAX = float(os.environ.get('CHAT_LONG_POLL_MAX', '25'))
+# Identity stamped as the sender of messages posted through this node's backend
+NODE_ID = os.environ.get('NODE_ID', socket.gethostname())
+NODE_NAME = os.environ.get('NODE_NAME', NODE_ID)
+
+# GET /api/dashboard/snapshot fans out to these cgi-bin scripts concurrently.
+# Each source gets its own deadline (DASHBOARD_SOURCE_TIMEOUTS overrides the
+# default per source, e.g. "gps=4,metrics=1"). Results younger than
+# DASHBOARD_FRESH_TTL are served as is; up to DASHBOARD_STALE_TTL they are
+# served stale while a background fetch revalidates them.
+CGI_BASE_URL = os.environ.get('CGI_BASE_URL', 'http://localhost:8093/cgi-bin').rstrip('/')
+CGI_MAX_CONNECTIONS = int(os.environ.get('CGI_MAX_CONNECTIONS', '10'))
+DASHBOARD_SOURCES = os.environ.get('DASHBOARD_SOURCES', 'health,metrics,sensors,backup,keys,keysync,dm,mesh,gps').split(',')
+DASHBOARD_SOURCE_TIMEOUT = float(os.environ.get('DASHBOARD_SOURCE_TIMEOUT', '2.5'))
+DASHBOARD_SOURCE_TIMEOUTS = {
+    name: float(seconds)
+    for name, seconds in (pair.split('=') for pair in os.environ.get('DASHBOARD_SOURCE_TIMEOUTS', '').split(',') if pair)
+}
+DASHBOARD_FRESH_TTL = float(os.environ.get('DASHBOARD_FRESH_TTL', '2'))
+DASHBOARD_STALE_TTL = float(os.environ.get('DASHBOARD_STALE_TTL', '60'))
+cgi_client: Optional[httpx.AsyncClient] = None
+
+# In-memory history of numeric fields from the sampled dashboard sources, kept
+# as min/max/avg buckets at each "width:buckets" resolution (1 s for 1 h,
+# 1 min for 24 h, 1 h for 30 days by default). TIMESERIES_SAMPLE_INTERVAL=0
+# turns sampling off.
+TIMESERIES_SOURCES = os.environ.get('TIMESERIES_SOURCES', 'metrics,sensors').split(',')
+TIMESERIES_SAMPLE_INTERVAL = float(os.environ.get('TIMESERIES_SAMPLE_INTERVAL', '5'))
+TIMESERIES_RESOLUTIONS = [
+    tuple(int(part) for part in level.split(':'))
+    for level in os.environ.get('TIMESERIES_RESOLUTIONS', '1:3600,60:1440,3600:720').split(',')
+]
+TIMESERIES_MAX_SERIES = int(os.environ.get('TIMESERIES_MAX_SERIES', '256'))
+TIMESERIES_MAX_POINTS = int(os.environ.get('TIMESERIES_MAX_POINTS', '2000'))
+
+class Counter:
+    """Prometheus counter keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values: Dict[tuple, float] = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def inc(self, label_values: tuple, amount: float = 1) -> None:
+        with self.lock:
+            self.values[label_values] += amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            values = sorted(self.values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{format_labels(self.labels, label_values)} {value}")
+        return lines
+
+class Histogram:
+    """Prometheus histogram with fixed buckets keyed by label values.
+
+    observe() is a bisect and two additions under a lock, cheap enough to
+    leave on for every request and every MongoDB command.
+    """
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.series: Dict[tuple, list] = {}  # label values -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, label_values: tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        # Listeners observe from PyMongo's threads while a scrape renders
+        with self.lock:
+            snapshot = sorted((label_values, list(series)) for label_values, series in self.series.items())
+        for label_values, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f"{self.name}_bucket{format_labels(self.labels + ('le',), label_values + (le,))} {cumulative}"
+                )
+            labels = format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {series[-2]}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+def format_labels(names: Tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+http_requests_total = Counter(
+    "omega_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"),
+)
+http_request_seconds = Histogram(
+    "omega_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"), LATENCY_BUCKETS,
+)
+mongo_command_seconds = Histogram(
+    "omega_mongo_command_duration_seconds", "MongoDB command latency.", ("command", "outcome"), LATENCY_BUCKETS,
+)
+cgi_source_seconds = Histogram(
+    "omega_cgi_source_duration_seconds", "cgi-bin fetch latency by source.", ("source", "outcome"), LATENCY_BUCKETS,
+)
+http_requests_in_flight = 0
+
+class CommandTimer(monitoring.CommandListener):
+    """Feeds driver-reported MongoDB command durations into a histogram."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_command_seconds.observe((event.command_name, "ok"), event.duration_micros / 1e6)
+
+    def failed(self, event):
+        mongo_command_seconds.observe((event.command_name, "error"), event.duration_micros / 1e6)
+
+command_timer = CommandTimer()
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route counts, latency and in-flight.
+
+    Routes are labelled by their path template so cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global http_requests_in_flight
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight -= 1
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            http_request_seconds.observe((scope["method"], route_path), time.perf_counter() - started)
+            http_requests_total.inc((scope["method"], route_path, str(status)))
+
+class GzipStream:
+    """zlib's gzip compressor behind brotli.Compressor's process/flush/finish."""
+
+    def __init__(self, level: int):
+        self.compressobj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def process(self, data: bytes) -> bytes:
+        return self.compressobj.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressobj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressobj.flush()
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing JSON and text responses.
+
+    Single-body responses under min_size pass through untouched. Streamed
+    bodies (NDJSON pages) are compressed chunk by chunk with a flush after
+    each, so clients still see rows as they are produced. Single bodies are
+    compressed once per content and encoding: polls of unchanged data (often
+    the very bytes object held by ReadCache, whose hash Python caches) reuse
+    the compressed bytes instead of paying for brotli again. A hit is checked
+    against the stored raw body, so a hash collision is only a miss.
+    """
+
+    COMPRESSIBLE = ("application/json", "application/x-ndjson", "text/plain", "text/html", "text/csv")
+
+    def __init__(self, app, min_size: int = COMPRESS_MIN_BYTES, max_entries: int = COMPRESS_CACHE_MAX_ENTRIES):
+        self.app = app
+        self.min_size = min_size
+        self.max_entries = max_entries
+        self.cache: OrderedDict = OrderedDict()  # (encoding, length, hash) -> (raw body, compressed body)
+        self.hits = 0
+        self.misses = 0
+
+    def compress_once(self, encoding: str, body: bytes) -> bytes:
+        if self.max_entries <= 0:
+            return self.finish(self.compressor(encoding), body)
+        key = (encoding, len(body), hash(body))
+        cached = self.cache.get(key)
+        if cached is not None and cached[0] == body:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        compressed = self.finish(self.compressor(encoding), body)
+        self.cache[key] = (body, compressed)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+        return compressed
+
+    @staticmethod
+    def choose_encoding(accept_encoding: str) -> Optional[str]:
+        offered = {}
+        for part in accept_encoding.lower().split(","):
+            name, _, params = part.strip().partition(";")
+            q = params.strip()[2:] if params.strip().startswith("q=") else "1"
+            try:
+                offered[name.strip()] = float(q)
+            except ValueError:
+                continue
+        if brotli is not None and offered.get("br", 0) > 0:
+            return "br"
+        if offered.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+
+    @staticmethod
+    def compressor(encoding: str):
+        if encoding == "br":
+            return brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+        return GzipStream(COMPRESS_GZIP_LEVEL)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        encoding = self.choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                start = message
+                response_headers = dict(message.get("headers", []))
+                content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in response_headers or not content_type.startswith(self.COMPRESSIBLE):
+                    start = None
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or (start is None and compressor is None):
+                await send(message)
+                return
+
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if start is not None:
+                raw_headers = [(k, v) for k, v in start.get("headers", []) if k != b"content-length"]
+                raw_headers.append((b"vary", b"Accept-Encoding"))
+                if not more_body and len(body) < self.min_size:
+                    # Small single body: not worth the CPU or the header bytes
+                    await send({**start, "headers": raw_headers + [(b"content-length", str(len(body)).encode())]})
+                    start = None
+                    await send(message)
+                    return
+                raw_headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    body = self.compress_once(encoding, body)
+                    raw_headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**start, "headers": raw_headers})
+                    start = None
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                compressor = self.compressor(encoding)
+                await send({**start, "headers": raw_headers})
+                start = None
+
+            if more_body:
+                await send({"type": "http.response.body", "body": compressor.process(body) + compressor.flush(), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": self.finish(compressor, body)})
+                compressor = None
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def finish(compressor, body: bytes) -> bytes:
+        return compressor.process(body) + compressor.finish()
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Tracks connection pool occupancy for the readiness endpoint.
+
+    PyMongo calls the listeners from its own threads, so counts change under
+    a lock like the metrics above.
+    """
+
+    def __init__(self):
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.lock = threading.Lock()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self.lock:
+            self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self.lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event):
+        with self.lock:
+            self.waiting += 1
+
+    def connection_check_out_failed(self, event):
+        with self.lock:
+            self.waiting -= 1
+
+    def connection_checked_out(self, event):
+        with self.lock:
+            self.waiting -= 1
+            self.in_use += 1
+
+    def connection_checked_in(self, event):
+        with self.lock:
+            self.in_use -= 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            open_, in_use, waiting = self.open, self.in_use, self.waiting
+        return {
+            "max_size": MONGO_MAX_POOL_SIZE,
+            "min_size": MONGO_MIN_POOL_SIZE,
+            "open": open_,
+            "in_use": in_use,
+            "waiting": waiting,
+            "saturation": round(in_use / MONGO_MAX_POOL_SIZE, 3),
+        }
+
+pool_monitor = PoolMonitor()
+
+async def connect_mongo() -> bool:
+    global client, db
+    client = AsyncIOMotorClient(
+        mongo_url,
+        # tz_aware so BSON dates come back as UTC-aware datetimes
+        tz_aware=True,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        event_listeners=[pool_monitor, command_timer],
+    )
+    db = client[os.environ['DB_NAME']]
+
+    # Open minPoolSize connections now so the first requests after boot
+    # don't pay for connection setup
+    try:
+        await asyncio.gather(*[client.admin.command("ping") for _ in range(max(MONGO_MIN_POOL_SIZE, 1))])
+        return True
+    except Exception as e:
+        logger.warning("MongoDB not reachable at startup, continuing: %s", e)
+        return False
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global cgi_client
+    # One pooled client for every cgi-bin fetch, so snapshots reuse keep-alive connections
+    cgi_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=CGI_MAX_CONNECTIONS, max_keepalive_connections=CGI_MAX_CONNECTIONS),
+    )
+    tasks = []
+    try:
+        # Serve even when Mongo is down at boot; /api/health/ready reports it
+        started = datetime.now(timezone.utc)
+        if await connect_mongo():
+            await ensure_mongo_setup()
+            # Runs in the background so startup isn't held up by a large collection
+            tasks.append(asyncio.create_task(run_status_migrations(started)))
+        else:
+            tasks.append(asyncio.create_task(retry_mongo_setup(started)))
+        if STATUS_STREAM_SOURCE == "changestream":
+            tasks.append(asyncio.create_task(watch_status_changes()))
+        if TIMESERIES_SAMPLE_INTERVAL > 0:
+            tasks.append(asyncio.create_task(sample_timeseries()))
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        source_cache.cancel()
+        try:
+            await cgi_client.aclose()
+        finally:
+            if client is not None:
+                client.close()
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -37,34 +570,1124 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+class StatusCheckBatchCreate(StatusCheckCreate):
+    # Queued checks flushed after an outage keep the time they were taken
+    timestamp: Optional[datetime] = None
+
+    @field_validator("timestamp")
+    @classmethod
+    def timestamp_as_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # One batch may mix naive and offset timestamps; rollups compare them
+        return as_utc(value) if value is not None else None
+
+class StatusRollupBucket(BaseModel):
+    start: datetime
+    count: int
+
+class StatusClientRollup(BaseModel):
+    client_name: str
+    last_seen: datetime
+    total: int
+    checks_per_minute: float
+    buckets: List[StatusRollupBucket]
+
+class StatusRollupResult(BaseModel):
+    bucket_seconds: int
+    since: datetime
+    until: datetime
+    source: str  # "materialized" or "aggregate"
+    clients: List[StatusClientRollup]
+
+class StatusCheckBatchItemResult(BaseModel):
+    index: int
+    ok: bool
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class StatusCheckBatchResult(BaseModel):
+    inserted: int
+    failed: int
+    results: List[StatusCheckBatchItemResult]
+
+class StatusBroadcaster:
+    """In-process fanout of new status checks to SSE subscribers.
+
+    Each subscriber gets a bounded queue. A subscriber that falls behind has
+    its backlog dropped and receives a single resync event, so one slow
+    dashboard can never hold memory or block the write path.
+    """
+
+    RESYNC_EVENT = "event: resync\ndata: {}\n\n"
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.local_publish = True
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.subscribers.discard(queue)
+
+    def publish(self, docs: List[dict]) -> None:
+        if not self.subscribers or not docs:
+            return
+        # Serialize once, shared by every subscriber
+        events = [
+            f"id: {doc['id']}\nevent: status\ndata: {StatusCheck(**doc).model_dump_json()}\n\n"
+            for doc in docs
+        ]
+        for queue in list(self.subscribers):
+            for event in events:
+                if queue.full():
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(self.RESYNC_EVENT)
+                    break
+                queue.put_nowait(event)
+
+status_broadcaster = StatusBroadcaster(STATUS_STREAM_QUEUE_SIZE)
+
+class ChatWaiters:
+    """Wakes long-polling chat readers when their channel gets a message.
+
+    Readers take the channel's event before querying, so a message stored
+    between the query and the wait still wakes them. Only posts made by this
+    process wake readers early; anything else is picked up when the wait
+    times out and the reader queries again. A channel's entries exist only
+    while someone is long-polling it, so arbitrary node ids can't pile up.
+    """
+
+    def __init__(self):
+        self.events: Dict[str, asyncio.Event] = {}
+        self.waiting: Dict[str, int] = defaultdict(int)  # channel -> long-polls in progress
+
+    def join(self, channel: str) -> None:
+        self.waiting[channel] += 1
+
+    def leave(self, channel: str) -> None:
+        self.waiting[channel] -= 1
+        if self.waiting[channel] <= 0:
+            del self.waiting[channel]
+            self.events.pop(channel, None)
+
+    def event(self, channel: str) -> asyncio.Event:
+        return self.events.setdefault(channel, asyncio.Event())
+
+    def notify(self, channel: str) -> None:
+        event = self.events.pop(channel, None)
+        if event:
+            event.set()
+
+chat_waiters = ChatWaiters()
+# Readers move their cursor past the highest seq they see, so seqs must become
+# visible in order: allocation and insert happen under this lock. It orders
+# posts within one process only; run chat behind a single worker.
+chat_post_lock = asyncio.Lock()
+
+class ReadCache:
+    """LRU + TTL cache for read routes with request coalescing.
+
+    Keys are tuples whose first element is a namespace; writes call
+    invalidate() with the namespaces they affect. Concurrent misses on the
+    same key share a single in-flight load.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self.inflight: Dict[tuple, asyncio.Task] = {}
+        self.generations: Dict[str, int] = defaultdict(int)
+        # Generations restart with the process, so validators carry a per-process epoch.
+        # Anything written before startup counts as modified at startup.
+        self.epoch = uuid.uuid4().hex[:8]
+        self.started_at = time.time()
+        self.modified: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    async def get_or_load(self, key: tuple, loader):
+        if self.ttl <= 0:
+            return await loader()
+
+        entry = self.entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        inflight = self.inflight.get(key)
+        if inflight:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        # The load runs as its own task, so a leader whose client goes away
+        # only stops waiting; the followers sharing the load still get it
+        task = asyncio.create_task(self._load(key, loader, self.generations[key[0]]))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())  # Retrieved even if nobody waits
+        self.inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: tuple, loader, generation: int):
+        try:
+            value = await loader()
+        finally:
+            if self.inflight.get(key) is asyncio.current_task():
+                del self.inflight[key]
+
+        # Don't store results that raced with an invalidating write
+        if self.generations[key[0]] == generation:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, *namespaces: str) -> None:
+        now = time.time()
+        for namespace in namespaces:
+            self.generations[namespace] += 1
+            self.modified[namespace] = now
+        for key in [key for key in self.entries if key[0] in namespaces]:
+            del self.entries[key]
+        for key in [key for key in self.inflight if key[0] in namespaces]:
+            del self.inflight[key]
+
+    def version(self, namespace: str) -> Tuple[int, float]:
+        """Write generation and last write time of a namespace, for validators"""
+        return self.generations[namespace], self.modified.get(namespace, self.started_at)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+        }
+
+read_cache = ReadCache(READ_CACHE_TTL, READ_CACHE_MAX_ENTRIES)
+
+class SourceCache:
+    """Stale-while-revalidate cache for dashboard sources.
+
+    Fresh entries are returned directly. Stale ones are returned immediately
+    while a single background task refreshes them. Entries older than the
+    stale window are refetched inline, and concurrent callers share that fetch.
+    """
+
+    def __init__(self, fresh_ttl: float, stale_ttl: float):
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.entries: Dict[str, Tuple[float, dict]] = {}  # source -> (fetched_at, result)
+        self.refreshing: Dict[str, asyncio.Task] = {}
+
+    def _refresh(self, source: str, fetch) -> asyncio.Task:
+        task = self.refreshing.get(source)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_store(source, fetch))
+            self.refreshing[source] = task
+            task.add_done_callback(lambda _: self.refreshing.pop(source, None))
+        return task
+
+    async def _fetch_and_store(self, source: str, fetch) -> dict:
+        result = await fetch(source)
+        previous = self.entries.get(source)
+        if result["ok"] or previous is None:
+            self.entries[source] = (time.monotonic(), result)
+            return result
+        # A failed refresh keeps the last good data, flagged with its age and the error
+        return {**previous[1], "ok": False, "error": result["error"], "latency_ms": result["latency_ms"]}
+
+    async def get(self, source: str, fetch) -> dict:
+        entry = self.entries.get(source)
+        age = time.monotonic() - entry[0] if entry else None
+        if entry and age < self.fresh_ttl:
+            return {**entry[1], "cache": "fresh", "age_s": round(age, 3)}
+        if entry and age < self.stale_ttl:
+            self._refresh(source, fetch)
+            return {**entry[1], "cache": "stale", "age_s": round(age, 3)}
+        result = await asyncio.shield(self._refresh(source, fetch))
+        age = time.monotonic() - self.entries[source][0]
+        return {**result, "cache": "miss", "age_s": round(age, 3)}
+
+    def cancel(self) -> None:
+        for task in list(self.refreshing.values()):
+            task.cancel()
+
+source_cache = SourceCache(DASHBOARD_FRESH_TTL, DASHBOARD_STALE_TTL)
+
+class RollupRing:
+    """Fixed-size ring of min/max/sum/count buckets of one width.
+
+    Storage is preallocated NumPy arrays (float64 min/max/sums, so a large
+    counter keeps its exact value and small samples still register on it,
+    int64 bucket numbers), so a series costs the same memory after a month as after a minute and
+    appending never allocates.
+    """
+
+    def __init__(self, width: int, capacity: int):
+        self.width = width
+        self.capacity = capacity
+        self.bucket = np.zeros(capacity, dtype=np.int64)  # bucket start // width
+        self.min = np.zeros(capacity, dtype=np.float64)
+        self.max = np.zeros(capacity, dtype=np.float64)
+        self.sum = np.zeros(capacity, dtype=np.float64)
+        self.count = np.zeros(capacity, dtype=np.uint32)
+        self.head = -1  # Slot of the newest bucket
+        self.size = 0
+
+    def add(self, timestamp: float, value: float) -> None:
+        bucket = int(timestamp // self.width)
+        i = self.head
+        if self.size and self.bucket[i] == bucket:
+            self.min[i] = min(self.min[i], value)
+            self.max[i] = max(self.max[i], value)
+            self.sum[i] += value
+            self.count[i] += 1
+            return
+        if self.size and bucket < self.bucket[i]:
+            return  # Late sample for a bucket already closed
+        i = self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.bucket[i] = bucket
+        self.min[i] = self.max[i] = self.sum[i] = value
+        self.count[i] = 1
+
+    def oldest(self) -> Optional[float]:
+        if not self.size:
+            return None
+        return float(self.bucket[(self.head - self.size + 1) % self.capacity] * self.width)
+
+    def query(self, since: float, until: float) -> Dict[str, np.ndarray]:
+        """Buckets overlapping [since, until], oldest first"""
+        order = np.arange(self.head - self.size + 1, self.head + 1) % self.capacity
+        buckets = self.bucket[order]
+        lo = np.searchsorted(buckets, since // self.width, side="left")
+        hi = np.searchsorted(buckets, until // self.width, side="right")
+        window = order[lo:hi]
+        return {
+            "t": self.bucket[window] * self.width,
+            "min": self.min[window],
+            "max": self.max[window],
+            "avg": self.sum[window] / self.count[window],
+        }
+
+class TimeSeries:
+    """One series, rolled up at every configured resolution on append."""
+
+    def __init__(self, resolutions: List[Tuple[int, int]]):
+        self.levels = [RollupRing(width, capacity) for width, capacity in sorted(resolutions)]
+        self.last: Optional[Tuple[float, float]] = None
+
+    def add(self, timestamp: float, value: float) -> None:
+        self.last = (timestamp, value)
+        for level in self.levels:
+            level.add(timestamp, value)
+
+    def pick_level(self, since: float, until: float, max_points: int) -> RollupRing:
+        """Finest resolution that still covers `since` and fits in max_points"""
+        for level in self.levels:
+            oldest = level.oldest()
+            covers = oldest is not None and (oldest <= since or level.size < level.capacity)
+            if covers and (until - since) / level.width <= max_points:
+                return level
+        return self.levels[-1]
+
+class TimeSeriesStore:
+    def __init__(self, resolutions: List[Tuple[int, int]], max_series: int):
+        self.resolutions = resolutions
+        self.max_series = max_series
+        self.series: Dict[str, TimeSeries] = {}
+        self.dropped = 0  # Samples refused because max_series was reached
+
+    def add(self, name: str, timestamp: float, value: float) -> None:
+        series = self.series.get(name)
+        if series is None:
+            if len(self.series) >= self.max_series:
+                self.dropped += 1
+                return
+            series = self.series[name] = TimeSeries(self.resolutions)
+        series.add(timestamp, value)
+
+    def add_fields(self, prefix: str, data, timestamp: float, depth: int = 3) -> None:
+        """Record every numeric field of a cgi-bin payload as prefix.path.to.field"""
+        if isinstance(data, dict) and depth:
+            for key, value in data.items():
+                self.add_fields(f"{prefix}.{key}", value, timestamp, depth - 1)
+        elif isinstance(data, (int, float)) and not isinstance(data, bool):
+            self.add(prefix, timestamp, float(data))
+
+timeseries_store = TimeSeriesStore(TIMESERIES_RESOLUTIONS, TIMESERIES_MAX_SERIES)
+
+async def mark_status_written(*namespaces: str) -> None:
+    """Drop this process's cached reads and bump the write counter other workers poll"""
+    read_cache.invalidate(*namespaces)
+    if CONDITIONAL_GET != "auto":
+        return
+    try:
+        await db.counters.update_one(
+            {"_id": "status_version"},
+            {"$inc": {"seq": 1}, "$set": {"at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+    except PyMongoError:
+        # The write itself is stored; validators catch up with the next one
+        logger.exception("Could not bump the status write counter")
+
+async def publish_status_checks(docs: List[dict]) -> None:
+    await mark_status_written("status", "rollup")
+    # With a change stream running, MongoDB is the single source of events
+    if status_broadcaster.local_publish:
+        status_broadcaster.publish(docs)
+
+class ChatMessageCreate(BaseModel):
+    text: str = Field(min_length=1, max_length=4000)
+    priority: str = "normal"
+    sender_name: Optional[str] = None
+
+class ChatPage(BaseModel):
+    messages: List[dict]
+    node_id: str  # Sender id of this node's own messages
+    next_since: int  # Pass back as ?since= to receive only newer messages
+    has_more: bool
+
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
     return {"message": "Hello World"}
 
+def status_check_to_doc(status_obj: StatusCheck) -> dict:
+    # Timestamps are stored as native BSON dates so they can be range-queried
+    return status_obj.model_dump()
+
+def as_utc(value: datetime) -> datetime:
+    # Naive datetimes from query strings are taken to be UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def rollup_bucket_start(timestamp: datetime, width: int) -> datetime:
+    epoch = int(as_utc(timestamp).timestamp())
+    return datetime.fromtimestamp(epoch - epoch % width, tz=timezone.utc)
+
+async def record_status_rollups(docs: List[dict]) -> None:
+    # Fold freshly inserted checks into the materialized rollups with one
+    # upsert per (width, client, bucket) instead of one per document
+    counts: Dict[tuple, int] = defaultdict(int)
+    last_seen: Dict[tuple, datetime] = {}
+    for doc in docs:
+        for width in STATUS_ROLLUP_WIDTHS:
+            key = (width, doc['client_name'], rollup_bucket_start(doc['timestamp'], width))
+            counts[key] += 1
+            last_seen[key] = max(last_seen.get(key, doc['timestamp']), doc['timestamp'])
+    if not counts:
+        return
+
+    try:
+        await db.status_rollups.bulk_write([
+            UpdateOne(
+                {"_id": {"w": width, "c": client_name, "b": bucket_start}},
+                {
+                    "$setOnInsert": {"width": width, "client_name": client_name, "bucket_start": bucket_start},
+                    "$inc": {"count": count},
+                    "$max": {"last_seen": last_seen[(width, client_name, bucket_start)]},
+                },
+                upsert=True,
+            )
+            for (width, client_name, bucket_start), count in counts.items()
+        ], ordered=False)
+    except Exception:
+        # Rollups are derived data; never fail the write that fed them
+        logger.exception("Failed to update status rollups for %d checks", len(docs))
+
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
     
-    # Convert to dict and serialize datetime to ISO string for MongoDB
-    doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
+    doc = status_check_to_doc(status_obj)
     
     _ = await db.status_checks.insert_one(doc)
+    await record_status_rollups([doc])
+    await publish_status_checks([doc])
     return status_obj
 
+def parse_status_batch_body(body: bytes, content_type: str) -> list:
+    try:
+        if 'ndjson' in content_type:
+            return [json.loads(line) for line in body.splitlines() if line.strip()]
+        items = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed batch body: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Batch body must be a JSON array or NDJSON")
+    return items
+
+@api_router.post("/status/batch", response_model=StatusCheckBatchResult)
+async def create_status_checks_batch(request: Request):
+    items = parse_status_batch_body(await request.body(), request.headers.get('content-type', ''))
+    if len(items) > STATUS_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(items)} exceeds limit of {STATUS_BATCH_MAX_ITEMS}",
+        )
+
+    # Validate everything up front; invalid items are reported, not fatal
+    results: List[StatusCheckBatchItemResult] = []
+    pending = []  # (index, doc) pairs to insert
+    for index, item in enumerate(items):
+        try:
+            status_input = StatusCheckBatchCreate.model_validate(item)
+        except ValidationError as e:
+            results.append(StatusCheckBatchItemResult(
+                index=index, ok=False, error=e.errors(include_url=False)[0]['msg'],
+            ))
+            continue
+        status_obj = StatusCheck(**status_input.model_dump(exclude_none=True))
+        pending.append((index, status_check_to_doc(status_obj)))
+
+    # Unordered inserts in bounded chunks so one bad document doesn't stop the rest
+    for start in range(0, len(pending), STATUS_BATCH_CHUNK_SIZE):
+        chunk = pending[start:start + STATUS_BATCH_CHUNK_SIZE]
+        write_errors = {}
+        try:
+            await db.status_checks.insert_many([doc for _, doc in chunk], ordered=False)
+        except BulkWriteError as e:
+            write_errors = {err['index']: err['errmsg'] for err in e.details.get('writeErrors', [])}
+        inserted_docs = []
+        for position, (index, doc) in enumerate(chunk):
+            if position in write_errors:
+                results.append(StatusCheckBatchItemResult(index=index, ok=False, error=write_errors[position]))
+            else:
+                results.append(StatusCheckBatchItemResult(index=index, ok=True, id=doc['id']))
+                inserted_docs.append(doc)
+        await record_status_rollups(inserted_docs)
+        await publish_status_checks(inserted_docs)
+
+    results.sort(key=lambda result: result.index)
+    inserted = sum(1 for result in results if result.ok)
+    return StatusCheckBatchResult(inserted=inserted, failed=len(results) - inserted, results=results)
+
+def parse_status_cursor(after: str) -> Tuple[datetime, str]:
+    # Cursor format is "<timestamp>,<id>"; an unencoded "+" in the UTC offset
+    # arrives as a space, so put it back before parsing
+    timestamp, sep, check_id = after.replace(' ', '+').rpartition(',')
+    try:
+        if not sep or not check_id:
+            raise ValueError(after)
+        return as_utc(datetime.fromisoformat(timestamp)), check_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor, expected '<timestamp>,<id>'")
+
+def encode_status_cursor(check: dict) -> str:
+    return f"{as_utc(check['timestamp']).isoformat()},{check['id']}"
+
+def status_checks_query(
+    after: Optional[str],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> dict:
+    clauses = []
+    if since or until:
+        # Range on the leading key of the (timestamp, id) index
+        time_range = {}
+        if since:
+            time_range["$gte"] = as_utc(since)
+        if until:
+            time_range["$lt"] = as_utc(until)
+        clauses.append({"timestamp": time_range})
+    if after:
+        timestamp, check_id = parse_status_cursor(after)
+        # Keyset predicate matching the (timestamp desc, id desc) sort order
+        clauses.append({"$or": [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "id": {"$lt": check_id}},
+        ]})
+    if len(clauses) > 1:
+        return {"$and": clauses}
+    return clauses[0] if clauses else {}
+
+# Only the StatusCheck fields, so fast-path rows can be encoded as-is
+STATUS_FAST_PROJECTION = {"_id": 0, "id": 1, "client_name": 1, "timestamp": 1}
+
+def find_status_checks(query: dict, limit: Optional[int] = None, projection: Optional[dict] = None):
+    cursor = db.status_checks.find(query, projection or {"_id": 0}).sort([("timestamp", -1), ("id", -1)])
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor
+
+def status_check_from_doc(check: dict) -> StatusCheck:
+    return StatusCheck(**check)
+
+def json_default(value):
+    if isinstance(value, datetime):
+        # Same shape pydantic emits for UTC datetimes
+        return as_utc(value).isoformat().replace("+00:00", "Z")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode_json(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC)
+    # Raw UTF-8 like pydantic and JSONResponse, not \u escapes
+    return json.dumps(value, default=json_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+def encode_ndjson(rows: List[dict]) -> bytes:
+    return b"".join(encode_json(row) + b"\n" for row in rows)
+
+async def stream_status_checks_ndjson(cursor):
+    # Documents are serialized as the Motor cursor yields them, so memory stays
+    # bounded by the driver batch size rather than the collection size
+    if STATUS_FAST_JSON:
+        chunk = []
+        async for check in cursor:
+            chunk.append(check)
+            if len(chunk) >= STATUS_STREAM_CHUNK_ROWS:
+                yield encode_ndjson(chunk)
+                chunk = []
+        if chunk:
+            yield encode_ndjson(chunk)
+        return
+
+    async for check in cursor:
+        yield status_check_from_doc(check).model_dump_json() + "\n"
+
+status_version_seen: Optional[int] = None  # Last shared write counter value this process acted on
+
+async def shared_status_version() -> Tuple[str, float]:
+    """Validator prefix and write time from the counter every worker bumps"""
+    global status_version_seen
+    version = await db.counters.find_one({"_id": "status_version"})
+    seq = version["seq"] if version else 0
+    if seq != status_version_seen:
+        # Another worker wrote: pages this process cached or is loading predate it
+        read_cache.invalidate("status", "rollup")
+        status_version_seen = seq
+    modified_at = as_utc(version["at"]).timestamp() if version else read_cache.started_at
+    return f"db.{seq}", modified_at
+
+async def conditional_get(request: Request, namespace: str, *extra) -> Tuple[Optional[Response], Dict[str, str]]:
+    """Validators for a read route, and a 304 when the client already has them.
+
+    The ETag is a write version plus `extra` (anything else the body depends
+    on), so a matching poll is answered without running the query. The
+    version is this process's generation while the change stream keeps it
+    current, and otherwise the write counter shared through MongoDB.
+    """
+    if CONDITIONAL_GET == "0":
+        return None, {}
+    if CONDITIONAL_GET == "auto" and status_broadcaster.local_publish:
+        try:
+            version, modified_at = await shared_status_version()
+        except PyMongoError:
+            return None, {}
+        tag = f"{version}.{namespace}"
+    else:
+        generation, modified_at = read_cache.version(namespace)
+        tag = f"{read_cache.epoch}.{namespace}.{generation}"
+    if extra:
+        tag += f".{zlib.crc32(repr(extra).encode()):08x}"
+    headers = {"ETag": f'W/"{tag}"', "Cache-Control": "no-cache"}
+    # HTTP dates have whole seconds: only advertise one once its second is over,
+    # so a later write can never share the date a client already holds
+    modified_second = int(modified_at)
+    if time.time() >= modified_second + 1:
+        headers["Last-Modified"] = formatdate(modified_second, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison, as required for GET
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if "*" in tags or headers["ETag"].removeprefix("W/") in tags:
+            return Response(status_code=304, headers=headers), headers
+    elif "Last-Modified" in headers and request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"]).timestamp()
+        except (TypeError, ValueError):
+            since = None
+        if since is not None and modified_second <= since:
+            return Response(status_code=304, headers=headers), headers
+    return None, headers
+
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    # Exclude MongoDB's _id field from the query results
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
-    
-    # Convert ISO string timestamps back to datetime objects
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
-    
-    return status_checks
+async def get_status_checks(
+    request: Request,
+    response: Response,
+    after: Optional[str] = Query(None, description="Keyset cursor '<timestamp>,<id>' from X-Next-Cursor"),
+    limit: Optional[int] = Query(None, ge=1, le=STATUS_MAX_PAGE_LIMIT),
+    since: Optional[datetime] = Query(None, description="Only checks at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only checks before this time"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    # Expiring checks change the result without a write; the TTL monitor runs once a minute
+    expiry_tick = int(time.time() // 60) if STATUS_RETENTION_DAYS > 0 else None
+    not_modified, validators = await conditional_get(request, "status", format, STATUS_FAST_JSON, expiry_tick)
+    if not_modified:
+        return not_modified
+    response.headers.update(validators)
+
+    query = status_checks_query(after, since, until)
+
+    projection = STATUS_FAST_PROJECTION if STATUS_FAST_JSON else None
+
+    if format == "ndjson":
+        # Streaming mode walks the whole result set unless a limit is given
+        return StreamingResponse(
+            stream_status_checks_ndjson(find_status_checks(query, limit, projection)),
+            media_type="application/x-ndjson",
+            headers=validators,
+        )
+
+    limit = limit or STATUS_PAGE_LIMIT
+
+    if STATUS_FAST_JSON:
+        async def load_encoded_page():
+            status_checks = await find_status_checks(query, limit + 1, projection).to_list(limit + 1)
+            next_cursor = None
+            if len(status_checks) > limit:
+                status_checks = status_checks[:limit]
+                next_cursor = encode_status_cursor(status_checks[-1])
+            # Rows come straight from our own writes, so skip response_model
+            # validation and cache the encoded bytes
+            return encode_json(status_checks), next_cursor
+
+        body, next_cursor = await read_cache.get_or_load(
+            ("status", "fast", after, limit, since, until), load_encoded_page,
+        )
+        headers = {**validators, "X-Next-Cursor": next_cursor} if next_cursor else validators
+        return Response(body, media_type="application/json", headers=headers)
+
+    async def load_page():
+        # Fetch one extra row to know whether another page exists
+        status_checks = await find_status_checks(query, limit + 1).to_list(limit + 1)
+        next_cursor = None
+        if len(status_checks) > limit:
+            status_checks = status_checks[:limit]
+            next_cursor = encode_status_cursor(status_checks[-1])
+        return [status_check_from_doc(check) for check in status_checks], next_cursor
+
+    page, next_cursor = await read_cache.get_or_load(("status", after, limit, since, until), load_page)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
+
+async def status_event_stream(request: Request):
+    queue = status_broadcaster.subscribe()
+    try:
+        # Tell EventSource how long to wait before reconnecting
+        yield "retry: 5000\n\n"
+        while not await request.is_disconnected():
+            try:
+                yield await asyncio.wait_for(queue.get(), timeout=STATUS_STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+    finally:
+        status_broadcaster.unsubscribe(queue)
+
+@api_router.get("/status/stream")
+async def stream_status_updates(request: Request):
+    return StreamingResponse(
+        status_event_stream(request),
+        media_type="text/event-stream",
+        # Disable nginx response buffering so events go out immediately
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def rollup_group_by_client_stages() -> List[dict]:
+    # Shared tail: rows shaped {client_name, bucket_start, count, last_seen}
+    # are folded into one document per client with its bucket series
+    return [
+        {"$sort": {"bucket_start": 1}},
+        {"$group": {
+            "_id": "$client_name",
+            "last_seen": {"$max": "$last_seen"},
+            "total": {"$sum": "$count"},
+            "buckets": {"$push": {"start": "$bucket_start", "count": "$count"}},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+
+def materialized_rollup_pipeline(width: int, since: datetime, until: datetime, client_name: Optional[str]) -> List[dict]:
+    match = {"width": width, "bucket_start": {"$gte": rollup_bucket_start(since, width), "$lt": until}}
+    if client_name:
+        match["client_name"] = client_name
+    return [{"$match": match}] + rollup_group_by_client_stages()
+
+def aggregate_rollup_pipeline(width: int, since: datetime, until: datetime, client_name: Optional[str]) -> List[dict]:
+    match = {"timestamp": {"$gte": rollup_bucket_start(since, width), "$lt": until}}
+    if client_name:
+        match["client_name"] = client_name
+    width_ms = width * 1000
+    # Bucket by epoch arithmetic rather than $dateTrunc, which needs MongoDB 5.0
+    # and isn't available on the 4.4 builds that run on the Pi's ARMv8.0 cores
+    epoch_ms = {"$toLong": "$timestamp"}
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "client_name": "$client_name",
+                "bucket": {"$subtract": [epoch_ms, {"$mod": [epoch_ms, width_ms]}]},
+            },
+            "count": {"$sum": 1},
+            "last_seen": {"$max": "$timestamp"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "client_name": "$_id.client_name",
+            "bucket_start": {"$toDate": "$_id.bucket"},
+            "count": 1,
+            "last_seen": 1,
+        }},
+    ] + rollup_group_by_client_stages()
+
+@api_router.get("/status/rollup", response_model=StatusRollupResult)
+async def get_status_rollup(
+    request: Request,
+    response: Response,
+    bucket: int = Query(60, ge=1, le=86400, description="Bucket width in seconds"),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    client_name: Optional[str] = Query(None),
+):
+    # Without an explicit range the window slides, so the result also changes per bucket
+    window_tick = int(time.time() // bucket) if since is None or until is None else None
+    not_modified, validators = await conditional_get(request, "rollup", window_tick)
+    if not_modified:
+        return not_modified
+    response.headers.update(validators)
+    return await read_cache.get_or_load(
+        ("rollup", bucket, since, until, client_name),
+        lambda: compute_status_rollup(bucket, since, until, client_name),
+    )
+
+async def compute_status_rollup(
+    bucket: int,
+    since: Optional[datetime],
+    until: Optional[datetime],
+    client_name: Optional[str],
+) -> StatusRollupResult:
+    until = as_utc(until) if until else datetime.now(timezone.utc)
+    since = as_utc(since) if since else until - timedelta(seconds=STATUS_ROLLUP_DEFAULT_WINDOW)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="'since' must be before 'until'")
+
+    if bucket in STATUS_ROLLUP_WIDTHS:
+        source = "materialized"
+        cursor = db.status_rollups.aggregate(materialized_rollup_pipeline(bucket, since, until, client_name))
+    else:
+        source = "aggregate"
+        cursor = db.status_checks.aggregate(aggregate_rollup_pipeline(bucket, since, until, client_name))
+
+    window_minutes = (until - since).total_seconds() / 60
+    clients = [
+        StatusClientRollup(
+            client_name=row["_id"],
+            last_seen=row["last_seen"],
+            total=row["total"],
+            checks_per_minute=round(row["total"] / window_minutes, 3),
+            buckets=row["buckets"],
+        )
+        async for row in cursor
+    ]
+    return StatusRollupResult(bucket_seconds=bucket, since=since, until=until, source=source, clients=clients)
+
+@api_router.get("/health/ready")
+async def get_readiness(response: Response):
+    started = time.perf_counter()
+    try:
+        await client.admin.command("ping")
+        mongo = {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+    except Exception as e:
+        mongo = {"ok": False, "error": str(e)}
+    if mongo["ok"] and not mongo_setup_done:
+        # Mongo came up after boot: create what startup had to skip
+        try:
+            await ensure_mongo_setup()
+        except Exception as e:
+            mongo = {"ok": False, "error": f"setup failed: {e}"}
+
+    pool = pool_monitor.stats()
+    # Saturated means every pooled connection is busy and requests are queueing
+    saturated = pool["in_use"] >= pool["max_size"] and pool["waiting"] > 0
+    ready = mongo["ok"] and not saturated
+    if not ready:
+        response.status_code = 503
+    return {"ready": ready, "saturated": saturated, "mongo": mongo, "pool": pool}
+
+@api_router.get("/indexes")
+async def get_index_stats():
+    collections = {}
+    for collection_name, indexes in declared_indexes().items():
+        collection = db[collection_name]
+        usage = {
+            row["name"]: {"ops": row["accesses"]["ops"], "since": row["accesses"]["since"]}
+            async for row in collection.aggregate([{"$indexStats": {}}])
+        }
+        present = {index["name"]: index async for index in collection.list_indexes()}
+        collections[collection_name] = {
+            "indexes": [
+                {
+                    "name": name,
+                    "key": dict(index["key"]),
+                    "unique": index.get("unique", False),
+                    "expireAfterSeconds": index.get("expireAfterSeconds"),
+                    "usage": usage.get(name),
+                }
+                for name, index in present.items()
+            ],
+            "missing": [index.document["name"] for index in indexes if index.document["name"] not in present],
+        }
+    return {"retention_days": STATUS_RETENTION_DAYS, "collections": collections}
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    lines = []
+    lines += http_requests_total.render()
+    lines += http_request_seconds.render()
+    lines += [
+        "# HELP omega_http_requests_in_flight HTTP requests currently being served.",
+        "# TYPE omega_http_requests_in_flight gauge",
+        f"omega_http_requests_in_flight {http_requests_in_flight}",
+    ]
+    lines += mongo_command_seconds.render()
+    lines += cgi_source_seconds.render()
+    for key, value in pool_monitor.stats().items():
+        lines += [f"# TYPE omega_mongo_pool_{key} gauge", f"omega_mongo_pool_{key} {value}"]
+    for key in ("hits", "misses", "coalesced", "evictions"):
+        lines += [f"# TYPE omega_read_cache_{key}_total counter", f"omega_read_cache_{key}_total {getattr(read_cache, key)}"]
+    lines += ["# TYPE omega_read_cache_size gauge", f"omega_read_cache_size {len(read_cache.entries)}"]
+    lines += ["# TYPE omega_timeseries_series gauge", f"omega_timeseries_series {len(timeseries_store.series)}"]
+    lines += ["# TYPE omega_timeseries_dropped_total counter", f"omega_timeseries_dropped_total {timeseries_store.dropped}"]
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    return read_cache.stats()
+
+async def fetch_cgi_source(source: str) -> dict:
+    timeout = DASHBOARD_SOURCE_TIMEOUTS.get(source, DASHBOARD_SOURCE_TIMEOUT)
+    started = time.perf_counter()
+    result = {"ok": False, "status": None, "data": None, "error": None}
+    try:
+        response = await asyncio.wait_for(cgi_client.get(f"{CGI_BASE_URL}/{source}.py"), timeout)
+        result["status"] = response.status_code
+        result["ok"] = response.is_success
+        try:
+            result["data"] = response.json()
+        except ValueError:
+            result["error"] = "response is not JSON"
+            result["ok"] = False
+        if not response.is_success and result["error"] is None:
+            result["error"] = f"HTTP {response.status_code}"
+        outcome = "ok" if result["ok"] else "error"
+    except asyncio.TimeoutError:
+        result["error"] = f"timed out after {timeout}s"
+        outcome = "timeout"
+    except httpx.HTTPError as e:
+        result["error"] = str(e) or type(e).__name__
+        outcome = "error"
+    elapsed = time.perf_counter() - started
+    cgi_source_seconds.observe((source, outcome), elapsed)
+    result["latency_ms"] = round(elapsed * 1000, 2)
+    return result
+
+@api_router.get("/dashboard/snapshot")
+async def get_dashboard_snapshot(sources: Optional[str] = Query(None, description="Comma-separated subset of sources")):
+    names = DASHBOARD_SOURCES
+    if sources:
+        names = [name for name in sources.split(',') if name in DASHBOARD_SOURCES]
+        unknown = sorted(set(sources.split(',')) - set(DASHBOARD_SOURCES))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown sources: {', '.join(unknown)}")
+    started = time.perf_counter()
+    # Each source has its own deadline, so one hung script only costs its own slot
+    results = await asyncio.gather(*[source_cache.get(name, fetch_cgi_source) for name in names])
+    snapshot = dict(zip(names, results))
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "partial": not all(result["ok"] for result in results),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        "sources": snapshot,
+    }
+
+async def sample_timeseries():
+    # Goes through the snapshot cache, so the sampler and open dashboards share fetches
+    recorded: Dict[str, float] = {}  # source -> fetched_at of the last result stored
+    while True:
+        try:
+            await asyncio.gather(*[source_cache.get(name, fetch_cgi_source) for name in TIMESERIES_SOURCES])
+            now, now_monotonic = time.time(), time.monotonic()
+            for name in TIMESERIES_SOURCES:
+                entry = source_cache.entries.get(name)
+                # A cached result is stored once, stamped with when it was fetched
+                if entry and entry[1]["ok"] and recorded.get(name) != entry[0]:
+                    recorded[name] = entry[0]
+                    timeseries_store.add_fields(name, entry[1]["data"], now - (now_monotonic - entry[0]))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Time-series sampling failed")
+        await asyncio.sleep(TIMESERIES_SAMPLE_INTERVAL)
+
+@api_router.get("/timeseries")
+async def list_timeseries():
+    series = []
+    for name, ts in sorted(timeseries_store.series.items()):
+        series.append({
+            "name": name,
+            "last": {"t": ts.last[0], "value": ts.last[1]} if ts.last else None,
+            "resolutions": [
+                {"seconds": level.width, "buckets": level.size, "capacity": level.capacity, "oldest": level.oldest()}
+                for level in ts.levels
+            ],
+        })
+    return {"series": series, "dropped": timeseries_store.dropped}
+
+@api_router.get("/timeseries/{name}")
+async def query_timeseries(
+    name: str,
+    since: Optional[float] = Query(None, description="Epoch seconds, default one hour before until"),
+    until: Optional[float] = Query(None, description="Epoch seconds, default now"),
+    resolution: Optional[int] = Query(None, description="Bucket width in seconds, default the finest that fits"),
+    max_points: int = Query(500, ge=1),
+):
+    ts = timeseries_store.series.get(name)
+    if ts is None:
+        raise HTTPException(status_code=404, detail=f"Unknown series: {name}")
+    until = time.time() if until is None else until
+    since = until - 3600 if since is None else since
+    if since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+    max_points = min(max_points, TIMESERIES_MAX_POINTS)
+    if resolution is None:
+        level = ts.pick_level(since, until, max_points)
+    else:
+        level = next((level for level in ts.levels if level.width == resolution), None)
+        if level is None:
+            widths = ", ".join(str(level.width) for level in ts.levels)
+            raise HTTPException(status_code=400, detail=f"resolution must be one of {widths}")
+    points = level.query(since, until)
+    truncated = len(points["t"]) > max_points
+    # Columnar, so a day of minute buckets stays a few small arrays of numbers
+    return {
+        "name": name,
+        "resolution": level.width,
+        "since": since,
+        "until": until,
+        "truncated": truncated,
+        **{key: np.round(values[-max_points:].astype(np.float64), 4).tolist() for key, values in points.items()},
+    }
+
+async def next_chat_seq() -> int:
+    # One counter for every channel; atomic, so concurrent posts never share a seq
+    counter = await db.counters.find_one_and_update(
+        {"_id": "chat_seq"}, {"$inc": {"seq": 1}}, upsert=True, return_document=ReturnDocument.AFTER,
+    )
+    return counter["seq"]
+
+async def post_chat_message(channel: str, input: ChatMessageCreate) -> dict:
+    await ensure_mongo_setup()
+    async with chat_post_lock:
+        doc = {
+            "id": str(uuid.uuid4()),
+            "seq": await next_chat_seq(),
+            "channel": channel,
+            **input.model_dump(),
+            # The sender is always this node, whatever the client claims
+            "sender": NODE_ID,
+            "sender_name": input.sender_name or NODE_NAME,
+            "timestamp": datetime.now(timezone.utc),
+            "status": "delivered",
+        }
+        await db.chat_messages.insert_one(doc)
+    chat_waiters.notify(channel)
+    return {"id": doc["id"], "seq": doc["seq"], "timestamp": doc["timestamp"], "status": "sent"}
+
+async def read_chat_page(channel: str, since: Optional[str], limit: int) -> ChatPage:
+    projection = {"_id": 0}
+    if since is None:
+        # First load: the newest page, returned oldest first
+        messages = await db.chat_messages.find({"channel": channel}, projection).sort("seq", -1).limit(limit).to_list(limit)
+        messages.reverse()
+        has_more = False
+    else:
+        if since.isdigit():
+            query = {"channel": channel, "seq": {"$gt": int(since)}}
+        else:
+            # Older clients send an ISO timestamp; still served, but it walks the channel's seq range
+            try:
+                query = {"channel": channel, "timestamp": {"$gt": as_utc(datetime.fromisoformat(since.replace("Z", "+00:00")))}}
+            except ValueError:
+                raise HTTPException(status_code=400, detail="since must be a sequence number or ISO timestamp")
+        # (channel, seq) index: cost follows the number of new messages, not the history
+        messages = await db.chat_messages.find(query, projection).sort("seq", 1).limit(limit + 1).to_list(limit + 1)
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+    if messages:
+        next_since = messages[-1]["seq"]
+    elif since and since.isdigit():
+        next_since = int(since)
+    else:
+        latest = await db.chat_messages.find_one({"channel": channel}, {"seq": 1}, sort=[("seq", -1)])
+        next_since = latest["seq"] if latest else 0
+    return ChatPage(messages=messages, node_id=NODE_ID, next_since=next_since, has_more=has_more)
+
+async def wait_for_chat_page(channel: str, since: Optional[str], limit: int, wait: float) -> ChatPage:
+    wait = min(wait, CHAT_LONG_POLL_MAX)
+    if wait <= 0 or since is None:
+        return await read_chat_page(channel, since, limit)
+    deadline = time.monotonic() + wait
+    chat_waiters.join(channel)
+    try:
+        while True:
+            event = chat_waiters.event(channel)
+            page = await read_chat_page(channel, since, limit)
+            remaining = deadline - time.monotonic()
+            if page.messages or remaining <= 0:
+                return page
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                # One last look for messages posted through another process
+                return await read_chat_page(channel, since, limit)
+    finally:
+        chat_waiters.leave(channel)
+
+@api_router.get("/ally/chat/global", response_model=ChatPage)
+async def get_global_chat(
+    since: Optional[str] = Query(None, description="Last seen seq; omit for the newest page"),
+    limit: int = Query(CHAT_PAGE_LIMIT, ge=1, le=CHAT_PAGE_LIMIT),
+    wait: float = Query(0, ge=0, description="Seconds to hold the request open when there is nothing new"),
+):
+    return await wait_for_chat_page("global", since, limit, wait)
+
+@api_router.post("/ally/chat/global")
+async def send_global_chat(input: ChatMessageCreate):
+    return await post_chat_message("global", input)
+
+@api_router.get("/ally/chat/dm/{node_id}", response_model=ChatPage)
+async def get_dm_chat(
+    node_id: str,
+    since: Optional[str] = Query(None, description="Last seen seq; omit for the newest page"),
+    limit: int = Query(CHAT_PAGE_LIMIT, ge=1, le=CHAT_PAGE_LIMIT),
+    wait: float = Query(0, ge=0, description="Seconds to hold the request open when there is nothing new"),
+):
+    return await wait_for_chat_page(f"dm:{node_id}", since, limit, wait)
+
+@api_router.post("/ally/chat/dm/{node_id}")
+async def send_dm_chat(node_id: str, input: ChatMessageCreate):
+    return await post_chat_message(f"dm:{node_id}", input)
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -77,13 +1700,236 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(CompressionMiddleware, min_size=COMPRESS_MIN_BYTES)
+
+# Outermost, so latency includes CORS handling
+app.add_middleware(MetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+# httpx logs every cgi-bin request at INFO; snapshots would flood the log
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+def declared_indexes() -> Dict[str, List[IndexModel]]:
+    # Default index names are kept so existing deployments match these specs
+    indexes = {
+        "status_checks": [
+            # Keyset pagination and since/until ranges on GET /api/status; the
+            # leading key also serves any plain timestamp-desc scan
+            IndexModel([("timestamp", -1), ("id", -1)]),
+            # Per-client history
+            IndexModel([("client_name", 1), ("timestamp", -1)]),
+            IndexModel([("id", 1)], unique=True),
+        ],
+        "status_rollups": [
+            # Range scans over materialized rollups for one bucket width
+            IndexModel([("width", 1), ("bucket_start", 1)]),
+        ],
+        "chat_messages": [
+            # Newest page and ?since= cursors of one channel
+            IndexModel([("channel", 1), ("seq", 1)], unique=True),
+        ],
+    }
+    if STATUS_RETENTION_DAYS > 0:
+        indexes["status_checks"].append(IndexModel(
+            [("timestamp", 1)], expireAfterSeconds=int(STATUS_RETENTION_DAYS * 86400),
+        ))
+    return indexes
+
+async def ensure_mongo_setup():
+    # Must run before the first chat post, or MongoDB creates chat_messages uncapped
+    global mongo_setup_done
+    if mongo_setup_done:
+        return
+    async with mongo_setup_lock:
+        if not mongo_setup_done:
+            await ensure_chat_collection()
+            await ensure_indexes()
+            mongo_setup_done = True
+
+async def retry_mongo_setup(started: datetime):
+    while not mongo_setup_done:
+        await asyncio.sleep(MONGO_SETUP_RETRY_SECONDS)
+        try:
+            await client.admin.command("ping")
+            await ensure_mongo_setup()
+            logger.info("MongoDB reachable again; indexes and chat_messages are set up")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("MongoDB setup still pending: %s", e)
+    # Also reached when a readiness probe finished the setup first
+    await run_status_migrations(started)
+
+async def ensure_chat_collection():
+    try:
+        await db.create_collection("chat_messages", capped=True, size=CHAT_CAPPED_BYTES, max=CHAT_CAPPED_MAX_DOCS)
+        logger.info("Created capped chat_messages (%d bytes, %d docs)", CHAT_CAPPED_BYTES, CHAT_CAPPED_MAX_DOCS)
+    except CollectionInvalid:
+        # Already there; the cap is fixed at creation, so changed limits are only reported
+        options = await db.chat_messages.options()
+        if not options.get("capped"):
+            logger.warning("chat_messages exists but is not capped; storage will grow without bound")
+        elif options.get("size") != CHAT_CAPPED_BYTES or options.get("max") != CHAT_CAPPED_MAX_DOCS:
+            logger.warning("chat_messages keeps its original cap (%s bytes, %s docs)", options.get("size"), options.get("max"))
+    except OperationFailure as e:
+        logger.error("Could not create capped chat_messages: %s", e)
+
+async def ensure_indexes():
+    # Idempotent: create_index is a no-op when an identical index exists
+    for collection_name, indexes in declared_indexes().items():
+        collection = db[collection_name]
+        for index in indexes:
+            spec = index.document
+            try:
+                await collection.create_indexes([index])
+            except OperationFailure as e:
+                if e.code == 85 and "expireAfterSeconds" in spec:
+                    # Retention changed; update the TTL in place
+                    await db.command("collMod", collection_name, index={
+                        "keyPattern": spec["key"],
+                        "expireAfterSeconds": spec["expireAfterSeconds"],
+                    })
+                    logger.info("Updated %s retention to %ss", spec["name"], spec["expireAfterSeconds"])
+                else:
+                    logger.error("Could not create index %s on %s: %s", spec["name"], collection_name, e)
+
+    if STATUS_RETENTION_DAYS <= 0:
+        # Retention switched off; drop a TTL index left by an earlier config
+        async for index in db.status_checks.list_indexes():
+            if "expireAfterSeconds" in index:
+                await db.status_checks.drop_index(index["name"])
+                logger.info("Dropped TTL index %s on status_checks", index["name"])
+
+async def migrate_status_timestamps() -> bool:
+    # One-time conversion of legacy ISO string timestamps to BSON dates. An
+    # unreachable Mongo is raised for the caller to retry; False means the
+    # data itself failed and the migration waits for the next startup.
+    migration_id = "status_checks_bson_timestamps"
+    migrated = 0
+    try:
+        if await db.migrations.find_one({"_id": migration_id}):
+            return True
+        while True:
+            batch = await db.status_checks.find(
+                {"timestamp": {"$type": "string"}}, {"_id": 1, "timestamp": 1}
+            ).limit(TIMESTAMP_MIGRATION_BATCH_SIZE).to_list(TIMESTAMP_MIGRATION_BATCH_SIZE)
+            if not batch:
+                break
+            await db.status_checks.bulk_write([
+                UpdateOne(
+                    {"_id": check["_id"]},
+                    {"$set": {"timestamp": as_utc(datetime.fromisoformat(check["timestamp"]))}},
+                )
+                for check in batch
+            ], ordered=False)
+            migrated += len(batch)
+    except ConnectionFailure:
+        raise
+    except Exception:
+        # Left unmarked so the migration is retried on next startup
+        logger.exception("Status check timestamp migration failed after %d rows", migrated)
+        return False
+
+    try:
+        await db.migrations.insert_one({"_id": migration_id, "completedAt": datetime.now(timezone.utc)})
+    except DuplicateKeyError:
+        pass  # Another worker finished the same (idempotent) conversion
+    await mark_status_written("status")
+    logger.info("Migrated %d status check timestamps to BSON dates", migrated)
+    return True
+
+async def backfill_status_rollups(started: datetime):
+    # Seed the materialized rollups from checks written before live counting
+    # began; later writes are folded in by record_status_rollups. Every
+    # process counts its own writes from its start, so the cutoff is the
+    # earliest start on record. Matching on ObjectId creation time rather than
+    # timestamp keeps late-arriving batch items from being counted twice.
+    live_since = await db.migrations.find_one_and_update(
+        {"_id": "status_rollups_live_since"}, {"$min": {"at": started}},
+        upsert=True, return_document=ReturnDocument.AFTER,
+    )
+    cutoff = live_since["at"]
+    for width in STATUS_ROLLUP_WIDTHS:
+        migration_id = f"status_rollups_backfill_{width}"
+        try:
+            # Claim the backfill before merging: with several workers, exactly one runs it
+            await db.migrations.insert_one({"_id": migration_id, "state": "running", "startedAt": datetime.now(timezone.utc)})
+        except DuplicateKeyError:
+            # Done already, or another process owns it
+            continue
+        width_ms = width * 1000
+        epoch_ms = {"$toLong": "$timestamp"}
+        bucket_start = {"$toDate": {"$subtract": [epoch_ms, {"$mod": [epoch_ms, width_ms]}]}}
+        pipeline = [
+            {"$match": {"_id": {"$lt": ObjectId.from_datetime(cutoff)}}},
+            {"$group": {
+                "_id": {"w": {"$literal": width}, "c": "$client_name", "b": bucket_start},
+                "count": {"$sum": 1},
+                "last_seen": {"$max": "$timestamp"},
+            }},
+            {"$set": {"width": width, "client_name": "$_id.c", "bucket_start": "$_id.b"}},
+            {"$merge": {
+                "into": "status_rollups",
+                "on": "_id",
+                "whenMatched": [{"$set": {
+                    "count": {"$add": ["$count", "$$new.count"]},
+                    "last_seen": {"$max": ["$last_seen", "$$new.last_seen"]},
+                }}],
+                "whenNotMatched": "insert",
+            }},
+        ]
+        try:
+            await db.status_checks.aggregate(pipeline).to_list(None)
+        except Exception:
+            logger.exception("Status rollup backfill failed for %ds buckets", width)
+            try:
+                # Give up the claim so the next startup tries again
+                await db.migrations.delete_one({"_id": migration_id, "state": "running"})
+            except Exception:
+                logger.warning("Status rollup backfill for %ds buckets is still claimed; delete migration %s to rerun it", width, migration_id)
+            return
+        await db.migrations.update_one(
+            {"_id": migration_id}, {"$set": {"state": "done", "completedAt": datetime.now(timezone.utc)}},
+        )
+        await mark_status_written("rollup")
+        logger.info("Backfilled status rollups for %ds buckets", width)
+
+async def run_status_migrations(started: datetime):
+    while True:
+        try:
+            # Rollup backfill needs BSON date timestamps, so it runs after the migration
+            if await migrate_status_timestamps():
+                await backfill_status_rollups(started)
+            return
+        except ConnectionFailure as e:
+            logger.warning("Status migrations waiting for MongoDB: %s", e)
+            await asyncio.sleep(MONGO_SETUP_RETRY_SECONDS)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+async def watch_status_changes():
+    pipeline = [{"$match": {"operationType": "insert"}}]
+    while True:
+        try:
+            async with db.status_checks.watch(pipeline) as stream:
+                # Writes made while no stream was open were never seen here
+                read_cache.invalidate("status", "rollup")
+                status_broadcaster.local_publish = False
+                async for change in stream:
+                    # Inserts by other processes too: drop cached pages and bump validators
+                    read_cache.invalidate("status", "rollup")
+                    status_broadcaster.publish([change["fullDocument"]])
+        except OperationFailure as e:
+            # Standalone mongod has no change streams
+            logger.warning("Status change stream unavailable, publishing locally: %s", e)
+            status_broadcaster.local_publish = True
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Status change stream failed, reconnecting")
+            status_broadcaster.local_publish = True
+            await asyncio.sleep(5)
@@ -11,20 +11,55 @@ Requirements:
 
 Usage:
     python exhaustive_crawler.py --base-url http://localhost:3000
+    python exhaustive_crawler.py --max-depth 4              # follow longer click paths
+    python exhaustive_crawler.py --mode scripted            # legacy hand-written capture tables
+    python exhaustive_crawler.py --incremental              # skip states whose DOM is unchanged
+    python exhaustive_crawler.py --concurrency 4            # one browser context per config
+    python exhaustive_crawler.py --mode scripted --concurrency 8 --split-sections
+    python exhaustive_crawler.py --shard 2/3                # this machine's third of the jobs
+    python exhaustive_crawler.py --shard 2/3 --resume       # continue after a crash
+    python exhaustive_crawler.py --merge                    # combine shard reports
+    python exhaustive_crawler.py --format webp --thumbnails 320
+    python exhaustive_crawler.py --enforce-budget           # exit 1 if a state is over budget
+    python exhaustive_crawler.py --check-budget             # re-check PERF_TIMINGS.json only
+    python exhaustive_crawler.py --fixtures record          # save API responses from a live node
+    python exhaustive_crawler.py --fixtures replay          # serve them back, no backend needed
 
 Output:
     Screenshots saved to: ./desktop_dark/, ./desktop_light/, ./mobile_dark/, ./mobile_light/
+    Thumbnails (--thumbnails): ./<folder>/thumbs/
     Coverage report: ./COVERAGE_REPORT.json
+    Discovered interaction graph: ./INTERACTION_GRAPH.json
+    State hashes for incremental runs: ./CAPTURE_MANIFEST.json
+    Checkpoint journal: ./CRAWL_JOURNAL.jsonl
+    Per-state timings and browser metrics: ./PERF_TIMINGS.json
+    Chrome trace (chrome://tracing, Perfetto): ./PERF_TRACE.json
+    Budget check against ./PERF_BUDGET.json: ./PERF_BUDGET_REPORT.json
+    Recorded API responses: ./fixtures/API_FIXTURES.json.gz
+    With --shard i/n every file above is suffixed .shard-i-of-n until --merge
 """
 
+import argparse
 import asyncio
+import base64
+import contextvars
+import fnmatch
+import functools
+import gzip
+import hashlib
+import inspect
 import json
 import os
+import re
+import shutil
 import sys
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
 
 # Install playwright if needed
 try:
@@ -38,9 +73,18 @@ except ImportError:
 # Configuration
 BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
 OUTPUT_DIR = Path(__file__).parent
-SCREENSHOT_QUALITY = 80  # JPEG quality
+SCREENSHOT_QUALITY = 80  # JPEG/WebP quality
+SCREENSHOT_FORMAT = os.environ.get("CRAWL_FORMAT", "jpeg")  # jpeg, webp or png
+FORMAT_EXTENSIONS = {"jpeg": "jpg", "webp": "webp", "png": "png"}
+THUMBNAIL_WIDTH = 0  # Also write a downscaled copy to <folder>/thumbs/ when > 0
+WRITER_WORKERS = int(os.environ.get("CRAWL_WRITERS", "2"))  # Encode/write pool size
+WRITER_QUEUE = 16  # Captures held in memory awaiting a writer before capturing blocks
 TIMEOUT = 10000  # 10 seconds for most operations
-MODAL_WAIT = 500  # Wait after modal opens
+READY_TIMEOUT = 5000  # Upper bound for any readiness wait (ms)
+DOM_QUIET_MS = 150  # DOM must be mutation-free this long to count as settled
+NETWORK_IDLE_TIMEOUT = 2000  # The dashboard polls, so don't wait long for a quiet network
+MODAL_SELECTOR = "[role='dialog'], .fixed.inset-0"  # Radix dialogs and the full-screen overlays
+CONCURRENCY = int(os.environ.get("CRAWL_CONCURRENCY", "4"))  # Parallel browser contexts
 
 # Breakpoints
 BREAKPOINTS = {
@@ -51,30 +95,336 @@ BREAKPOINTS = {
 # Themes
 THEMES = ["dark", "light"]
 
-# Screenshot counter for unique naming
-screenshot_counter = {}
+# Incremental mode: states whose DOM hash matches CAPTURE_MANIFEST.json from the
+# previous run keep their existing screenshot instead of being re-captured
+INCREMENTAL = False
+MANIFEST_PATH = OUTPUT_DIR / "CAPTURE_MANIFEST.json"
+previous_manifest = {}
 
-# Tracking
-exercised = []
-failures = []
+# Sharding and checkpoints: with --shard i/n this process runs every n-th job,
+# and every capture is appended to the journal so --resume can pick up after
+# a crash without re-capturing finished states
+SHARD = None  # (i, n), 1-based
+RESUME = False
+journal = None  # Open journal file while crawling
+resumed_states = {}  # "folder/screenshot_id" -> hash, captured before the restart
 
+# API fixtures: "record" saves every backend response the dashboard fetches,
+# "replay" serves them from memory so crawls need no live node and every poll
+# returns the same data. Keys ignore the host, so fixtures from one node replay
+# against any frontend build.
+FIXTURE_MODE = None  # None, "record" or "replay"
+FIXTURE_STORE = OUTPUT_DIR / "fixtures" / "API_FIXTURES.json.gz"
+FIXTURE_URL_PATTERN = re.compile(r"/(api|cgi-bin)/")
+FIXTURE_VOLATILE_PARAMS = {"_", "t", "ts", "nocache", "cacheBust"}  # Cache busters, not part of the key
+fixtures = {}  # Fixture key -> recorded response
+fixture_stats = {"hits": 0, "misses": 0, "recorded": 0}
+fixture_misses = set()
 
-def get_screenshot_id(prefix: str, folder: str) -> str:
-    """Generate unique screenshot ID with sequential numbering"""
-    key = f"{folder}_{prefix}"
-    if key not in screenshot_counter:
-        screenshot_counter[key] = 0
-    screenshot_counter[key] += 1
-    return f"{screenshot_counter[key]:04d}_{prefix}"
+# Discovery mode (default): the crawl is driven by a graph built breadth-first
+# from the [data-testid] elements found in each state. Scripted mode walks the
+# hand-written tables in capture_all_for_config instead.
+CRAWL_MODE = "discover"
+MAX_DEPTH = int(os.environ.get("CRAWL_MAX_DEPTH", "3"))  # Clicks from a route's landing state
+MAX_STATES = int(os.environ.get("CRAWL_MAX_STATES", "150"))  # Per config, bounds runaway widgets
+GRAPH_PATH = OUTPUT_DIR / "INTERACTION_GRAPH.json"
+SKIP_TESTIDS = {"theme-toggle-btn"}  # Theme is fixed per config
+# Never clicked during discovery: closes lead back to a known state, the rest mutate data
+SKIP_TESTID_PATTERN = re.compile(r"(^|-)(close|dismiss|cancel|delete|remove|clear|reset|logout|send|submit|confirm)(-|$)")
 
+# Sections of capture_all_for_config, in crawl order. With --split-sections
+# each (config, section) pair becomes its own job in the worker pool.
+SECTIONS = [
+    "home", "overflow", "logs", "community", "help",
+    "admin", "audit", "status", "tools", "entertainment",
+]
 
+
+class CrawlResult:
+    """Exercised states, failures and screenshot numbering for one worker job.
+
+    Each job in the pool owns its own result so workers never share mutable
+    state; results are merged once every job has finished.
+    """
+
+    def __init__(self):
+        self.screenshot_counter = {}
+        self.exercised = []
+        self.failures = []
+        self.state_hashes = {}  # "folder/screenshot_id" -> DOM hash
+        self.reused = set()  # "folder/screenshot_id" keys skipped as unchanged
+        self.graphs = {}  # folder -> discovered interaction graph
+        self.screenshot_counts = {}  # folder -> screenshots on disk for this run
+        self.timings = []  # One row per captured state: where the time went, browser metrics
+        self.spans = []  # Chrome trace events for this job
+        self.trace_tid = 0  # Trace lane of the job
+        self._pending = {}  # Category -> seconds spent since the last captured state
+        self._open = 0  # Timed steps in progress, so nested timed steps aren't counted twice
+        self._last_state = time.perf_counter()
+    
+    def get_screenshot_id(self, prefix: str, folder: str) -> str:
+        """Generate unique screenshot ID with sequential numbering"""
+        key = f"{folder}_{prefix}"
+        if key not in self.screenshot_counter:
+            self.screenshot_counter[key] = 0
+        self.screenshot_counter[key] += 1
+        return f"{self.screenshot_counter[key]:04d}_{prefix}"
+
+    def merge(self, other: "CrawlResult") -> None:
+        """Fold another job's result into this one"""
+        self.exercised.extend(other.exercised)
+        self.failures.extend(other.failures)
+        for key, count in other.screenshot_counter.items():
+            self.screenshot_counter[key] = max(self.screenshot_counter.get(key, 0), count)
+        self.state_hashes.update(other.state_hashes)
+        self.reused |= other.reused
+        self.graphs.update(other.graphs)
+        for folder, count in other.screenshot_counts.items():
+            self.screenshot_counts[folder] = self.screenshot_counts.get(folder, 0) + count
+        self.timings.extend(other.timings)
+        self.spans.extend(other.spans)
+    
+    def count_screenshot(self, folder: str) -> None:
+        self.screenshot_counts[folder] = self.screenshot_counts.get(folder, 0) + 1
+    
+    def to_dict(self) -> dict:
+        return {
+            "screenshot_counter": self.screenshot_counter,
+            "exercised": self.exercised,
+            "failures": self.failures,
+            "state_hashes": self.state_hashes,
+            "reused": sorted(self.reused),
+            "graphs": self.graphs,
+            "screenshot_counts": self.screenshot_counts,
+            "timings": self.timings,
+            "spans": self.spans,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "CrawlResult":
+        result = cls()
+        result.screenshot_counter = data.get("screenshot_counter", {})
+        result.exercised = data.get("exercised", [])
+        result.failures = data.get("failures", [])
+        result.state_hashes = data.get("state_hashes", {})
+        result.reused = set(data.get("reused", []))
+        result.graphs = data.get("graphs", {})
+        result.screenshot_counts = data.get("screenshot_counts", {})
+        result.timings = data.get("timings", [])
+        result.spans = data.get("spans", [])
+        return result
+    
+    def record_span(self, cat: str, name: str, started: float, ended: float, label=None) -> None:
+        """Add a complete ("X") trace event; times are perf_counter() seconds"""
+        event = {
+            "name": name, "cat": cat, "ph": "X", "pid": SHARD[0] if SHARD else 1, "tid": self.trace_tid,
+            "ts": round((started - trace_epoch) * 1e6), "dur": round((ended - started) * 1e6),
+        }
+        if label is not None:
+            event["args"] = {"target": str(label)}
+        self.spans.append(event)
+    
+    def record_state(self, state_key: str, capture: str, screenshot_started: float, metrics: Optional[dict]) -> None:
+        """Close the timing row of a captured state and start the next one"""
+        now = time.perf_counter()
+        row = {"state": state_key, "capture": capture}
+        for cat in TIMED_CATEGORIES:
+            row[f"{cat}_ms"] = round(self._pending.get(cat, 0.0) * 1000, 1)
+        # Trigger to settled state: for a modal, click until it is open and idle
+        row["interactive_ms"] = round(sum(row[f"{cat}_ms"] for cat in TIMED_CATEGORIES), 1)
+        row["screenshot_ms"] = round((now - screenshot_started) * 1000, 1)
+        row["total_ms"] = round((now - self._last_state) * 1000, 1)
+        row["browser"] = metrics
+        self.timings.append(row)
+        self.spans.append({
+            "name": state_key, "cat": "state", "ph": "i", "s": "t", "pid": SHARD[0] if SHARD else 1,
+            "tid": self.trace_tid, "ts": round((now - trace_epoch) * 1e6), "args": metrics or {},
+        })
+        self._pending = {}
+        self._last_state = now
+
+
+# Timing instrumentation. The job's CrawlResult lives in a context variable so
+# helpers like safe_click can record spans without threading it through;
+# each pool worker is its own task, so jobs never see each other's result.
+current_result = contextvars.ContextVar("current_result", default=None)
+trace_epoch = time.perf_counter()  # Reset when a crawl starts
+TIMED_CATEGORIES = ["navigate", "theme", "click", "wait"]  # Columns of the per-state table
+BUDGET_PATH = OUTPUT_DIR / "PERF_BUDGET.json"
+
+
+def traced(cat: str, label: Optional[str] = None):
+    """Record every call of an async crawler step as a trace span.
+
+    `label` names the argument shown as the span's target. Time in
+    TIMED_CATEGORIES also counts towards the next captured state, outermost
+    timed step only: a click's own readiness wait is click time, not wait
+    time. Untimed wrappers such as "modal" don't hide the steps inside them.
+    """
+    def decorate(fn):
+        signature = inspect.signature(fn)
+        
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            result = current_result.get()
+            if result is None:
+                return await fn(*args, **kwargs)
+            timed = cat in TIMED_CATEGORIES
+            outermost = timed and result._open == 0
+            result._open += timed
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                ended = time.perf_counter()
+                result._open -= timed
+                if outermost:
+                    result._pending[cat] = result._pending.get(cat, 0) + ended - started
+                target = signature.bind_partial(*args, **kwargs).arguments.get(label) if label else None
+                result.record_span(cat, fn.__name__, started, ended, target)
+        return wrapper
+    return decorate
+
+
+# Collects long tasks and layout shifts from the moment each document starts;
+# installed as an init script on every crawl context
+PERF_OBSERVER_JS = """
+(() => {
+  const perf = window.__omegaPerf = {longTasks: 0, longTaskMs: 0, layoutShifts: 0, layoutShiftScore: 0};
+  const observe = (type, onEntry) => {
+    try {
+      new PerformanceObserver(list => list.getEntries().forEach(onEntry)).observe({type, buffered: true});
+    } catch (e) { /* entry type unsupported by this browser */ }
+  };
+  observe('longtask', e => { perf.longTasks++; perf.longTaskMs += e.duration; });
+  observe('layout-shift', e => {
+    if (!e.hadRecentInput) { perf.layoutShifts++; perf.layoutShiftScore += e.value; }
+  });
+  // Polling would fill the default 250-entry buffer; PERF_JS clears it per state
+  performance.setResourceTimingBufferSize(5000);
+})();
+"""
+
+# Reads the browser metrics for the current state and resets the counters, so
+# each state reports the long tasks, shifts and bytes caused by reaching it
+PERF_JS = """
+() => {
+  const perf = window.__omegaPerf || {};
+  const nav = performance.getEntriesByType('navigation')[0];
+  const fcp = performance.getEntriesByName('first-contentful-paint')[0];
+  const resources = performance.getEntriesByType('resource');
+  performance.clearResourceTimings();
+  const metrics = {
+    fcpMs: fcp ? Math.round(fcp.startTime) : null,
+    domNodes: document.getElementsByTagName('*').length,
+    requests: resources.length,
+    transferKB: Math.round(resources.reduce((sum, r) => sum + (r.transferSize || 0), 0) / 1024),
+    longTasks: perf.longTasks || 0,
+    longTaskMs: Math.round(perf.longTaskMs || 0),
+    layoutShifts: perf.layoutShifts || 0,
+    layoutShiftScore: +(perf.layoutShiftScore || 0).toFixed(4),
+    jsHeapMB: performance.memory ? +(performance.memory.usedJSHeapSize / 1048576).toFixed(1) : null,
+    navigation: nav ? {
+      domInteractiveMs: Math.round(nav.domInteractive),
+      domContentLoadedMs: Math.round(nav.domContentLoadedEventEnd),
+      loadMs: Math.round(nav.loadEventEnd),
+      transferKB: Math.round(nav.transferSize / 1024),
+    } : null,
+  };
+  Object.assign(perf, {longTasks: 0, longTaskMs: 0, layoutShifts: 0, layoutShiftScore: 0});
+  return metrics;
+}
+"""
+
+
+async def browser_metrics(page) -> Optional[dict]:
+    """Navigation timing, long tasks, layout shifts and JS heap for the current state"""
+    try:
+        return await page.evaluate(PERF_JS)
+    except Exception:
+        return None
+
+
+# Resolves once finite animations have finished (optional) and the DOM has
+# seen no mutations for quietMs, or when timeoutMs runs out
+SETTLE_JS = """
+async ([quietMs, timeoutMs, waitAnimations]) => {
+  const deadline = performance.now() + timeoutMs;
+  if (waitAnimations) {
+    // Spinners and pulses loop forever; only wait on animations that can finish
+    const finite = document.getAnimations().filter(
+      a => a.effect && a.effect.getTiming().iterations !== Infinity
+    );
+    await Promise.race([
+      Promise.all(finite.map(a => a.finished.catch(() => null))),
+      new Promise(resolve => setTimeout(resolve, timeoutMs)),
+    ]);
+  }
+  await new Promise(resolve => {
+    let timer;
+    const observer = new MutationObserver(() => {
+      clearTimeout(timer);
+      timer = setTimeout(done, quietMs);
+    });
+    const done = () => { observer.disconnect(); resolve(); };
+    observer.observe(document.documentElement, {
+      subtree: true, childList: true, attributes: true, characterData: true,
+    });
+    timer = setTimeout(done, quietMs);
+    setTimeout(done, Math.max(0, deadline - performance.now()));
+  });
+  return true;
+}
+"""
+
+
+@traced("wait")
+async def wait_ready(page, *conditions: str, selector: Optional[str] = None,
+                     timeout: int = READY_TIMEOUT) -> bool:
+    """Wait until the UI settles instead of sleeping a fixed time.
+
+    Conditions run in this order and share one timeout budget:
+        network     - no requests in flight (capped at NETWORK_IDLE_TIMEOUT)
+        visible     - `selector` is visible
+        animations  - finite CSS/Web animations have finished
+        dom         - no DOM mutations for DOM_QUIET_MS
+
+    Returns False if the budget ran out; callers carry on either way.
+    """
+    deadline = time.monotonic() + timeout / 1000
+    
+    def remaining() -> int:
+        # Playwright treats 0 as "no timeout", so never pass it
+        return max(1, int((deadline - time.monotonic()) * 1000))
+    
+    try:
+        if "network" in conditions:
+            try:
+                await page.wait_for_load_state("networkidle", timeout=min(NETWORK_IDLE_TIMEOUT, remaining()))
+            except PlaywrightTimeout:
+                pass  # Background polling never goes fully idle; the DOM check covers it
+        if "visible" in conditions and selector:
+            await page.locator(selector).first.wait_for(state="visible", timeout=remaining())
+        if "animations" in conditions or "dom" in conditions:
+            await page.evaluate(SETTLE_JS, [DOM_QUIET_MS, remaining(), "animations" in conditions])
+        return True
+    except PlaywrightTimeout:
+        return False
+
+
+async def wait_modal(page, selector: str = MODAL_SELECTOR) -> bool:
+    """Wait for a modal to be visible and finish its open animation"""
+    return await wait_ready(page, "visible", "animations", "dom", selector=selector)
+
+
+@traced("click", label="selector")
 async def safe_click(page, selector: str, timeout: int = TIMEOUT) -> bool:
     """Safely click an element, returning success status"""
     try:
         elem = page.locator(selector).first
         await elem.wait_for(state="visible", timeout=timeout)
         await elem.click()
-        await page.wait_for_timeout(300)
+        await wait_ready(page, "dom")
         return True
     except PlaywrightTimeout:
         return False
@@ -83,28 +433,187 @@ async def safe_click(page, selector: str, timeout: int = TIMEOUT) -> bool:
         return False
 
 
-async def safe_screenshot(page, folder: str, name: str, full_page: bool = False) -> str:
+# Hashes what determines the pixels of the current state: the serialized DOM
+# (inline <style> included, stylesheet hrefs carry the build's content hash),
+# viewport and scroll position. Digit runs are masked so clocks and live
+# counters don't defeat reuse. cyrb53 runs in the page because crypto.subtle
+# is unavailable on plain-http Pi origins.
+STATE_HASH_JS = """
+(fullPage) => {
+  const text = [
+    document.documentElement.outerHTML.replace(/\\d+/g, '#'),
+    innerWidth, innerHeight, scrollX, scrollY, devicePixelRatio, fullPage,
+  ].join('|');
+  let h1 = 0xdeadbeef, h2 = 0x41c6ce57;
+  for (let i = 0; i < text.length; i++) {
+    const ch = text.charCodeAt(i);
+    h1 = Math.imul(h1 ^ ch, 2654435761);
+    h2 = Math.imul(h2 ^ ch, 1597334677);
+  }
+  h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+  h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+  return (4294967296 * (2097151 & h2) + (h1 >>> 0)).toString(16);
+}
+"""
+
+
+async def hash_state(page, full_page: bool = False) -> Optional[str]:
+    """Hash the current UI state, or None if the page can't be serialized"""
+    try:
+        return await page.evaluate(STATE_HASH_JS, full_page)
+    except Exception:
+        return None
+
+
+def needs_transcode() -> bool:
+    """Whether captures go through Pillow; Playwright itself only encodes JPEG and PNG"""
+    return SCREENSHOT_FORMAT == "webp" or THUMBNAIL_WIDTH > 0
+
+
+def write_capture(data: bytes, path: str, fmt: str, quality: int, transcode: bool,
+                  thumb_path: Optional[str] = None, thumb_width: int = 0) -> None:
+    """Encode a capture and write it atomically. Runs on the writer pool.
+
+    Files appear under their final name only once complete, so --resume never
+    mistakes a half-written file for a finished capture.
+    """
+    def save(image, target: str) -> None:
+        tmp = target + ".tmp"
+        options = {"quality": quality} if fmt in ("jpeg", "webp") else {"optimize": True}
+        image.save(tmp, format=fmt.upper(), **options)
+        os.replace(tmp, target)
+    
+    if not transcode:
+        # Playwright already encoded the target format
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return
+    
+    import io
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        save(image, path)
+        if thumb_path and image.width > thumb_width:
+            height = round(image.height * thumb_width / image.width)
+            os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+            save(image.resize((thumb_width, height), Image.LANCZOS), thumb_path)
+
+
+class CaptureWriter:
+    """Bounded pipeline that encodes and writes captures off the event loop.
+
+    Plain writes go to a thread pool; Pillow transcodes (WebP, thumbnails) go
+    to a process pool. At most WRITER_QUEUE captures wait in memory; beyond
+    that, submit() blocks the capturing job until a writer frees up.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None):
+        # Read at call time so --writers (which reassigns the global) applies
+        self.workers = max(1, WRITER_WORKERS if workers is None else workers)
+        self.transcode = needs_transcode()
+        pool_class = ProcessPoolExecutor if self.transcode else ThreadPoolExecutor
+        self.pool = pool_class(max_workers=self.workers)
+        self.slots = asyncio.Semaphore(WRITER_QUEUE if queue_size is None else queue_size)
+        self.pending = set()
+    
+    async def submit(self, result: CrawlResult, folder: str, state_key: str, state_hash: Optional[str],
+                     data: bytes, filepath: Path) -> None:
+        await self.slots.acquire()
+        thumb_path = None
+        if THUMBNAIL_WIDTH > 0:
+            thumb_path = str(filepath.parent / "thumbs" / filepath.name)
+        task = asyncio.create_task(self._write(result, folder, state_key, state_hash, data, filepath, thumb_path))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+    
+    async def _write(self, result, folder, state_key, state_hash, data, filepath, thumb_path) -> None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self.pool, write_capture, data, str(filepath), SCREENSHOT_FORMAT,
+                SCREENSHOT_QUALITY, self.transcode, thumb_path, THUMBNAIL_WIDTH,
+            )
+            result.count_screenshot(folder)
+            # Journal only once the file is complete on disk
+            journal_append({"event": "capture", "state": state_key, "hash": state_hash})
+        except Exception as e:
+            print(f"    ✗ Write failed: {filepath.name}: {e}")
+            result.failures.append({"id": state_key, "reason": f"Write failed: {e}", "folder": folder})
+        finally:
+            self.slots.release()
+    
+    async def close(self) -> None:
+        """Wait for every queued capture to land, then stop the pool"""
+        while self.pending:
+            await asyncio.gather(*list(self.pending))
+        self.pool.shutdown()
+
+
+writer = None  # CaptureWriter while crawling
+
+
+async def safe_screenshot(page, result: CrawlResult, folder: str, name: str, full_page: bool = False,
+                          state_hash: Optional[str] = None) -> str:
     """Take screenshot with error handling and immediate persistence"""
     folder_path = OUTPUT_DIR / folder
     folder_path.mkdir(parents=True, exist_ok=True)
     
-    screenshot_id = get_screenshot_id(name, folder)
-    filepath = folder_path / f"{screenshot_id}.jpg"
+    screenshot_id = result.get_screenshot_id(name, folder)
+    filepath = folder_path / f"{screenshot_id}.{FORMAT_EXTENSIONS[SCREENSHOT_FORMAT]}"
+    state_key = f"{folder}/{screenshot_id}"
+    started = time.perf_counter()
     
-    try:
-        await page.screenshot(
-            path=str(filepath),
-            type="jpeg",
-            quality=SCREENSHOT_QUALITY,
-            full_page=full_page
-        )
-        print(f"    ✓ Saved: {filepath.name}")
+    def done(capture: str) -> str:
+        result.record_span("screenshot", capture, started, time.perf_counter(), state_key)
+        result.record_state(state_key, capture, started, metrics)
         return screenshot_id
+    
+    try:
+        # Read (and reset) first so the numbers belong to reaching this state
+        metrics = await browser_metrics(page)
+        
+        if state_key in resumed_states and filepath.exists():
+            # Captured before a crash; --resume only walks past it
+            result.state_hashes[state_key] = resumed_states[state_key]
+            result.count_screenshot(folder)
+            print(f"    = Resumed: {filepath.name}")
+            return done("resumed")
+        
+        if state_hash is None:
+            state_hash = await hash_state(page, full_page)
+        if (INCREMENTAL and state_hash and filepath.exists()
+                and previous_manifest.get(state_key) == state_hash):
+            result.state_hashes[state_key] = state_hash
+            result.reused.add(state_key)
+            result.count_screenshot(folder)
+            print(f"    = Reused: {filepath.name}")
+            return done("reused")
+        
+        # Capture into memory; encoding beyond Playwright's and the disk
+        # write happen on the writer pool while the crawl moves on
+        if writer.transcode or SCREENSHOT_FORMAT == "png":
+            data = await page.screenshot(type="png", full_page=full_page)
+        else:
+            data = await page.screenshot(type="jpeg", quality=SCREENSHOT_QUALITY, full_page=full_page)
+        if state_hash:
+            result.state_hashes[state_key] = state_hash
+        await writer.submit(result, folder, state_key, state_hash, data, filepath)
+        print(f"    ✓ Queued: {filepath.name}")
+        return done("captured")
     except Exception as e:
         print(f"    ✗ Screenshot failed: {e}")
         return None
 
 
+@traced("navigate", label="url")
+async def navigate(page, url: str) -> None:
+    """page.goto, timed"""
+    await page.goto(url)
+
+
+@traced("theme", label="theme")
 async def set_theme(page, theme: str) -> None:
     """Set the theme by clicking the theme toggle button"""
     # Check current theme
@@ -115,43 +624,46 @@ async def set_theme(page, theme: str) -> None:
         toggle = page.locator("[data-testid='theme-toggle-btn']")
         if await toggle.is_visible():
             await toggle.click()
-            await page.wait_for_timeout(500)
+            await wait_ready(page, "animations", "dom")
             print(f"    Theme switched to {theme}")
     else:
         print(f"    Theme already {theme}")
 
 
 async def close_all_modals(page) -> None:
-    """Close any open modals by pressing Escape and clicking outside"""
-    for _ in range(3):  # Try multiple times
+    """Close any open modals by pressing Escape until none is visible"""
+    for _ in range(3):  # Nested modals need more than one Escape
         await page.keyboard.press("Escape")
-        await page.wait_for_timeout(200)
+        await wait_ready(page, "animations", "dom", timeout=1000)
+        if not await page.locator(MODAL_SELECTOR).first.is_visible():
+            break
 
 
-async def capture_home_states(page, folder: str) -> None:
+async def capture_home_states(page, result: CrawlResult, folder: str) -> None:
     """Capture home dashboard states"""
     print(f"  Home Dashboard ({folder})...")
     
     # Default state
-    await page.goto(f"{BASE_URL}/#/")
-    await page.wait_for_timeout(1000)
-    sid = await safe_screenshot(page, folder, "home_default")
+    await navigate(page, f"{BASE_URL}/#/")
+    await wait_ready(page, "network", "dom")
+    sid = await safe_screenshot(page, result, folder, "home_default")
     if sid:
-        exercised.append({"id": sid, "route": "/", "state": "default", "folder": folder})
+        result.exercised.append({"id": sid, "route": "/", "state": "default", "folder": folder})
     
     # Scroll to bottom
     await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-    await page.wait_for_timeout(500)
-    sid = await safe_screenshot(page, folder, "home_bottom")
+    await wait_ready(page, "dom")
+    sid = await safe_screenshot(page, result, folder, "home_bottom")
     if sid:
-        exercised.append({"id": sid, "route": "/", "state": "scrolled", "folder": folder})
+        result.exercised.append({"id": sid, "route": "/", "state": "scrolled", "folder": folder})
     
     # Scroll back up
     await page.evaluate("window.scrollTo(0, 0)")
-    await page.wait_for_timeout(300)
+    await wait_ready(page, "dom")
 
 
-async def capture_modal(page, folder: str, btn_selector: str, modal_name: str, 
+@traced("modal", label="modal_name")
+async def capture_modal(page, result: CrawlResult, folder: str, btn_selector: str, modal_name: str, 
                         close_selector: Optional[str] = None, 
                         tabs: list = None) -> None:
     """Capture a modal and optionally its tabs"""
@@ -159,19 +671,19 @@ async def capture_modal(page, folder: str, btn_selector: str, modal_name: str,
     
     # Click to open
     if not await safe_click(page, btn_selector):
-        failures.append({
+        result.failures.append({
             "id": modal_name.lower().replace(" ", "_"),
             "reason": f"Button {btn_selector} not found or not clickable",
             "folder": folder
         })
         return
     
-    await page.wait_for_timeout(MODAL_WAIT)
+    await wait_modal(page)
     
     # Capture modal default state
-    sid = await safe_screenshot(page, folder, f"modal_{modal_name.lower().replace(' ', '_')}")
+    sid = await safe_screenshot(page, result, folder, f"modal_{modal_name.lower().replace(' ', '_')}")
     if sid:
-        exercised.append({"id": sid, "route": "/", "modal": modal_name, "folder": folder})
+        result.exercised.append({"id": sid, "route": "/", "modal": modal_name, "folder": folder})
     
     # Capture tabs if specified
     if tabs:
@@ -181,15 +693,15 @@ async def capture_modal(page, folder: str, btn_selector: str, modal_name: str,
             tab_name = tab.get("name", tab_id)
             
             if await safe_click(page, tab_selector, timeout=3000):
-                await page.wait_for_timeout(400)
-                sid = await safe_screenshot(page, folder, f"modal_{modal_name.lower().replace(' ', '_')}_{tab_id}")
+                await wait_ready(page, "animations", "dom")
+                sid = await safe_screenshot(page, result, folder, f"modal_{modal_name.lower().replace(' ', '_')}_{tab_id}")
                 if sid:
-                    exercised.append({
+                    result.exercised.append({
                         "id": sid, "route": "/", "modal": modal_name, 
                         "tab": tab_name, "folder": folder
                     })
             else:
-                failures.append({
+                result.failures.append({
                     "id": f"{modal_name.lower()}_{tab_id}",
                     "reason": f"Tab selector {tab_selector} not found",
                     "folder": folder
@@ -201,10 +713,10 @@ async def capture_modal(page, folder: str, btn_selector: str, modal_name: str,
     else:
         await close_all_modals(page)
     
-    await page.wait_for_timeout(300)
+    await wait_ready(page, "animations", "dom")
 
 
-async def capture_tools(page, folder: str) -> None:
+async def capture_tools(page, result: CrawlResult, folder: str) -> None:
     """Capture all quick tools modals"""
     tools = [
         {"id": "quickguide", "name": "Quick Guide"},
@@ -223,30 +735,28 @@ async def capture_tools(page, folder: str) -> None:
         print(f"    {tool['name']}...")
         
         if await safe_click(page, selector):
-            await page.wait_for_timeout(MODAL_WAIT)
-            sid = await safe_screenshot(page, folder, f"tool_{tool['id']}")
+            await wait_modal(page)
+            sid = await safe_screenshot(page, result, folder, f"tool_{tool['id']}")
             if sid:
-                exercised.append({
+                result.exercised.append({
                     "id": sid, "route": "/", "modal": tool['name'], "folder": folder
                 })
             await close_all_modals(page)
         else:
-            failures.append({
+            result.failures.append({
                 "id": f"tool_{tool['id']}",
                 "reason": f"Tool button {selector} not found",
                 "folder": folder
             })
-        
-        await page.wait_for_timeout(200)
 
 
-async def capture_entertainment(page, folder: str) -> None:
+async def capture_entertainment(page, result: CrawlResult, folder: str) -> None:
     """Capture entertainment page and all tabs"""
     print(f"  Entertainment Page ({folder})...")
     
     # Navigate to entertainment
-    await page.goto(f"{BASE_URL}/#/entertainment")
-    await page.wait_for_timeout(1000)
+    await navigate(page, f"{BASE_URL}/#/entertainment")
+    await wait_ready(page, "network", "dom")
     
     tabs = [
         {"id": "overview", "name": "Overview"},
@@ -263,14 +773,14 @@ async def capture_entertainment(page, folder: str) -> None:
         print(f"    {tab['name']}...")
         
         if await safe_click(page, selector):
-            await page.wait_for_timeout(500)
-            sid = await safe_screenshot(page, folder, f"ent_{tab['id']}")
+            await wait_ready(page, "animations", "dom")
+            sid = await safe_screenshot(page, result, folder, f"ent_{tab['id']}")
             if sid:
-                exercised.append({
+                result.exercised.append({
                     "id": sid, "route": "/entertainment", "tab": tab['name'], "folder": folder
                 })
         else:
-            failures.append({
+            result.failures.append({
                 "id": f"ent_{tab['id']}",
                 "reason": f"Tab selector {selector} not found",
                 "folder": folder
@@ -281,10 +791,10 @@ async def capture_entertainment(page, folder: str) -> None:
     try:
         if await movie_night_btn.is_visible(timeout=2000):
             await movie_night_btn.click()
-            await page.wait_for_timeout(MODAL_WAIT)
-            sid = await safe_screenshot(page, folder, "ent_movie_night_modal")
+            await wait_modal(page)
+            sid = await safe_screenshot(page, result, folder, "ent_movie_night_modal")
             if sid:
-                exercised.append({
+                result.exercised.append({
                     "id": sid, "route": "/entertainment", "modal": "MovieNight", "folder": folder
                 })
             await close_all_modals(page)
@@ -292,11 +802,11 @@ async def capture_entertainment(page, folder: str) -> None:
         pass  # Button may not be visible
     
     # Return to home
-    await page.goto(f"{BASE_URL}/#/")
-    await page.wait_for_timeout(500)
+    await navigate(page, f"{BASE_URL}/#/")
+    await wait_ready(page, "dom")
 
 
-async def capture_mobile_overflow(page, folder: str) -> None:
+async def capture_mobile_overflow(page, result: CrawlResult, folder: str) -> None:
     """Capture mobile overflow menu"""
     if "mobile" not in folder:
         return
@@ -307,10 +817,10 @@ async def capture_mobile_overflow(page, folder: str) -> None:
     try:
         if await overflow_btn.is_visible(timeout=2000):
             await overflow_btn.click()
-            await page.wait_for_timeout(400)
-            sid = await safe_screenshot(page, folder, "overflow_menu")
+            await wait_ready(page, "visible", "animations", "dom", selector="[data-testid='overflow-help-center']")
+            sid = await safe_screenshot(page, result, folder, "overflow_menu")
             if sid:
-                exercised.append({
+                result.exercised.append({
                     "id": sid, "route": "/", "dropdown": "overflow-menu", "folder": folder
                 })
             
@@ -318,10 +828,10 @@ async def capture_mobile_overflow(page, folder: str) -> None:
             help_btn = page.locator("[data-testid='overflow-help-center']")
             if await help_btn.is_visible(timeout=1000):
                 await help_btn.click()
-                await page.wait_for_timeout(MODAL_WAIT)
-                sid = await safe_screenshot(page, folder, "modal_help_from_overflow")
+                await wait_modal(page)
+                sid = await safe_screenshot(page, result, folder, "modal_help_from_overflow")
                 if sid:
-                    exercised.append({
+                    result.exercised.append({
                         "id": sid, "route": "/", "modal": "HelpCenter", 
                         "via": "overflow", "folder": folder
                     })
@@ -329,169 +839,669 @@ async def capture_mobile_overflow(page, folder: str) -> None:
             
             await close_all_modals(page)
     except Exception as e:
-        failures.append({
+        result.failures.append({
             "id": "overflow_menu",
             "reason": f"Overflow menu not accessible: {e}",
             "folder": folder
         })
 
 
-async def capture_all_for_config(page, breakpoint_name: str, theme: str) -> None:
-    """Capture all states for a specific breakpoint and theme combination"""
-    folder = f"{breakpoint_name}_{theme}"
+async def open_config(page, breakpoint_name: str, theme: str) -> None:
+    """Size the viewport, load the dashboard and apply the theme"""
     bp = BREAKPOINTS[breakpoint_name]
     
-    print(f"\n{'='*60}")
-    print(f"CRAWLING: {folder} ({bp['width']}x{bp['height']})")
-    print(f"{'='*60}")
-    
     # Set viewport
     await page.set_viewport_size({"width": bp["width"], "height": bp["height"]})
     
     # Navigate to home
-    await page.goto(f"{BASE_URL}/#/")
-    await page.wait_for_timeout(1000)
+    await navigate(page, f"{BASE_URL}/#/")
+    await wait_ready(page, "network", "dom")
     
-    # Set theme
+    # Set theme (persists in localStorage for the rest of the context)
     await set_theme(page, theme)
-    await page.wait_for_timeout(500)
+
+
+async def capture_all_for_config(page, result: CrawlResult, breakpoint_name: str, theme: str,
+                                 sections: Optional[list] = None) -> None:
+    """Capture all states (or the given sections) for a breakpoint and theme combination"""
+    folder = f"{breakpoint_name}_{theme}"
+    bp = BREAKPOINTS[breakpoint_name]
+    sections = sections or SECTIONS
+    
+    print(f"\n{'='*60}")
+    print(f"CRAWLING: {folder} ({bp['width']}x{bp['height']})"
+          + ("" if sections == SECTIONS else f" [{', '.join(sections)}]"))
+    print(f"{'='*60}")
+    
+    await open_config(page, breakpoint_name, theme)
     
     # 1. Home states
-    await capture_home_states(page, folder)
+    if "home" in sections:
+        await capture_home_states(page, result, folder)
     
     # 2. Mobile overflow (only for mobile)
-    await capture_mobile_overflow(page, folder)
+    if "overflow" in sections:
+        await capture_mobile_overflow(page, result, folder)
     
     # 3. LOGS Modal
-    btn = "[data-testid='logs-btn']" if breakpoint_name == "desktop" else "[data-testid='logs-btn-mobile']"
-    await capture_modal(
-        page, folder, btn, "LOGS",
-        close_selector="[data-testid='logs-close']",
-        tabs=[
-            {"id": "this_device", "selector": "[data-testid='tab-this-device']", "name": "This Device"},
-            {"id": "incidents", "selector": "[data-testid='tab-incidents']", "name": "Incidents"},
-            {"id": "all_nodes", "selector": "[data-testid='tab-all-nodes']", "name": "All Nodes"},
-        ]
-    )
+    if "logs" in sections:
+        btn = "[data-testid='logs-btn']" if breakpoint_name == "desktop" else "[data-testid='logs-btn-mobile']"
+        await capture_modal(
+            page, result, folder, btn, "LOGS",
+            close_selector="[data-testid='logs-close']",
+            tabs=[
+                {"id": "this_device", "selector": "[data-testid='tab-this-device']", "name": "This Device"},
+                {"id": "incidents", "selector": "[data-testid='tab-incidents']", "name": "Incidents"},
+                {"id": "all_nodes", "selector": "[data-testid='tab-all-nodes']", "name": "All Nodes"},
+            ]
+        )
     
     # 4. Community Hub Modal
-    btn = "[data-testid='community-btn']" if breakpoint_name == "desktop" else "[data-testid='community-btn-mobile']"
-    await capture_modal(
-        page, folder, btn, "CommunityHub",
-        close_selector="[data-testid='community-close']",
-        tabs=[
-            {"id": "overview", "selector": "[data-testid='tab-overview']", "name": "Overview"},
-            {"id": "analytics", "selector": "[data-testid='tab-analytics']", "name": "Analytics"},
-            {"id": "directory", "selector": "[data-testid='tab-directory']", "name": "Directory"},
-            {"id": "comms", "selector": "[data-testid='tab-comms']", "name": "Comms"},
-        ]
-    )
+    if "community" in sections:
+        btn = "[data-testid='community-btn']" if breakpoint_name == "desktop" else "[data-testid='community-btn-mobile']"
+        await capture_modal(
+            page, result, folder, btn, "CommunityHub",
+            close_selector="[data-testid='community-close']",
+            tabs=[
+                {"id": "overview", "selector": "[data-testid='tab-overview']", "name": "Overview"},
+                {"id": "analytics", "selector": "[data-testid='tab-analytics']", "name": "Analytics"},
+                {"id": "directory", "selector": "[data-testid='tab-directory']", "name": "Directory"},
+                {"id": "comms", "selector": "[data-testid='tab-comms']", "name": "Comms"},
+            ]
+        )
     
     # 5. Help Center (desktop only for full version, mobile via overflow)
-    if breakpoint_name == "desktop":
+    if "help" in sections and breakpoint_name == "desktop":
         await capture_modal(
-            page, folder, "[data-testid='help-center-btn']", "HelpCenter",
+            page, result, folder, "[data-testid='help-center-btn']", "HelpCenter",
             close_selector="[data-testid='help-center-close']"
         )
     
     # 6. Admin Console Modal
-    await capture_modal(
-        page, folder, "[data-testid='admin-console-btn']", "AdminConsole",
-        tabs=[
-            {"id": "fleet", "selector": "[data-testid='admin-section-fleet']", "name": "Fleet"},
-            {"id": "roster", "selector": "[data-testid='admin-section-roster']", "name": "Roster"},
-            {"id": "broadcast", "selector": "[data-testid='admin-section-broadcast']", "name": "Broadcast"},
-        ]
-    )
-    
-    # Close admin modal before capturing audit
-    await close_all_modals(page)
-    await page.wait_for_timeout(300)
+    if "admin" in sections:
+        await capture_modal(
+            page, result, folder, "[data-testid='admin-console-btn']", "AdminConsole",
+            tabs=[
+                {"id": "fleet", "selector": "[data-testid='admin-section-fleet']", "name": "Fleet"},
+                {"id": "roster", "selector": "[data-testid='admin-section-roster']", "name": "Roster"},
+                {"id": "broadcast", "selector": "[data-testid='admin-section-broadcast']", "name": "Broadcast"},
+            ]
+        )
+        
+        # Close admin modal before capturing audit
+        await close_all_modals(page)
     
     # 7. Admin Console - Audit Panel (separate modal)
-    print(f"    Admin Audit Panel...")
-    # Open admin first, then click audit
-    if await safe_click(page, "[data-testid='admin-console-btn']"):
-        await page.wait_for_timeout(MODAL_WAIT)
-        if await safe_click(page, "[data-testid='admin-section-audit']"):
-            await page.wait_for_timeout(MODAL_WAIT)
-            sid = await safe_screenshot(page, folder, "modal_admin_audit")
-            if sid:
-                exercised.append({
-                    "id": sid, "route": "/", "modal": "AdminConsole", 
-                    "panel": "Audit", "folder": folder
-                })
-        await close_all_modals(page)
+    if "audit" in sections:
+        print(f"    Admin Audit Panel...")
+        # Open admin first, then click audit
+        if await safe_click(page, "[data-testid='admin-console-btn']"):
+            await wait_modal(page)
+            if await safe_click(page, "[data-testid='admin-section-audit']"):
+                await wait_ready(page, "animations", "dom")
+                sid = await safe_screenshot(page, result, folder, "modal_admin_audit")
+                if sid:
+                    result.exercised.append({
+                        "id": sid, "route": "/", "modal": "AdminConsole", 
+                        "panel": "Audit", "folder": folder
+                    })
+            await close_all_modals(page)
     
     # 8. System Status Panel
-    await capture_modal(
-        page, folder, "[data-testid='system-status-btn']", "SystemStatus"
-    )
+    if "status" in sections:
+        await capture_modal(
+            page, result, folder, "[data-testid='system-status-btn']", "SystemStatus"
+        )
     
     # 9. Quick Tools (desktop only for efficiency, represents all themes)
-    if breakpoint_name == "desktop" and theme == "dark":
-        await capture_tools(page, folder)
+    if "tools" in sections and breakpoint_name == "desktop" and theme == "dark":
+        await capture_tools(page, result, folder)
     
     # 10. Entertainment Page
-    await capture_entertainment(page, folder)
+    if "entertainment" in sections:
+        await capture_entertainment(page, result, folder)
+    
+    print(f"\n  ✓ Completed {folder}" + ("" if sections == SECTIONS else f" [{', '.join(sections)}]"))
+
+
+# Lists the clickable [data-testid] elements of the current state in one round
+# trip. While a modal is open only the topmost one is in scope, since the
+# overlay swallows clicks on everything behind it.
+DISCOVER_JS = """
+(modalSelector) => {
+  const visible = el => {
+    const style = getComputedStyle(el);
+    return el.getClientRects().length > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+  };
+  const modals = [...document.querySelectorAll(modalSelector)].filter(visible);
+  const scope = modals.length ? modals[modals.length - 1] : document;
+  let modal = null;
+  if (modals.length) {
+    const heading = scope.querySelector('[aria-label], h1, h2, h3');
+    modal = scope.getAttribute('aria-label') || (heading && (heading.getAttribute('aria-label') || heading.textContent.trim().slice(0, 40))) || 'modal';
+  }
+  const actions = [];
+  const seen = new Set();
+  for (const el of scope.querySelectorAll('[data-testid]')) {
+    const testid = el.getAttribute('data-testid');
+    if (seen.has(testid) || !visible(el) || el.disabled || el.getAttribute('aria-disabled') === 'true') continue;
+    if (el.matches('input, textarea, select, [contenteditable="true"]')) continue;
+    const role = el.getAttribute('role') || '';
+    const clickable = el.matches('button, a[href], summary, [role=button], [role=tab], [role=menuitem], [role=link], [role=option], [tabindex]')
+      || getComputedStyle(el).cursor === 'pointer';
+    if (!clickable) continue;
+    seen.add(testid);
+    let kind = 'button';
+    if (role === 'tab' || el.hasAttribute('aria-selected') || /^(tab|nav|admin-section)-/.test(testid)) kind = 'tab';
+    else if (el.matches('a[href]') || role === 'link') kind = 'link';
+    else if (el.hasAttribute('aria-haspopup')) kind = 'menu';
+    actions.push({
+      testid, kind,
+      text: (el.getAttribute('aria-label') || el.textContent || '').trim().replace(/\\s+/g, ' ').slice(0, 40),
+      selected: el.getAttribute('aria-selected') === 'true' || el.getAttribute('data-state') === 'active',
+    });
+  }
+  return {route: location.hash.replace(/^#/, '') || '/', modal, modalDepth: modals.length, actions};
+}
+"""
+
+
+def testid_selector(testid: str) -> str:
+    return f"[data-testid='{testid}']"
+
+
+def state_name(route: str, path: list) -> str:
+    """Screenshot name for a discovered state, e.g. home_logs_btn_tab_incidents"""
+    prefix = "home" if route == "/" else route.strip("/").replace("/", "_")
+    return "_".join([prefix] + [re.sub(r"[^a-z0-9]+", "_", testid.lower()) for testid in path])
+
+
+async def discover_state(page) -> Optional[dict]:
+    """Route, open modal and clickable [data-testid] elements of the current state"""
+    try:
+        return await page.evaluate(DISCOVER_JS, MODAL_SELECTOR)
+    except Exception:
+        return None
+
+
+async def goto_state(page, route: str, path: list) -> bool:
+    """Reach a discovered state by reloading its route and replaying its clicks"""
+    await navigate(page, f"{BASE_URL}/#{route}")
+    await wait_ready(page, "network", "dom")
+    for testid in path:
+        if not await safe_click(page, testid_selector(testid), timeout=3000):
+            return False
+        await wait_ready(page, "animations", "dom")
+    return True
+
+
+async def canonical_hash(page) -> Optional[str]:
+    """Hash the current state scrolled to the top.
+
+    Clicking scrolls its target into view, which would otherwise make the
+    same state hash differently depending on what was clicked last.
+    """
+    try:
+        await page.evaluate("window.scrollTo(0, 0)")
+    except Exception:
+        return None
+    return await hash_state(page)
+
+
+async def discover_config(page, result: CrawlResult, breakpoint_name: str, theme: str,
+                          max_depth: Optional[int] = None, max_states: Optional[int] = None) -> None:
+    """Crawl a breakpoint and theme combination by breadth-first discovery.
+
+    Every state reached is hashed; a state seen before is not captured or
+    expanded again. New states are screenshotted as they are found and their
+    actions queued, so the graph drives the crawl instead of a selector table.
+    Actions already offered by the parent in the same modal scope (sibling
+    tabs, the header behind a dropdown) are not re-clicked from the child.
+    """
+    folder = f"{breakpoint_name}_{theme}"
+    bp = BREAKPOINTS[breakpoint_name]
+    max_depth = MAX_DEPTH if max_depth is None else max_depth
+    max_states = MAX_STATES if max_states is None else max_states
+    
+    print(f"\n{'='*60}")
+    print(f"DISCOVERING: {folder} ({bp['width']}x{bp['height']}, depth {max_depth}, max {max_states} states)")
+    print(f"{'='*60}")
+    
+    await open_config(page, breakpoint_name, theme)
+    
+    graph = {"routes": [], "states": {}}
+    known = {}  # state hash -> testids already offered in its modal scope
+    queue = deque()
+    
+    async def visit(route: str, path: list, parent: Optional[dict]) -> Optional[str]:
+        """Record the state the page is in now; returns its hash"""
+        state_hash = await canonical_hash(page)
+        info = await discover_state(page)
+        if state_hash is None or info is None:
+            return None
+        if info["route"] != route:
+            # Navigated: the new route's landing state starts a fresh path
+            route, path, parent = info["route"], [], None
+        if route not in graph["routes"]:
+            graph["routes"].append(route)
+        if state_hash in graph["states"]:
+            return state_hash
+        
+        same_scope = parent is not None and parent["modalDepth"] == info["modalDepth"]
+        inherited = known[parent["hash"]] if same_scope else set()
+        actions = [
+            {"testid": a["testid"], "kind": a["kind"], "text": a["text"], "leadsTo": None}
+            for a in info["actions"]
+            if a["testid"] not in inherited and a["testid"] not in SKIP_TESTIDS
+            and not SKIP_TESTID_PATTERN.search(a["testid"])
+            # A selected tab is the state we are already in
+            and not (a["kind"] == "tab" and a["selected"])
+        ]
+        known[state_hash] = inherited | {a["testid"] for a in info["actions"]}
+        
+        node = {
+            "hash": state_hash,
+            "route": route,
+            "path": path,
+            "modal": info["modal"],
+            "modalDepth": info["modalDepth"],
+            "screenshot": None,
+            "actions": actions,
+        }
+        graph["states"][state_hash] = node
+        
+        label = " > ".join(path) or route
+        print(f"    [{len(graph['states'])}] {label} ({len(actions)} actions)")
+        sid = await safe_screenshot(page, result, folder, state_name(route, path), state_hash=state_hash)
+        if sid:
+            node["screenshot"] = sid
+            entry = {"id": sid, "route": route, "path": path, "state": state_hash, "folder": folder}
+            if info["modal"]:
+                entry["modal"] = info["modal"]
+            result.exercised.append(entry)
+        if len(path) < max_depth:
+            queue.append(state_hash)
+        return state_hash
+    
+    root = await visit("/", [], None)
+    if root is None:
+        result.failures.append({"id": f"{folder}_discover", "reason": "Landing state could not be inspected", "folder": folder})
+        return
+    
+    while queue and len(graph["states"]) < max_states:
+        node = graph["states"][queue.popleft()]
+        for action in node["actions"]:
+            if len(graph["states"]) >= max_states:
+                break
+            # Get back to the node: cheap hash check first, replay only if needed
+            if await canonical_hash(page) != node["hash"]:
+                if not node["modalDepth"] and await page.locator(MODAL_SELECTOR).first.is_visible():
+                    await close_all_modals(page)
+                if await canonical_hash(page) != node["hash"] and not await goto_state(page, node["route"], node["path"]):
+                    result.failures.append({
+                        "id": state_name(node["route"], node["path"]),
+                        "reason": "Discovered state could not be replayed",
+                        "folder": folder
+                    })
+                    break
+            
+            if not await safe_click(page, testid_selector(action["testid"]), timeout=3000):
+                action["clickable"] = False
+                continue
+            await wait_ready(page, "animations", "dom")
+            action["leadsTo"] = await visit(node["route"], node["path"] + [action["testid"]], node)
+    
+    if queue:
+        print(f"  ! Stopped at {max_states} states with {len(queue)} unexpanded")
+    result.graphs[folder] = graph
+    print(f"\n  ✓ Discovered {len(graph['states'])} states in {folder}")
+
+
+def write_interaction_graph(result: CrawlResult, path: Optional[Path] = None) -> None:
+    """Write the interaction graph discovered by this run to INTERACTION_GRAPH.json"""
+    path = path or artifact_path(GRAPH_PATH)
+    graph = {
+        "generatedAt": datetime.now().isoformat() + "Z",
+        "note": "Auto-discovered by exhaustive_crawler.py (breadth-first over [data-testid] elements)",
+        "maxDepth": MAX_DEPTH,
+        "configs": dict(sorted(result.graphs.items())),
+    }
+    with open(path, "w") as f:
+        json.dump(graph, f, indent=2)
+    
+    print(f"  Interaction Graph updated: {path}")
+
+
+def build_jobs(split_sections: bool = False) -> list:
+    """List crawl jobs as (breakpoint, theme, sections) in crawl order"""
+    jobs = []
+    for bp_name in ["desktop", "mobile"]:
+        for theme in THEMES:
+            if split_sections:
+                jobs.extend((bp_name, theme, [section]) for section in SECTIONS)
+            else:
+                jobs.append((bp_name, theme, None))
+    return jobs
+
+
+def fixture_key(request) -> str:
+    """Host-independent key for an API request: method, path, stable query, body digest"""
+    url = urlsplit(request.url)
+    query = sorted((k, v) for k, v in parse_qsl(url.query, keep_blank_values=True)
+                   if k not in FIXTURE_VOLATILE_PARAMS)
+    key = f"{request.method} {url.path}" + (f"?{urlencode(query)}" if query else "")
+    body = request.post_data_buffer if request.method not in ("GET", "HEAD") else None
+    if body:
+        key += f" #{hashlib.sha1(body).hexdigest()[:12]}"
+    return key
+
+
+def load_fixtures(path: Path) -> dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)["entries"]
+
+
+def save_fixtures(path: Path, entries: dict) -> None:
+    """Write the fixture store atomically as gzipped JSON"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump({
+            "recordedAt": datetime.now().isoformat() + "Z",
+            "baseUrl": BASE_URL,
+            "entries": dict(sorted(entries.items())),
+        }, f, separators=(",", ":"))
+    shutil.move(str(tmp_path), str(path))
+
+
+async def route_fixture(route) -> None:
+    """page.route handler: record API responses or replay them from memory"""
+    request = route.request
+    key = fixture_key(request)
     
-    print(f"\n  ✓ Completed {folder}")
+    if FIXTURE_MODE == "replay":
+        entry = fixtures.get(key)
+        if entry is None:
+            # Offline there is nothing to fall back to; fail fast and report it
+            fixture_stats["misses"] += 1
+            fixture_misses.add(key)
+            await route.fulfill(status=503, content_type="application/json",
+                                headers={"access-control-allow-origin": "*"},
+                                body=json.dumps({"error": "no recorded fixture", "key": key}))
+            return
+        fixture_stats["hits"] += 1
+        body = base64.b64decode(entry["body"]) if entry.get("base64") else entry["body"].encode("utf-8")
+        await route.fulfill(status=entry["status"], body=body, headers={
+            "content-type": entry.get("contentType") or "application/octet-stream",
+            "access-control-allow-origin": "*",
+        })
+        return
+    
+    try:
+        response = await route.fetch()
+    except Exception:
+        await route.abort()
+        return
+    # First response wins, so the replayed crawl sees one consistent snapshot
+    if key not in fixtures:
+        body = await response.body()
+        entry = {"status": response.status, "contentType": response.headers.get("content-type")}
+        try:
+            entry["body"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body"], entry["base64"] = base64.b64encode(body).decode("ascii"), True
+        fixtures[key] = entry
+        fixture_stats["recorded"] += 1
+    await route.fulfill(response=response)
+
+
+def job_name(bp_name: str, theme: str, sections: Optional[list]) -> str:
+    return f"{bp_name}_{theme}" + (f"_{sections[0]}" if sections and len(sections) == 1 else "")
+
+
+def shard_jobs(jobs: list, shard: Optional[tuple]) -> list:
+    """Indexes of the jobs this shard runs: every n-th job starting at i"""
+    if not shard:
+        return list(range(len(jobs)))
+    i, n = shard
+    return [index for index in range(len(jobs)) if index % n == i - 1]
+
+
+def artifact_path(path: Path) -> Path:
+    """Per-shard name for an output file, so shards sharing a folder don't collide"""
+    if not SHARD:
+        return path
+    return path.with_name(f"{path.stem}.shard-{SHARD[0]}-of-{SHARD[1]}{path.suffix}")
+
+
+def journal_append(event: dict) -> None:
+    """Append one checkpoint line and flush it, so a crash loses at most the state in flight"""
+    if journal is None:
+        return
+    journal.write(json.dumps(event) + "\n")
+    journal.flush()
+
+
+def load_journal(path: Path) -> tuple:
+    """Finished job results and captured states recorded by an interrupted run"""
+    done, captured = {}, {}
+    if not path.exists():
+        return done, captured
+    with open(path) as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue  # Torn final line from the crash
+            if event.get("event") == "capture":
+                captured[event["state"]] = event.get("hash")
+            elif event.get("event") == "job_done":
+                done[event["job"]] = event["result"]
+    return done, captured
 
 
-async def run_crawler():
+async def run_job(browser, bp_name: str, theme: str, sections: Optional[list], tid: int = 1) -> CrawlResult:
+    """Run one job in its own isolated browser context"""
+    result = CrawlResult()
+    result.trace_tid = tid
+    result.spans.append({
+        "name": "thread_name", "ph": "M", "pid": SHARD[0] if SHARD else 1, "tid": tid,
+        "args": {"name": job_name(bp_name, theme, sections)},
+    })
+    current_result.set(result)
+    started = time.perf_counter()
+    bp = BREAKPOINTS[bp_name]
+    context = None
+    try:
+        # Inside the try: a context that fails to open fails this job, not the whole crawl
+        context = await browser.new_context(viewport={"width": bp["width"], "height": bp["height"]})
+        await context.add_init_script(PERF_OBSERVER_JS)
+        if FIXTURE_MODE:
+            await context.route(FIXTURE_URL_PATTERN, route_fixture)
+        page = await context.new_page()
+        
+        # Configure console logging
+        page.on("console", lambda msg: None)  # Suppress console logs
+        
+        if CRAWL_MODE == "discover":
+            await discover_config(page, result, bp_name, theme)
+        else:
+            await capture_all_for_config(page, result, bp_name, theme, sections)
+        # Crashed jobs are not marked done, so --resume runs them again
+        journal_append({"event": "job_done", "job": job_name(bp_name, theme, sections), "result": result.to_dict()})
+    except Exception as e:
+        job_id = job_name(bp_name, theme, sections)
+        print(f"\n  ✗ FAILED {job_id}: {e}")
+        result.failures.append({
+            "id": f"{job_id}_crawl",
+            "reason": str(e),
+            "folder": f"{bp_name}_{theme}"
+        })
+    finally:
+        if context is not None:
+            await context.close()
+        result.record_span("job", job_name(bp_name, theme, sections), started, time.perf_counter())
+    return result
+
+
+def load_capture_manifest() -> dict:
+    """Load state hashes recorded by the previous run"""
+    if not MANIFEST_PATH.exists():
+        return {}
+    try:
+        with open(MANIFEST_PATH) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"  ! Ignoring unreadable {MANIFEST_PATH.name}: {e}")
+        return {}
+    # Same DOM at a different encode quality still needs a fresh capture
+    if (manifest.get("screenshotQuality") != SCREENSHOT_QUALITY
+            or manifest.get("screenshotFormat", "jpeg") != SCREENSHOT_FORMAT):
+        return {}
+    return manifest.get("states", {})
+
+
+def write_capture_manifest(result: CrawlResult, path: Optional[Path] = None) -> None:
+    """Persist state hashes for the next incremental run"""
+    path = path or artifact_path(MANIFEST_PATH)
+    # Keep states this run didn't visit (e.g. a single-section run)
+    states = {**previous_manifest, **result.state_hashes}
+    manifest = {
+        "generatedAt": datetime.now().isoformat() + "Z",
+        "screenshotQuality": SCREENSHOT_QUALITY,
+        "screenshotFormat": SCREENSHOT_FORMAT,
+        "states": dict(sorted(states.items())),
+    }
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    shutil.move(str(tmp_path), str(path))
+
+
+async def run_crawler(concurrency: int = CONCURRENCY, split_sections: bool = False):
     """Main crawler execution"""
+    global previous_manifest, journal, resumed_states, writer, trace_epoch
+    trace_epoch = time.perf_counter()
+    if needs_transcode():
+        try:
+            import PIL  # noqa: F401 - only checked here, imported by the writer pool
+        except ImportError:
+            print("  ✗ --format webp and --thumbnails need Pillow: pip install pillow")
+            sys.exit(1)
+    previous_manifest = load_capture_manifest()
+    journal_path = artifact_path(OUTPUT_DIR / "CRAWL_JOURNAL.jsonl")
+    done, resumed_states = load_journal(journal_path) if RESUME else ({}, {})
+    
     print("\n" + "="*60)
     print("OMEGA DASHBOARD EXHAUSTIVE CRAWLER")
     print(f"Base URL: {BASE_URL}")
     print(f"Output: {OUTPUT_DIR}")
+    if CRAWL_MODE == "discover" and split_sections:
+        # Sections are the scripted tables; discovery has no fixed sections to split
+        print("  ! --split-sections only applies to --mode scripted, ignoring")
+        split_sections = False
+    print(f"Mode: {CRAWL_MODE}" + (f" (max depth {MAX_DEPTH}, max {MAX_STATES} states per config)" if CRAWL_MODE == "discover" else ""))
+    print(f"Concurrency: {concurrency}" + (" (split sections)" if split_sections else ""))
+    print(f"Output format: {SCREENSHOT_FORMAT}" + (f", {THUMBNAIL_WIDTH}px thumbnails" if THUMBNAIL_WIDTH > 0 else "")
+          + f", {WRITER_WORKERS} writers")
+    if SHARD:
+        print(f"Shard: {SHARD[0]}/{SHARD[1]}")
+    if INCREMENTAL:
+        print(f"Incremental: {len(previous_manifest)} known states")
+    if RESUME:
+        print(f"Resume: {len(done)} jobs done, {len(resumed_states)} states captured")
     print(f"Started: {datetime.now().isoformat()}")
     print("="*60)
     
+    all_jobs = build_jobs(split_sections)
+    jobs = [all_jobs[index] for index in shard_jobs(all_jobs, SHARD)]
+    results = [None] * len(jobs)
+    queue = asyncio.Queue()
+    for index, job in enumerate(jobs):
+        name = job_name(*job)
+        if name in done:
+            print(f"  = Skipping finished job {name}")
+            results[index] = CrawlResult.from_dict(done[name])
+        else:
+            queue.put_nowait((index, job))
+    
+    # A fresh run starts a new journal; --resume keeps appending to the old one
+    journal = open(journal_path, "a" if RESUME else "w")
+    journal_append({"event": "start", "at": datetime.now().isoformat() + "Z", "shard": SHARD, "mode": CRAWL_MODE})
+    
+    if FIXTURE_MODE == "replay":
+        if not FIXTURE_STORE.exists():
+            print(f"  ✗ No fixtures at {FIXTURE_STORE}; record them first with --fixtures record")
+            sys.exit(1)
+        fixtures.update(load_fixtures(FIXTURE_STORE))
+        print(f"  Replaying {len(fixtures)} API fixtures from {FIXTURE_STORE.name}")
+    
+    writer = CaptureWriter()
+    
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
-        page = await context.new_page()
-        
-        # Configure console logging
-        page.on("console", lambda msg: None)  # Suppress console logs
         
-        # Crawl all combinations
-        for bp_name in ["desktop", "mobile"]:
-            for theme in THEMES:
+        async def worker():
+            while True:
                 try:
-                    await capture_all_for_config(page, bp_name, theme)
-                except Exception as e:
-                    print(f"\n  ✗ FAILED {bp_name}_{theme}: {e}")
-                    failures.append({
-                        "id": f"{bp_name}_{theme}_crawl",
-                        "reason": str(e),
-                        "folder": f"{bp_name}_{theme}"
-                    })
+                    index, (bp_name, theme, sections) = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                results[index] = await run_job(browser, bp_name, theme, sections, tid=index + 1)
         
+        await asyncio.gather(*[worker() for _ in range(max(1, min(concurrency, queue.qsize())))])
         await browser.close()
+    # Every capture must be on disk (and journaled) before the reports
+    await writer.close()
+    writer = None
+    journal.close()
+    journal = None
+    
+    # Merge per-job results in job order so the report is deterministic
+    merged = CrawlResult()
+    for result in results:
+        merged.merge(result)
     
     # Generate coverage report
-    generate_coverage_report()
+    if FIXTURE_MODE == "record":
+        save_fixtures(artifact_path(FIXTURE_STORE), fixtures)
+        print(f"  Recorded {len(fixtures)} API fixtures to {artifact_path(FIXTURE_STORE)}")
+    fixture_report = None
+    if FIXTURE_MODE:
+        fixture_report = {"mode": FIXTURE_MODE, **fixture_stats, "missing": sorted(fixture_misses)}
+    
+    generate_coverage_report(merged, fixtures=fixture_report)
+    write_capture_manifest(merged)
+    if CRAWL_MODE == "discover":
+        write_interaction_graph(merged)
+    write_perf_reports(merged)
+    violations = report_budget(merged.timings)
     
     print("\n" + "="*60)
     print("CRAWL COMPLETE")
-    print(f"Total screenshots: {sum(len(list((OUTPUT_DIR / f).glob('*.jpg'))) for f in ['desktop_dark', 'desktop_light', 'mobile_dark', 'mobile_light'] if (OUTPUT_DIR / f).exists())}")
-    print(f"Exercised: {len(exercised)}")
-    print(f"Failures: {len(failures)}")
+    print(f"Total screenshots: {sum(merged.screenshot_counts.values())}")
+    print(f"Exercised: {len(merged.exercised)}")
+    print(f"Reused: {len(merged.reused)}")
+    print(f"Failures: {len(merged.failures)}")
+    print(f"Budget violations: {len(violations)}")
+    if FIXTURE_MODE == "replay":
+        print(f"Fixtures: {fixture_stats['hits']} served, {fixture_stats['misses']} missing")
     print("="*60 + "\n")
+    return violations
 
 
-def generate_coverage_report():
+def generate_coverage_report(result: CrawlResult, report_path: Optional[Path] = None, **extra):
     """Generate COVERAGE_REPORT.json"""
+    # Mark each state as freshly captured or reused from the previous run
+    exercised = [
+        {**entry, "capture": "reused" if f"{entry['folder']}/{entry['id']}" in result.reused else "captured"}
+        for entry in result.exercised
+    ]
+    failures = result.failures
     
-    # Count screenshots per folder
-    counts = {}
-    for folder in ["desktop_dark", "desktop_light", "mobile_dark", "mobile_light"]:
-        folder_path = OUTPUT_DIR / folder
-        if folder_path.exists():
-            counts[folder] = len(list(folder_path.glob("*.jpg")))
-        else:
-            counts[folder] = 0
+    # Screenshots per folder, counted as they were written, reused or resumed
+    counts = {folder: 0 for folder in ["desktop_dark", "desktop_light", "mobile_dark", "mobile_light"]}
+    counts.update(result.screenshot_counts)
     
     total = sum(counts.values())
     
@@ -500,116 +1510,265 @@ def generate_coverage_report():
         "total_discovered": len(exercised) + len(failures),
         "total_exercised": len(exercised),
         "total_failed": len(failures),
+        "total_reused": len(result.reused),
+        "incremental": INCREMENTAL,
+        "shard": f"{SHARD[0]}/{SHARD[1]}" if SHARD else None,
+        **extra,
         "screenshotCounts": counts,
         "exercised": exercised,
         "failures": failures,
         "coveragePercentage": round(len(exercised) / max(len(exercised) + len(failures), 1) * 100, 1)
     }
     
-    report_path = OUTPUT_DIR / "COVERAGE_REPORT.json"
+    report_path = report_path or artifact_path(OUTPUT_DIR / "COVERAGE_REPORT.json")
     with open(report_path, "w") as f:
         json.dump(report, f, indent=2)
     
     print(f"\n  Coverage Report saved to: {report_path}")
 
 
-def update_interaction_graph():
-    """Update INTERACTION_GRAPH.json with current selectors"""
-    graph = {
-        "generatedAt": datetime.now().isoformat() + "Z",
-        "note": "Auto-generated by exhaustive_crawler.py",
-        "interactionGraph": {
-            "/": {
-                "route": "/",
-                "component": "Dashboard",
-                "elements": [
-                    {"id": "logs-btn", "selector": "[data-testid='logs-btn']", "type": "button", "opensModal": "LOGS"},
-                    {"id": "logs-btn-mobile", "selector": "[data-testid='logs-btn-mobile']", "type": "button", "opensModal": "LOGS", "context": "mobile"},
-                    {"id": "community-btn", "selector": "[data-testid='community-btn']", "type": "button", "opensModal": "CommunityHub"},
-                    {"id": "community-btn-mobile", "selector": "[data-testid='community-btn-mobile']", "type": "button", "opensModal": "CommunityHub", "context": "mobile"},
-                    {"id": "help-center-btn", "selector": "[data-testid='help-center-btn']", "type": "button", "opensModal": "HelpCenter"},
-                    {"id": "entertainment-btn", "selector": "[data-testid='entertainment-btn']", "type": "button", "navigatesTo": "/entertainment"},
-                    {"id": "admin-console-btn", "selector": "[data-testid='admin-console-btn']", "type": "button", "opensModal": "AdminConsole"},
-                    {"id": "system-status-btn", "selector": "[data-testid='system-status-btn']", "type": "button", "opensModal": "SystemStatus"},
-                    {"id": "theme-toggle-btn", "selector": "[data-testid='theme-toggle-btn']", "type": "button", "togglesState": "theme"},
-                    {"id": "overflow-menu-btn", "selector": "[data-testid='overflow-menu-btn']", "type": "button", "opensDropdown": "overflow-menu", "context": "mobile"},
-                    {"id": "language-selector", "selector": "[data-testid='language-selector']", "type": "dropdown"},
-                    {"id": "tool-quickguide", "selector": "[data-testid='tool-quickguide']", "type": "button", "opensModal": "QuickGuide"},
-                    {"id": "tool-calculator", "selector": "[data-testid='tool-calculator']", "type": "button", "opensModal": "Calculator"},
-                    {"id": "tool-translator", "selector": "[data-testid='tool-translator']", "type": "button", "opensModal": "Translator"},
-                    {"id": "tool-sos", "selector": "[data-testid='tool-sos']", "type": "button", "opensModal": "SOSBeacon"},
-                    {"id": "tool-currency", "selector": "[data-testid='tool-currency']", "type": "button", "opensModal": "Currency"},
-                    {"id": "tool-dictionary", "selector": "[data-testid='tool-dictionary']", "type": "button", "opensModal": "Dictionary"},
-                    {"id": "tool-notes", "selector": "[data-testid='tool-notes']", "type": "button", "opensModal": "FieldNotes"},
-                ]
-            },
-            "/entertainment": {
-                "route": "/entertainment",
-                "component": "EntertainmentPage",
-                "elements": [
-                    {"id": "back-to-dashboard", "selector": "[data-testid='back-to-dashboard']", "type": "button", "navigatesTo": "/"},
-                    {"id": "nav-overview", "selector": "[data-testid='nav-overview']", "type": "tab"},
-                    {"id": "nav-movies", "selector": "[data-testid='nav-movies']", "type": "tab"},
-                    {"id": "nav-games", "selector": "[data-testid='nav-games']", "type": "tab"},
-                    {"id": "nav-music", "selector": "[data-testid='nav-music']", "type": "tab"},
-                    {"id": "nav-photos", "selector": "[data-testid='nav-photos']", "type": "tab"},
-                    {"id": "nav-vault", "selector": "[data-testid='nav-vault']", "type": "tab"},
-                    {"id": "nav-share", "selector": "[data-testid='nav-share']", "type": "tab"},
-                ]
-            }
-        },
-        "modals": {
-            "LOGS": {
-                "tabs": [
-                    {"id": "tab-this-device", "selector": "[data-testid='tab-this-device']"},
-                    {"id": "tab-incidents", "selector": "[data-testid='tab-incidents']"},
-                    {"id": "tab-all-nodes", "selector": "[data-testid='tab-all-nodes']"},
-                ],
-                "close": "[data-testid='logs-close']"
-            },
-            "CommunityHub": {
-                "tabs": [
-                    {"id": "tab-overview", "selector": "[data-testid='tab-overview']"},
-                    {"id": "tab-analytics", "selector": "[data-testid='tab-analytics']"},
-                    {"id": "tab-directory", "selector": "[data-testid='tab-directory']"},
-                    {"id": "tab-comms", "selector": "[data-testid='tab-comms']"},
-                ],
-                "close": "[data-testid='community-close']"
-            },
-            "AdminConsole": {
-                "sections": [
-                    {"id": "admin-section-fleet", "selector": "[data-testid='admin-section-fleet']"},
-                    {"id": "admin-section-roster", "selector": "[data-testid='admin-section-roster']"},
-                    {"id": "admin-section-broadcast", "selector": "[data-testid='admin-section-broadcast']"},
-                    {"id": "admin-section-audit", "selector": "[data-testid='admin-section-audit']"},
-                ]
-            },
-            "HelpCenter": {
-                "close": "[data-testid='help-center-close']"
-            },
-            "SystemStatus": {
-                "button": "[data-testid='system-status-btn']"
-            }
-        }
-    }
+def write_perf_reports(result: CrawlResult, timings_path: Optional[Path] = None,
+                       trace_path: Optional[Path] = None) -> None:
+    """Write PERF_TIMINGS.json and PERF_TRACE.json and print the slowest states"""
+    timings_path = timings_path or artifact_path(OUTPUT_DIR / "PERF_TIMINGS.json")
+    trace_path = trace_path or artifact_path(OUTPUT_DIR / "PERF_TRACE.json")
     
-    graph_path = OUTPUT_DIR / "INTERACTION_GRAPH.json"
-    with open(graph_path, "w") as f:
-        json.dump(graph, f, indent=2)
+    # Crawl time per step category, from the outermost spans of every job
+    totals = {}
+    for row in result.timings:
+        for key, value in row.items():
+            if key.endswith("_ms"):
+                totals[key] = round(totals.get(key, 0) + value, 1)
     
-    print(f"  Interaction Graph updated: {graph_path}")
+    with open(timings_path, "w") as f:
+        json.dump({
+            "generatedAt": datetime.now().isoformat() + "Z",
+            "states": len(result.timings),
+            "totals": totals,
+            "timings": result.timings,
+        }, f, indent=2)
+    with open(trace_path, "w") as f:
+        json.dump({"traceEvents": result.spans, "displayTimeUnit": "ms"}, f)
+    
+    slowest = sorted(result.timings, key=lambda row: row["total_ms"], reverse=True)[:15]
+    if slowest:
+        columns = ["total_ms"] + [f"{cat}_ms" for cat in TIMED_CATEGORIES] + ["screenshot_ms"]
+        print(f"\n  Slowest states (of {len(result.timings)}):")
+        print(f"    {'state':<48}" + "".join(f"{c[:-3]:>11}" for c in columns) + f"{'longtask':>10}{'shifts':>8}{'heapMB':>8}")
+        for row in slowest:
+            browser = row.get("browser") or {}
+            print(f"    {row['state'][:48]:<48}" + "".join(f"{row[c]:>11}" for c in columns)
+                  + f"{browser.get('longTaskMs', '-'):>10}{browser.get('layoutShifts', '-'):>8}{str(browser.get('jsHeapMB', '-')):>8}")
+    print(f"  Timings saved to: {timings_path}")
+    print(f"  Trace saved to: {trace_path} (open in chrome://tracing or ui.perfetto.dev)")
+
+
+def load_budget(path: Path) -> Optional[dict]:
+    """Load the committed performance budget, or None if there isn't one"""
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def budget_for(state_key: str, budget: dict) -> tuple:
+    """Limits that apply to a state: defaults, overridden by each matching rule in order"""
+    limits = dict(budget.get("defaults", {}))
+    labels = []
+    for rule in budget.get("rules", []):
+        if any(fnmatch.fnmatch(state_key, pattern) for pattern in rule["match"]):
+            limits.update(rule["budgets"])
+            labels.append(rule.get("label", rule["match"][0]))
+    return limits, labels
+
+
+def check_budgets(timings: list, budget: dict) -> list:
+    """Every (state, metric) whose measured value is over its budget"""
+    violations = []
+    for row in timings:
+        limits, labels = budget_for(row["state"], budget)
+        browser = row.get("browser") or {}
+        for metric, limit in limits.items():
+            value = row.get(metric, browser.get(metric))
+            if value is None or limit is None or value <= limit:
+                continue
+            violations.append({
+                "state": row["state"], "area": ", ".join(labels) or "default", "metric": metric,
+                "budget": limit, "actual": value, "overBy": f"+{(value - limit) / limit:.1%}" if limit else "new",
+            })
+    return violations
+
+
+def report_budget(timings: list, budget_path: Optional[Path] = None, report_path: Optional[Path] = None) -> list:
+    """Check timings against PERF_BUDGET.json, print what is over and write PERF_BUDGET_REPORT.json"""
+    budget_path = budget_path or BUDGET_PATH
+    report_path = report_path or artifact_path(OUTPUT_DIR / "PERF_BUDGET_REPORT.json")
+    budget = load_budget(budget_path)
+    if budget is None:
+        print(f"  No budget file at {budget_path}, skipping budget check")
+        return []
+    
+    violations = check_budgets(timings, budget)
+    with open(report_path, "w") as f:
+        json.dump({
+            "generatedAt": datetime.now().isoformat() + "Z",
+            "budget": str(budget_path),
+            "states_checked": len(timings),
+            "total_violations": len(violations),
+            "violations": violations,
+        }, f, indent=2)
+    
+    if not violations:
+        print(f"\n  ✓ All {len(timings)} states within budget ({budget_path.name})")
+        return violations
+    print(f"\n  ✗ {len(violations)} budget violations ({budget_path.name}):")
+    print(f"    {'state':<44}{'area':<24}{'metric':<18}{'budget':>9}{'actual':>9}{'over':>9}")
+    for v in sorted(violations, key=lambda v: (v["area"], v["state"], v["metric"])):
+        print(f"    {v['state'][:44]:<44}{v['area'][:23]:<24}{v['metric']:<18}{v['budget']:>9}{v['actual']:>9}{v['overBy']:>9}")
+    print(f"  Budget report: {report_path}")
+    return violations
+
+
+def merge_shard_reports(report_paths: list) -> list:
+    """Combine shard coverage reports (plus their manifests and graphs) into the unsharded files"""
+    global previous_manifest
+    previous_manifest = load_capture_manifest()
+    if not report_paths:
+        report_paths = sorted(OUTPUT_DIR.glob("COVERAGE_REPORT.shard-*.json"))
+    if not report_paths:
+        print(f"  ✗ No shard reports found in {OUTPUT_DIR}")
+        sys.exit(1)
+    
+    merged = CrawlResult()
+    shards, incremental = [], False
+    for report_path in map(Path, report_paths):
+        with open(report_path) as f:
+            report = json.load(f)
+        shards.append(report.get("shard") or report_path.name)
+        incremental = incremental or report.get("incremental", False)
+        
+        part = CrawlResult()
+        part.exercised = report.get("exercised", [])
+        part.failures = report.get("failures", [])
+        part.reused = {f"{e['folder']}/{e['id']}" for e in part.exercised if e.get("capture") == "reused"}
+        part.screenshot_counts = report.get("screenshotCounts", {})
+        # Sibling files written by the same shard
+        manifest_path = report_path.with_name(report_path.name.replace("COVERAGE_REPORT", MANIFEST_PATH.stem))
+        if manifest_path.exists():
+            with open(manifest_path) as f:
+                part.state_hashes = json.load(f).get("states", {})
+        graph_path = report_path.with_name(report_path.name.replace("COVERAGE_REPORT", GRAPH_PATH.stem))
+        if graph_path.exists():
+            with open(graph_path) as f:
+                part.graphs = json.load(f).get("configs", {})
+        # Shard traces keep their own pid lanes; timestamps are per-shard
+        timings_path = report_path.with_name(report_path.name.replace("COVERAGE_REPORT", "PERF_TIMINGS"))
+        if timings_path.exists():
+            with open(timings_path) as f:
+                part.timings = json.load(f).get("timings", [])
+        trace_path = report_path.with_name(report_path.name.replace("COVERAGE_REPORT", "PERF_TRACE"))
+        if trace_path.exists():
+            with open(trace_path) as f:
+                part.spans = json.load(f).get("traceEvents", [])
+        merged.merge(part)
+        print(f"  + {report_path.name}: {len(part.exercised)} exercised, {len(part.failures)} failed")
+    
+    generate_coverage_report(merged, OUTPUT_DIR / "COVERAGE_REPORT.json",
+                             incremental=incremental, shard=None, mergedFrom=shards)
+    write_capture_manifest(merged, MANIFEST_PATH)
+    if merged.graphs:
+        write_interaction_graph(merged, GRAPH_PATH)
+    if merged.timings:
+        write_perf_reports(merged, OUTPUT_DIR / "PERF_TIMINGS.json", OUTPUT_DIR / "PERF_TRACE.json")
+    
+    # Fixture stores recorded by sharded runs; first recording of a key wins
+    shard_stores = sorted(FIXTURE_STORE.parent.glob(f"{FIXTURE_STORE.stem}.shard-*{FIXTURE_STORE.suffix}"))
+    if shard_stores:
+        entries = {}
+        for store in shard_stores:
+            for key, entry in load_fixtures(store).items():
+                entries.setdefault(key, entry)
+        save_fixtures(FIXTURE_STORE, entries)
+        print(f"  Merged {len(entries)} API fixtures into {FIXTURE_STORE}")
+    return report_budget(merged.timings, report_path=OUTPUT_DIR / "PERF_BUDGET_REPORT.json")
+
+
+def parse_shard(value: str) -> tuple:
+    """argparse type for --shard i/n"""
+    try:
+        i, n = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/n, got {value!r}")
+    if not 1 <= i <= n:
+        raise argparse.ArgumentTypeError(f"shard index must be between 1 and {n}")
+    return i, n
 
 
 if __name__ == "__main__":
     # Parse args
-    import argparse
     parser = argparse.ArgumentParser(description="OMEGA Dashboard Exhaustive Crawler")
     parser.add_argument("--base-url", default=BASE_URL, help="Base URL of the app")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="Number of browser contexts crawling in parallel")
+    parser.add_argument("--split-sections", action="store_true",
+                        help="Split each config into per-section jobs for finer-grained parallelism")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reuse screenshots of states whose DOM hash is unchanged since the last run")
+    parser.add_argument("--mode", choices=["discover", "scripted"], default=CRAWL_MODE,
+                        help="Discover states from [data-testid] elements, or walk the scripted capture tables")
+    parser.add_argument("--max-depth", type=int, default=MAX_DEPTH,
+                        help="Longest click path followed from a route's landing state (discover mode)")
+    parser.add_argument("--max-states", type=int, default=MAX_STATES,
+                        help="Most states captured per config (discover mode)")
+    parser.add_argument("--format", choices=sorted(FORMAT_EXTENSIONS), default=SCREENSHOT_FORMAT,
+                        help="Screenshot output format (webp needs Pillow)")
+    parser.add_argument("--thumbnails", type=int, default=THUMBNAIL_WIDTH, metavar="WIDTH",
+                        help="Also write thumbnails this many pixels wide to <folder>/thumbs/ (needs Pillow)")
+    parser.add_argument("--writers", type=int, default=WRITER_WORKERS,
+                        help="Threads/processes encoding and writing captures")
+    parser.add_argument("--budget", default=str(BUDGET_PATH),
+                        help="Performance budget file checked after the crawl")
+    parser.add_argument("--enforce-budget", action="store_true",
+                        help="Exit 1 if any state is over budget (CI gating)")
+    parser.add_argument("--check-budget", action="store_true",
+                        help="Check the existing PERF_TIMINGS.json against the budget and exit")
+    parser.add_argument("--fixtures", choices=["record", "replay"], default=FIXTURE_MODE,
+                        help="Record API responses to the fixture store, or replay them without a backend")
+    parser.add_argument("--shard", type=parse_shard, default=None, metavar="I/N",
+                        help="Run only every N-th job, starting at job I (1-based)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip jobs and states already recorded in the checkpoint journal")
+    parser.add_argument("--merge", nargs="*", metavar="REPORT",
+                        help="Merge shard coverage reports (default: all COVERAGE_REPORT.shard-*.json) and exit")
     args = parser.parse_args()
     BASE_URL = args.base_url
+    INCREMENTAL = args.incremental
+    CRAWL_MODE = args.mode
+    MAX_DEPTH = args.max_depth
+    MAX_STATES = args.max_states
+    SHARD = args.shard
+    FIXTURE_MODE = args.fixtures
+    RESUME = args.resume
+    SCREENSHOT_FORMAT = args.format
+    THUMBNAIL_WIDTH = args.thumbnails
+    WRITER_WORKERS = args.writers
+    
+    BUDGET_PATH = Path(args.budget)
+    
+    if args.check_budget:
+        timings_path = artifact_path(OUTPUT_DIR / "PERF_TIMINGS.json")
+        if not timings_path.exists():
+            print(f"  ✗ No {timings_path.name} to check; run a crawl first")
+            sys.exit(1)
+        with open(timings_path) as f:
+            violations = report_budget(json.load(f)["timings"])
+        sys.exit(1 if violations else 0)
     
-    # Update interaction graph first
-    update_interaction_graph()
+    if args.merge is not None:
+        violations = merge_shard_reports(args.merge)
+        sys.exit(1 if violations and args.enforce_budget else 0)
     
     # Run crawler
-    asyncio.run(run_crawler())
+    violations = asyncio.run(run_crawler(args.concurrency, args.split_sections))
+    if violations and args.enforce_budget:
+        sys.exit(1)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+OMEGA Dashboard Visual Diff
+
+Compares a candidate crawl against a baseline crawl, screenshot by screenshot,
+and ranks the states that changed the most.
+
+Requirements:
+    pip install numpy pillow
+
+Usage:
+    python visual_diff.py --baseline /path/to/previous/baseline_export
+    python visual_diff.py --baseline old/ --candidate new/ --workers 8
+    python visual_diff.py --baseline old/ --fail-over 0.01   # exit 1 on regressions (CI)
+
+Output:
+    Diff masks saved to: ./visual_diff/<folder>/<name>.png
+    Ranked report: ./VISUAL_DIFF_REPORT.json
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:
+    print("Installing numpy and pillow...")
+    os.system("pip install numpy pillow")
+    import numpy as np
+    from PIL import Image
+
+
+# Configuration
+OUTPUT_DIR = Path(__file__).parent
+FOLDERS = ["desktop_dark", "desktop_light", "mobile_dark", "mobile_light"]
+PATTERNS = ["*.jpg", "*.webp", "*.png"]
+WORKERS = int(os.environ.get("DIFF_WORKERS", str(os.cpu_count() or 4)))
+PIXEL_THRESHOLD = 0.1  # Perceptual delta (0-1) above which a pixel counts as changed
+SSIM_WINDOW = 8  # Box window for the structural similarity map
+FAIL_OVER = 0.005  # Changed-pixel ratio above which a pair counts as a regression
+
+# Largest possible YIQ delta, used to normalize deltas into 0-1 (as pixelmatch does)
+MAX_YIQ_DELTA = 35215.0
+
+
+def load_rgb(path: Path) -> np.ndarray:
+    """Decode an image into an (H, W, 3) float32 array"""
+    with Image.open(path) as image:
+        return np.asarray(image.convert("RGB"), dtype=np.float32)
+
+
+def pad_to(array: np.ndarray, height: int, width: int) -> np.ndarray:
+    """Pad with black so both images of a pair share one shape"""
+    pad_h, pad_w = height - array.shape[0], width - array.shape[1]
+    if not pad_h and not pad_w:
+        return array
+    return np.pad(array, ((0, pad_h), (0, pad_w), (0, 0)))
+
+
+def yiq_delta(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Per-pixel perceptual color delta in YIQ space, normalized to 0-1.
+
+    Luma differences weigh more than chroma, so JPEG chroma noise stays
+    under the threshold while real layout and text changes do not.
+    """
+    d = a - b
+    y = d @ np.array([0.29889531, 0.58662247, 0.11448223], dtype=np.float32)
+    i = d @ np.array([0.59597799, -0.27417610, -0.32180189], dtype=np.float32)
+    q = d @ np.array([0.21147017, -0.52261711, 0.31114694], dtype=np.float32)
+    return (0.5053 * y * y + 0.299 * i * i + 0.1957 * q * q) / MAX_YIQ_DELTA
+
+
+def box_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """Mean over every window x window block, via a summed-area table"""
+    table = np.pad(x, ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    total = (table[window:, window:] - table[:-window, window:]
+             - table[window:, :-window] + table[:-window, :-window])
+    return total / (window * window)
+
+
+def ssim(a: np.ndarray, b: np.ndarray, window: int = SSIM_WINDOW) -> float:
+    """Mean structural similarity of the luma channels"""
+    luma = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    # Summed-area tables over large full-page shots need float64 headroom
+    x, y = (a @ luma).astype(np.float64), (b @ luma).astype(np.float64)
+    if min(x.shape) < window:
+        return 1.0 if np.array_equal(x, y) else 0.0
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    mu_x, mu_y = box_mean(x, window), box_mean(y, window)
+    var_x = box_mean(x * x, window) - mu_x * mu_x
+    var_y = box_mean(y * y, window) - mu_y * mu_y
+    cov = box_mean(x * y, window) - mu_x * mu_y
+    ssim_map = ((2 * mu_x * mu_y + c1) * (2 * cov + c2)) / ((mu_x ** 2 + mu_y ** 2 + c1) * (var_x + var_y + c2))
+    return float(ssim_map.mean())
+
+
+def write_mask(path: Path, base: np.ndarray, changed: np.ndarray) -> None:
+    """Changed pixels in red over a faded grayscale copy of the baseline"""
+    gray = base.mean(axis=2, keepdims=True) * 0.3 + 178
+    overlay = np.repeat(gray, 3, axis=2)
+    overlay[changed] = (255, 0, 0)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(overlay.astype(np.uint8)).save(path, optimize=True)
+
+
+def diff_pair(key: str, baseline: str, candidate: str, mask_path: Optional[str],
+              threshold: float = PIXEL_THRESHOLD) -> dict:
+    """Compare one screenshot pair. Runs inside a pool worker.
+
+    Only the summary travels back to the parent; the decoded arrays and the
+    mask never leave the worker.
+    """
+    started = time.perf_counter()
+    # Byte-identical files (the common case, and every reused incremental
+    # capture) need no decoding at all
+    if Path(baseline).read_bytes() == Path(candidate).read_bytes():
+        return {"key": key, "changed_pixels": 0, "changed_ratio": 0.0, "mean_abs_delta": 0.0,
+                "max_delta": 0.0, "ssim": 1.0, "resized": False, "bbox": None, "mask": None,
+                "ms": round((time.perf_counter() - started) * 1000, 1)}
+    base, cand = load_rgb(Path(baseline)), load_rgb(Path(candidate))
+    resized = base.shape != cand.shape
+    height, width = max(base.shape[0], cand.shape[0]), max(base.shape[1], cand.shape[1])
+    base, cand = pad_to(base, height, width), pad_to(cand, height, width)
+
+    delta = yiq_delta(base, cand)
+    changed = delta > threshold * threshold
+    changed_pixels = int(np.count_nonzero(changed))
+
+    entry = {
+        "key": key,
+        "changed_pixels": changed_pixels,
+        "changed_ratio": round(changed_pixels / changed.size, 6),
+        "mean_abs_delta": round(float(np.abs(base - cand).mean()), 4),
+        "max_delta": round(float(np.sqrt(delta.max())), 4),
+        "ssim": round(ssim(base, cand), 5),
+        "resized": resized,
+        "bbox": None,
+        "mask": None,
+    }
+    if changed_pixels:
+        rows, cols = np.flatnonzero(changed.any(axis=1)), np.flatnonzero(changed.any(axis=0))
+        entry["bbox"] = [int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1]
+        if mask_path:
+            write_mask(Path(mask_path), base, changed)
+            entry["mask"] = mask_path
+    entry["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return entry
+
+
+def collect(root: Path, folders: list) -> dict:
+    """Map "folder/name" to the screenshot path for every capture under root"""
+    found = {}
+    for folder in folders:
+        for pattern in PATTERNS:
+            for path in (root / folder).glob(pattern):
+                found[f"{folder}/{path.name}"] = path
+    return found
+
+
+def run_diff(baseline_dir: Path, candidate_dir: Path, out_dir: Path, workers: int = WORKERS,
+             threshold: float = PIXEL_THRESHOLD, fail_over: float = FAIL_OVER,
+             folders: Optional[list] = None) -> dict:
+    """Diff every screenshot present in both trees and write the ranked report"""
+    folders = folders or FOLDERS
+    baseline, candidate = collect(baseline_dir, folders), collect(candidate_dir, folders)
+    common = sorted(baseline.keys() & candidate.keys())
+
+    print("\n" + "="*60)
+    print("OMEGA Visual Diff")
+    print(f"Baseline:  {baseline_dir}")
+    print(f"Candidate: {candidate_dir}")
+    print(f"Pairs: {len(common)}, workers: {workers}")
+    print("="*60 + "\n")
+
+    started = time.perf_counter()
+    jobs = [
+        (key, str(baseline[key]), str(candidate[key]), str(out_dir / Path(key).with_suffix(".png")), threshold)
+        for key in common
+    ]
+    compared, errors = [], []
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [(job[0], pool.submit(diff_pair, *job)) for job in jobs]
+        for key, future in futures:
+            try:
+                entry = future.result()
+            except Exception as e:
+                errors.append({"key": key, "error": str(e)})
+                print(f"  ✗ {key}: {e}")
+                continue
+            entry["regression"] = entry["changed_ratio"] > fail_over
+            compared.append(entry)
+            if entry["changed_pixels"]:
+                print(f"  {'✗' if entry['regression'] else '~'} {key}: {entry['changed_ratio']:.2%} changed, ssim {entry['ssim']}")
+    elapsed = time.perf_counter() - started
+
+    # Worst first: share of changed pixels, then structural dissimilarity
+    compared.sort(key=lambda e: (-e["changed_ratio"], e["ssim"], e["key"]))
+    for rank, entry in enumerate(compared, 1):
+        entry["rank"] = rank
+
+    report = {
+        "generatedAt": datetime.now().isoformat() + "Z",
+        "baseline": str(baseline_dir),
+        "candidate": str(candidate_dir),
+        "pixelThreshold": threshold,
+        "failOver": fail_over,
+        "total_compared": len(compared),
+        "total_changed": sum(1 for e in compared if e["changed_pixels"]),
+        "total_regressions": sum(1 for e in compared if e["regression"]),
+        "elapsedSeconds": round(elapsed, 2),
+        "missing": sorted(baseline.keys() - candidate.keys()),
+        "added": sorted(candidate.keys() - baseline.keys()),
+        "errors": errors,
+        "ranked": compared,
+    }
+
+    report_path = OUTPUT_DIR / "VISUAL_DIFF_REPORT.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n" + "="*60)
+    print("DIFF COMPLETE")
+    print(f"Compared: {report['total_compared']} in {report['elapsedSeconds']}s")
+    print(f"Changed: {report['total_changed']}")
+    print(f"Regressions: {report['total_regressions']}")
+    print(f"Missing: {len(report['missing'])}, added: {len(report['added'])}")
+    print(f"Report: {report_path}")
+    print("="*60 + "\n")
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="OMEGA Dashboard Visual Diff")
+    parser.add_argument("--baseline", required=True, help="Crawl output to compare against")
+    parser.add_argument("--candidate", default=str(OUTPUT_DIR), help="Crawl output under test")
+    parser.add_argument("--out", default=str(OUTPUT_DIR / "visual_diff"), help="Directory for diff masks")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Processes decoding and diffing in parallel")
+    parser.add_argument("--threshold", type=float, default=PIXEL_THRESHOLD,
+                        help="Perceptual delta (0-1) above which a pixel counts as changed")
+    parser.add_argument("--fail-over", type=float, default=None,
+                        help="Exit 1 if any pair changes more than this pixel ratio")
+    parser.add_argument("--folders", nargs="+", default=FOLDERS, help="Config folders to compare")
+    args = parser.parse_args()
+
+    report = run_diff(Path(args.baseline), Path(args.candidate), Path(args.out), args.workers,
+                      args.threshold, FAIL_OVER if args.fail_over is None else args.fail_over, args.folders)
+    if args.fail_over is not None and report["total_regressions"]:
+        sys.exit(1)
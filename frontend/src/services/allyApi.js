@@ -4,6 +4,9 @@
 
 import config from '../config';
 
+// Messages kept per conversation; older ones are dropped from the cache
+const CHAT_CACHE_LIMIT = 500;
+
 class AllyApiService {
   constructor() {
     this.baseUrl = config.ally.apiBase;
@@ -13,7 +16,7 @@ class AllyApiService {
       nodes: null,
       nodesTimestamp: null,
       globalChat: [],
-      globalChatTimestamp: null,
+      globalChatCursor: null,
       dmChats: {},
       userStatus: null,
     };
@@ -110,6 +113,32 @@ class AllyApiService {
     throw lastError;
   }
 
+  /**
+   * Append a page of new messages to a cached conversation.
+   * Pages only hold messages after our cursor, so the only possible repeats
+   * are our own optimistic copies (no seq yet), which the server copy replaces.
+   * Messages sent by this node (`nodeId`) are marked with the views' 'me' sender.
+   */
+  mergeChatPage(messages, newMessages, nodeId) {
+    if (newMessages.length === 0) {
+      return messages;
+    }
+    const merged = [...messages];
+    const pending = new Map();
+    merged.forEach((m, idx) => {
+      if (m.seq === undefined) pending.set(m.id, idx);
+    });
+    newMessages.forEach(message => {
+      const m = nodeId && message.sender === nodeId ? { ...message, sender: 'me' } : message;
+      if (pending.has(m.id)) {
+        merged[pending.get(m.id)] = m;
+      } else {
+        merged.push(m);
+      }
+    });
+    return merged.slice(-CHAT_CACHE_LIMIT);
+  }
+
   shouldUseMock() {
     return config.features.enableMockData || !this.isOnline;
   }
@@ -172,21 +201,17 @@ class AllyApiService {
   async getGlobalChat() {
     if (!config.features.enableMockData) {
       try {
-        const params = this.cache.globalChatTimestamp 
-          ? { since: this.cache.globalChatTimestamp.toISOString() }
+        const params = this.cache.globalChatCursor !== null
+          ? { since: this.cache.globalChatCursor }
           : {};
         const url = this.buildUrl('/api/ally/chat/global', params);
         const response = await this.retryFetch(url);
         const data = await response.json();
         
         // Merge new messages with cache
-        const newMessages = data.messages || data;
-        if (newMessages.length > 0) {
-          const existingIds = new Set(this.cache.globalChat.map(m => m.id));
-          const uniqueNew = newMessages.filter(m => !existingIds.has(m.id));
-          this.cache.globalChat = [...this.cache.globalChat, ...uniqueNew];
-        }
-        this.cache.globalChatTimestamp = new Date();
+        this.cache.globalChat = this.mergeChatPage(this.cache.globalChat, data.messages || data, data.node_id);
+        // Sequence cursor from the server; backends without one get a timestamp
+        this.cache.globalChatCursor = data.next_since ?? new Date().toISOString();
         
         return this.cache.globalChat;
       } catch (error) {
@@ -263,26 +288,21 @@ class AllyApiService {
   async getDM(nodeId) {
     if (!config.features.enableMockData) {
       try {
-        const params = this.cache.dmChats[nodeId]?.timestamp
-          ? { since: this.cache.dmChats[nodeId].timestamp.toISOString() }
-          : {};
+        const cursor = this.cache.dmChats[nodeId]?.cursor;
+        const params = cursor !== undefined && cursor !== null ? { since: cursor } : {};
         const url = this.buildUrl(`/api/ally/chat/dm/${nodeId}`, params);
         const response = await this.retryFetch(url);
         const data = await response.json();
         
         // Initialize cache for this node if needed
         if (!this.cache.dmChats[nodeId]) {
-          this.cache.dmChats[nodeId] = { messages: [], timestamp: null };
+          this.cache.dmChats[nodeId] = { messages: [], cursor: null };
         }
         
         // Merge new messages
-        const newMessages = data.messages || data;
-        if (newMessages.length > 0) {
-          const existingIds = new Set(this.cache.dmChats[nodeId].messages.map(m => m.id));
-          const uniqueNew = newMessages.filter(m => !existingIds.has(m.id));
-          this.cache.dmChats[nodeId].messages = [...this.cache.dmChats[nodeId].messages, ...uniqueNew];
-        }
-        this.cache.dmChats[nodeId].timestamp = new Date();
+        const chat = this.cache.dmChats[nodeId];
+        chat.messages = this.mergeChatPage(chat.messages, data.messages || data, data.node_id);
+        chat.cursor = data.next_since ?? new Date().toISOString();
         
         return this.cache.dmChats[nodeId].messages;
       } catch (error) {
@@ -310,7 +330,7 @@ class AllyApiService {
     
     // Initialize cache for this node if needed
     if (!this.cache.dmChats[nodeId]) {
-      this.cache.dmChats[nodeId] = { messages: [], timestamp: null };
+      this.cache.dmChats[nodeId] = { messages: [], cursor: null };
     }
     
     // Add to local cache immediately
@@ -0,0 +1,42 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "baseline_export"))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "omega_test")
+# No cgi-bin scripts to sample under test
+os.environ["TIMESERIES_SAMPLE_INTERVAL"] = "0"
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """The backend module wired to a fresh in-memory MongoDB"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import server as server_module
+
+    memory_client = mongomock_motor.AsyncMongoMockClient(tz_aware=True)
+    monkeypatch.setattr(server_module, "AsyncIOMotorClient", lambda url, **kwargs: memory_client)
+    monkeypatch.setattr(server_module, "mongo_setup_done", False)
+    monkeypatch.setattr(server_module, "read_cache", server_module.ReadCache(0, 16))
+    monkeypatch.setattr(server_module, "status_version_seen", None)
+
+    # mongomock has no capped collections; everything else in setup runs for real
+    async def no_capped_collection():
+        pass
+
+    monkeypatch.setattr(server_module, "ensure_chat_collection", no_capped_collection)
+    return server_module
+
+
+@pytest.fixture
+def client(server):
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as test_client:
+        yield test_client
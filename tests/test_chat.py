@@ -0,0 +1,107 @@
+import asyncio
+
+
+def post(client, text, channel="global"):
+    response = client.post(f"/api/ally/chat/{channel}", json={"text": text})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_posts_get_increasing_seqs(client):
+    seqs = [post(client, f"message {i}")["seq"] for i in range(3)]
+    assert seqs == sorted(seqs)
+    assert len(set(seqs)) == 3
+
+
+def test_first_load_is_the_newest_page_oldest_first(client):
+    for i in range(5):
+        post(client, f"message {i}")
+    page = client.get("/api/ally/chat/global", params={"limit": 3}).json()
+    assert [m["text"] for m in page["messages"]] == ["message 2", "message 3", "message 4"]
+    assert page["next_since"] == page["messages"][-1]["seq"]
+    assert page["has_more"] is False
+
+
+def test_since_returns_only_newer_messages(client):
+    post(client, "old")
+    since = client.get("/api/ally/chat/global").json()["next_since"]
+    post(client, "new")
+
+    page = client.get("/api/ally/chat/global", params={"since": since}).json()
+    assert [m["text"] for m in page["messages"]] == ["new"]
+
+    empty = client.get("/api/ally/chat/global", params={"since": page["next_since"]}).json()
+    assert empty["messages"] == []
+    assert empty["next_since"] == page["next_since"]
+
+
+def test_since_pages_report_has_more(client):
+    since = client.get("/api/ally/chat/global").json()["next_since"]
+    for i in range(4):
+        post(client, f"message {i}")
+    page = client.get("/api/ally/chat/global", params={"since": since, "limit": 3}).json()
+    assert len(page["messages"]) == 3
+    assert page["has_more"] is True
+    rest = client.get("/api/ally/chat/global", params={"since": page["next_since"], "limit": 3}).json()
+    assert [m["text"] for m in rest["messages"]] == ["message 3"]
+    assert rest["has_more"] is False
+
+
+def test_bad_since_is_rejected(client):
+    response = client.get("/api/ally/chat/global", params={"since": "yesterday"})
+    assert response.status_code == 400
+
+
+def test_concurrent_posts_are_stored_in_seq_order(client, server):
+    async def post_many():
+        return await asyncio.gather(*[
+            server.post_chat_message("global", server.ChatMessageCreate(text=f"message {i}")) for i in range(20)
+        ])
+
+    # Run on the app's own loop, where chat_post_lock lives
+    results = client.portal.call(post_many)
+    seqs = sorted(result["seq"] for result in results)
+    assert seqs == list(range(seqs[0], seqs[0] + 20))
+
+    page = client.get("/api/ally/chat/global", params={"since": seqs[0] - 1}).json()
+    assert [m["seq"] for m in page["messages"]] == seqs
+
+
+def test_sender_is_this_node(client, server):
+    response = client.post("/api/ally/chat/global", json={"text": "hi", "sender": "someone-else"})
+    assert response.status_code == 200
+    page = client.get("/api/ally/chat/global").json()
+    assert page["node_id"] == server.NODE_ID
+    assert page["messages"][-1]["sender"] == server.NODE_ID
+    assert page["messages"][-1]["sender_name"] == server.NODE_NAME
+
+
+def test_channels_are_separate(client):
+    post(client, "to everyone")
+    post(client, "just you", channel="dm/node-b")
+    dm = client.get("/api/ally/chat/dm/node-b").json()
+    assert [m["text"] for m in dm["messages"]] == ["just you"]
+
+
+def test_waiters_are_forgotten_after_a_long_poll(client, server):
+    since = client.get("/api/ally/chat/global").json()["next_since"]
+    page = client.get("/api/ally/chat/global", params={"since": since, "wait": 0.05}).json()
+    assert page["messages"] == []
+    assert "global" not in server.chat_waiters.events
+    assert "global" not in server.chat_waiters.waiting
+
+
+def test_a_post_wakes_a_waiting_long_poll(client, server):
+    since = str(client.get("/api/ally/chat/global").json()["next_since"])
+
+    async def poll_then_post():
+        started = asyncio.get_running_loop().time()
+        waiter = asyncio.create_task(server.wait_for_chat_page("global", since, 50, 5.0))
+        await asyncio.sleep(0.05)
+        await server.post_chat_message("global", server.ChatMessageCreate(text="wake up"))
+        page = await waiter
+        return page, asyncio.get_running_loop().time() - started
+
+    page, elapsed = client.portal.call(poll_then_post)
+    assert [m["text"] for m in page.messages] == ["wake up"]
+    assert elapsed < 2
@@ -0,0 +1,320 @@
+import asyncio
+
+import pytest
+
+crawler = pytest.importorskip("exhaustive_crawler")
+
+
+class BrokenBrowser:
+    async def new_context(self, **kwargs):
+        raise RuntimeError("Target page, context or browser has been closed")
+
+
+def test_context_that_fails_to_open_fails_only_its_job():
+    async def main():
+        return await asyncio.gather(*[
+            crawler.run_job(BrokenBrowser(), bp_name, "dark", None, tid)
+            for tid, bp_name in enumerate(crawler.BREAKPOINTS, 1)
+        ])
+
+    results = asyncio.run(main())
+    assert len(results) == len(crawler.BREAKPOINTS)
+    for result, bp_name in zip(results, crawler.BREAKPOINTS):
+        assert [failure["folder"] for failure in result.failures] == [f"{bp_name}_dark"]
+        assert "has been closed" in result.failures[0]["reason"]
+        assert result.spans[-1]["cat"] == "job"
+
+
+@pytest.fixture
+def manifest_path(tmp_path, monkeypatch):
+    path = tmp_path / "CAPTURE_MANIFEST.json"
+    monkeypatch.setattr(crawler, "MANIFEST_PATH", path)
+    monkeypatch.setattr(crawler, "previous_manifest", {})
+    return path
+
+
+def test_manifest_round_trip(manifest_path):
+    result = crawler.CrawlResult()
+    result.state_hashes = {"desktop_dark/0001_home": "abc", "desktop_dark/0002_menu": "def"}
+    crawler.write_capture_manifest(result, manifest_path)
+    assert crawler.load_capture_manifest() == result.state_hashes
+
+
+def test_manifest_keeps_states_this_run_did_not_visit(manifest_path, monkeypatch):
+    monkeypatch.setattr(crawler, "previous_manifest", {"mobile_dark/0001_home": "old", "desktop_dark/0001_home": "old"})
+    result = crawler.CrawlResult()
+    result.state_hashes = {"desktop_dark/0001_home": "new"}
+    crawler.write_capture_manifest(result, manifest_path)
+    assert crawler.load_capture_manifest() == {"desktop_dark/0001_home": "new", "mobile_dark/0001_home": "old"}
+
+
+def test_manifest_from_other_encode_settings_is_ignored(manifest_path, monkeypatch):
+    result = crawler.CrawlResult()
+    result.state_hashes = {"desktop_dark/0001_home": "abc"}
+    crawler.write_capture_manifest(result, manifest_path)
+    monkeypatch.setattr(crawler, "SCREENSHOT_QUALITY", crawler.SCREENSHOT_QUALITY + 1)
+    assert crawler.load_capture_manifest() == {}
+
+
+def test_unreadable_manifest_is_ignored(manifest_path):
+    manifest_path.write_text("{not json")
+    assert crawler.load_capture_manifest() == {}
+
+
+def test_shards_split_the_jobs_exactly_once():
+    jobs = crawler.build_jobs(split_sections=True)
+    shards = [crawler.shard_jobs(jobs, (i, 3)) for i in range(1, 4)]
+    assert sorted(index for shard in shards for index in shard) == list(range(len(jobs)))
+    assert max(map(len, shards)) - min(map(len, shards)) <= 1
+    assert crawler.shard_jobs(jobs, None) == list(range(len(jobs)))
+
+
+def test_shard_argument_is_validated():
+    assert crawler.parse_shard("2/4") == (2, 4)
+    for value in ("0/4", "5/4", "two/4", "1"):
+        with pytest.raises(crawler.argparse.ArgumentTypeError):
+            crawler.parse_shard(value)
+
+
+def test_sharded_artifacts_get_their_own_names(tmp_path, monkeypatch):
+    path = tmp_path / "COVERAGE_REPORT.json"
+    assert crawler.artifact_path(path) == path
+    monkeypatch.setattr(crawler, "SHARD", (2, 4))
+    assert crawler.artifact_path(path).name == "COVERAGE_REPORT.shard-2-of-4.json"
+
+
+def test_journal_survives_a_torn_final_line(tmp_path, monkeypatch):
+    path = tmp_path / "CRAWL_JOURNAL.jsonl"
+    with open(path, "w") as journal:
+        monkeypatch.setattr(crawler, "journal", journal)
+        crawler.journal_append({"event": "capture", "state": "desktop_dark/0001_home", "hash": "abc"})
+        crawler.journal_append({"event": "job_done", "job": "desktop_dark", "result": {"exercised": [1]}})
+        journal.write('{"event": "capture", "sta')  # the crash
+    done, captured = crawler.load_journal(path)
+    assert captured == {"desktop_dark/0001_home": "abc"}
+    assert done == {"desktop_dark": {"exercised": [1]}}
+    assert crawler.load_journal(tmp_path / "missing.jsonl") == ({}, {})
+
+
+@pytest.fixture
+def plain_captures(monkeypatch):
+    # Written as-is on a thread pool: no Pillow, no thumbnails
+    monkeypatch.setattr(crawler, "SCREENSHOT_FORMAT", "png")
+    monkeypatch.setattr(crawler, "THUMBNAIL_WIDTH", 0)
+
+
+def test_writer_uses_the_configured_worker_count(monkeypatch, plain_captures):
+    async def main():
+        monkeypatch.setattr(crawler, "WRITER_WORKERS", 5)  # As --writers does
+        writer = crawler.CaptureWriter()
+        explicit = crawler.CaptureWriter(workers=3)
+        try:
+            return writer.workers, writer.pool._max_workers, explicit.workers
+        finally:
+            await writer.close()
+            await explicit.close()
+
+    assert asyncio.run(main()) == (5, 5, 3)
+
+
+def test_writer_lands_every_capture(tmp_path, plain_captures):
+    async def main():
+        result = crawler.CrawlResult()
+        writer = crawler.CaptureWriter(workers=2, queue_size=1)
+        for i in range(4):
+            await writer.submit(result, "main", f"main/{i}", None, b"png-%d" % i, tmp_path / f"{i}.png")
+        await writer.close()
+        return result
+
+    result = asyncio.run(main())
+    assert result.screenshot_counts == {"main": 4}
+    assert result.failures == []
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["0.png", "1.png", "2.png", "3.png"]
+    assert (tmp_path / "2.png").read_bytes() == b"png-2"
+
+
+def test_failed_write_is_reported(tmp_path, plain_captures):
+    async def main():
+        result = crawler.CrawlResult()
+        writer = crawler.CaptureWriter(workers=1)
+        await writer.submit(result, "main", "main/0", None, b"png", tmp_path / "missing" / "0.png")
+        await writer.close()
+        return result
+
+    result = asyncio.run(main())
+    assert result.screenshot_counts == {}
+    assert [failure["id"] for failure in result.failures] == ["main/0"]
+
+
+@crawler.traced("wait")
+async def wait_ready(page):
+    await asyncio.sleep(0.01)
+
+
+@crawler.traced("click", label="selector")
+async def click(page, selector):
+    await asyncio.sleep(0.01)
+    await wait_ready(page)
+
+
+@crawler.traced("modal")
+async def open_modal(page):
+    await click(page, "#open")
+    await wait_ready(page)
+
+
+def run_traced(coro_fn):
+    result = crawler.CrawlResult()
+
+    async def main():
+        token = crawler.current_result.set(result)
+        try:
+            await coro_fn()
+        finally:
+            crawler.current_result.reset(token)
+
+    asyncio.run(main())
+    return result
+
+
+def test_untimed_wrapper_does_not_hide_its_steps():
+    result = run_traced(lambda: open_modal(None))
+    # The click (with its own readiness wait) and the wait after it both count
+    assert result._pending["click"] >= 0.02
+    assert result._pending["wait"] >= 0.01
+    assert result._pending["wait"] < result._pending["click"]
+    assert "modal" not in result._pending
+    assert result._open == 0
+
+
+def test_nested_timed_steps_are_counted_once():
+    result = run_traced(lambda: click(None, "#button"))
+    assert "wait" not in result._pending
+    assert result._pending["click"] >= 0.02
+
+
+def test_every_call_is_a_span():
+    result = run_traced(lambda: open_modal(None))
+    assert [span["cat"] for span in result.spans] == ["wait", "click", "wait", "modal"]
+    assert result.spans[1]["args"] == {"target": "#open"}
+    assert all(span["dur"] >= 0 for span in result.spans)
+
+
+def test_untraced_calls_record_nothing():
+    asyncio.run(open_modal(None))  # No current result: runs the step alone
+    assert crawler.current_result.get() is None
+
+
+def test_captured_state_takes_the_pending_time():
+    result = run_traced(lambda: open_modal(None))
+    result.record_state("desktop_dark/0001_modal", "captured", crawler.time.perf_counter(), None)
+    row = result.timings[0]
+    assert row["interactive_ms"] == pytest.approx(row["click_ms"] + row["wait_ms"], abs=0.2)
+    assert result._pending == {}
+
+
+def test_spans_survive_a_round_trip():
+    result = run_traced(lambda: open_modal(None))
+    restored = crawler.CrawlResult.from_dict(result.to_dict())
+    assert restored.spans == result.spans
+
+
+BUDGET = {
+    "defaults": {"interactive_ms": 2000, "domNodes": 3000},
+    "rules": [
+        {"label": "Mobile", "match": ["mobile_*/*"], "budgets": {"domNodes": 2500}},
+        {"match": ["*/*_ent_*"], "budgets": {"interactive_ms": 2500, "domNodes": None}},
+    ],
+}
+
+
+def test_matching_rules_override_the_defaults_in_order():
+    assert crawler.budget_for("desktop_dark/0001_home", BUDGET) == (
+        {"interactive_ms": 2000, "domNodes": 3000}, [],
+    )
+    assert crawler.budget_for("mobile_dark/0003_ent_player", BUDGET) == (
+        {"interactive_ms": 2500, "domNodes": None}, ["Mobile", "*/*_ent_*"],
+    )
+
+
+def test_only_values_over_budget_are_reported():
+    timings = [
+        {"state": "desktop_dark/0001_home", "interactive_ms": 1999, "browser": {"domNodes": 3000}},
+        {"state": "mobile_dark/0002_menu", "interactive_ms": 2500, "browser": {"domNodes": 2600}},
+        {"state": "mobile_dark/0003_ent_player", "interactive_ms": 2400, "browser": {"domNodes": 9000}},
+        {"state": "desktop_light/0004_tools", "interactive_ms": 100, "browser": None},
+    ]
+    violations = crawler.check_budgets(timings, BUDGET)
+    assert [(v["state"], v["metric"], v["area"]) for v in violations] == [
+        ("mobile_dark/0002_menu", "interactive_ms", "Mobile"),
+        ("mobile_dark/0002_menu", "domNodes", "Mobile"),
+    ]
+    assert violations[0]["overBy"] == "+25.0%"
+
+
+def test_budget_report_is_written(tmp_path):
+    budget_path = tmp_path / "PERF_BUDGET.json"
+    budget_path.write_text(crawler.json.dumps(BUDGET))
+    report_path = tmp_path / "PERF_BUDGET_REPORT.json"
+    timings = [{"state": "desktop_dark/0001_home", "interactive_ms": 3000, "browser": {}}]
+    violations = crawler.report_budget(timings, budget_path, report_path)
+    report = crawler.json.loads(report_path.read_text())
+    assert report["total_violations"] == len(violations) == 1
+    assert crawler.report_budget(timings, tmp_path / "none.json", report_path) == []
+
+
+class FakeRequest:
+    def __init__(self, url, method="GET", body=None):
+        self.url = url
+        self.method = method
+        self.post_data_buffer = body
+
+
+class FakeRoute:
+    def __init__(self, request):
+        self.request = request
+        self.fulfilled = None
+
+    async def fulfill(self, **kwargs):
+        self.fulfilled = kwargs
+
+
+def test_fixture_key_ignores_host_order_and_cache_busters():
+    a = crawler.fixture_key(FakeRequest("http://localhost:3000/api/status?limit=5&b=2&_=123"))
+    b = crawler.fixture_key(FakeRequest("https://staging.example/api/status?b=2&limit=5&ts=9"))
+    assert a == b == "GET /api/status?b=2&limit=5"
+
+
+def test_fixture_key_tells_request_bodies_apart():
+    one = crawler.fixture_key(FakeRequest("http://x/api/status", "POST", b'{"client_name": "a"}'))
+    two = crawler.fixture_key(FakeRequest("http://x/api/status", "POST", b'{"client_name": "b"}'))
+    assert one != two
+    assert one.startswith("POST /api/status #")
+
+
+def test_fixture_store_round_trip(tmp_path):
+    path = tmp_path / "fixtures" / "API_FIXTURES.json.gz"
+    entries = {"GET /api/b": {"status": 200, "body": "b"}, "GET /api/a": {"status": 404, "body": ""}}
+    crawler.save_fixtures(path, entries)
+    assert crawler.load_fixtures(path) == entries
+
+
+def test_replay_serves_recorded_bodies_and_reports_misses(monkeypatch):
+    monkeypatch.setattr(crawler, "FIXTURE_MODE", "replay")
+    monkeypatch.setattr(crawler, "fixtures", {
+        "GET /api/text": {"status": 200, "body": "héllo", "contentType": "text/plain"},
+        "GET /api/bin": {"status": 200, "body": crawler.base64.b64encode(b"\xff\x00").decode(), "base64": True},
+    })
+    monkeypatch.setattr(crawler, "fixture_stats", {"hits": 0, "misses": 0, "recorded": 0})
+    monkeypatch.setattr(crawler, "fixture_misses", set())
+
+    async def replay(url):
+        route = FakeRoute(FakeRequest(url))
+        await crawler.route_fixture(route)
+        return route.fulfilled
+
+    assert asyncio.run(replay("http://x/api/text"))["body"] == "héllo".encode()
+    assert asyncio.run(replay("http://x/api/bin"))["body"] == b"\xff\x00"
+    assert asyncio.run(replay("http://x/api/other"))["status"] == 503
+    assert crawler.fixture_stats == {"hits": 2, "misses": 1, "recorded": 0}
+    assert crawler.fixture_misses == {"GET /api/other"}
@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+
+@pytest.fixture
+def cgi(client, server, monkeypatch):
+    """cgi-bin stand-in: gps hangs, backup answers 500, keys sends HTML, the rest JSON"""
+    calls = []
+
+    async def handle(request):
+        source = request.url.path.rsplit("/", 1)[1].removesuffix(".py")
+        calls.append(source)
+        if source == "gps":
+            await asyncio.sleep(5)
+        if source == "backup":
+            return httpx.Response(500, json={"error": "disk"})
+        if source == "keys":
+            return httpx.Response(200, text="<html>")
+        return httpx.Response(200, json={"source": source, "n": len(calls)})
+
+    monkeypatch.setattr(server, "cgi_client", httpx.AsyncClient(transport=httpx.MockTransport(handle)))
+    monkeypatch.setattr(server, "source_cache", server.SourceCache(fresh_ttl=60, stale_ttl=120))
+    monkeypatch.setattr(server, "DASHBOARD_SOURCE_TIMEOUTS", {"gps": 0.1})
+    return calls
+
+
+def test_hung_source_only_fails_its_own_entry(client, cgi):
+    started = time.perf_counter()
+    body = client.get("/api/dashboard/snapshot").json()
+    assert time.perf_counter() - started < 2
+    sources = body["sources"]
+    assert body["partial"] is True
+    assert sources["gps"]["ok"] is False
+    assert sources["gps"]["error"] == "timed out after 0.1s"
+    assert sources["backup"]["error"] == "HTTP 500"
+    assert sources["keys"]["error"] == "response is not JSON"
+    assert sources["health"]["ok"] is True
+    assert sources["health"]["data"] == {"source": "health", "n": sources["health"]["data"]["n"]}
+
+
+def test_subset_and_unknown_sources(client, cgi):
+    body = client.get("/api/dashboard/snapshot", params={"sources": "health,metrics"}).json()
+    assert sorted(body["sources"]) == ["health", "metrics"]
+    assert body["partial"] is False
+    assert client.get("/api/dashboard/snapshot", params={"sources": "health,nope"}).status_code == 400
+
+
+def test_fresh_entries_are_served_from_the_cache(client, cgi):
+    client.get("/api/dashboard/snapshot", params={"sources": "health"})
+    again = client.get("/api/dashboard/snapshot", params={"sources": "health"}).json()["sources"]["health"]
+    assert again["cache"] == "fresh"
+    assert cgi.count("health") == 1
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(server):
+    fetches = []
+
+    async def fetch(source):
+        fetches.append(source)
+        await asyncio.sleep(0.01)
+        return {"ok": True, "data": len(fetches), "error": None, "latency_ms": 1.0}
+
+    async def main():
+        cache = server.SourceCache(fresh_ttl=0, stale_ttl=60)
+        first = await cache.get("metrics", fetch)
+        stale = await asyncio.gather(*[cache.get("metrics", fetch) for _ in range(3)])
+        await asyncio.sleep(0.05)
+        return first, stale, await cache.get("metrics", fetch)
+
+    first, stale, later = asyncio.run(main())
+    assert first["cache"] == "miss"
+    assert [entry["cache"] for entry in stale] == ["stale"] * 3
+    assert [entry["data"] for entry in stale] == [1] * 3
+    assert later["data"] == 2  # exactly one background refresh ran
+    assert len(fetches) == 3  # first load, that refresh, and the refresh the last read started
+
+
+def test_failed_refresh_keeps_the_last_good_data(server):
+    results = iter([
+        {"ok": True, "data": {"v": 1}, "error": None, "latency_ms": 1.0},
+        {"ok": False, "data": None, "error": "HTTP 502", "latency_ms": 2.0},
+    ])
+
+    async def fetch(source):
+        return next(results)
+
+    async def main():
+        cache = server.SourceCache(fresh_ttl=0, stale_ttl=0)
+        await cache.get("sensors", fetch)
+        return await cache.get("sensors", fetch)
+
+    entry = asyncio.run(main())
+    assert entry["data"] == {"v": 1}
+    assert (entry["ok"], entry["error"]) == (False, "HTTP 502")
@@ -0,0 +1,46 @@
+import pytest
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, server, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(server, "orjson", None)
+    elif server.orjson is None:
+        pytest.skip("orjson not installed")
+
+
+def fetch_both(client, server, monkeypatch, **params):
+    bodies = []
+    for fast in (False, True):
+        monkeypatch.setattr(server, "STATUS_FAST_JSON", fast)
+        response = client.get("/api/status", params=params)
+        assert response.status_code == 200
+        bodies.append((response.content, response.headers.get("X-Next-Cursor")))
+    return bodies
+
+
+def seed(client):
+    items = [{"client_name": f"node-{i}", "timestamp": f"2026-01-01T12:00:0{i}.{i}5+00:00"} for i in range(5)]
+    items.append({"client_name": "naive é", "timestamp": "2026-01-01T11:00:00"})
+    assert client.post("/api/status/batch", json=items).status_code == 200
+
+
+def test_fast_path_bytes_match_the_standard_path(client, server, monkeypatch, encoder):
+    seed(client)
+    standard, fast = fetch_both(client, server, monkeypatch)
+    assert fast == standard
+
+
+def test_fast_path_pages_match(client, server, monkeypatch, encoder):
+    seed(client)
+    standard, fast = fetch_both(client, server, monkeypatch, limit=4)
+    assert fast == standard
+    assert standard[1] is not None
+    standard, fast = fetch_both(client, server, monkeypatch, limit=4, after=standard[1])
+    assert fast == standard
+
+
+def test_fast_path_ndjson_matches(client, server, monkeypatch, encoder):
+    seed(client)
+    standard, fast = fetch_both(client, server, monkeypatch, format="ndjson")
+    assert fast == standard
@@ -0,0 +1,144 @@
+import gzip
+
+import pytest
+
+
+@pytest.fixture
+def etags(server, monkeypatch):
+    monkeypatch.setattr(server, "CONDITIONAL_GET", "1")
+
+
+def test_matching_etag_gets_304(client, etags):
+    client.post("/api/status", json={"client_name": "a"})
+    first = client.get("/api/status")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    again = client.get("/api/status", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == etag
+
+
+def test_write_changes_the_etag(client, etags):
+    client.post("/api/status", json={"client_name": "a"})
+    etag = client.get("/api/status").headers["ETag"]
+    client.post("/api/status", json={"client_name": "b"})
+
+    response = client.get("/api/status", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 2
+
+
+def test_etag_depends_on_the_response_format(client, etags):
+    json_etag = client.get("/api/status").headers["ETag"]
+    ndjson_etag = client.get("/api/status", params={"format": "ndjson"}).headers["ETag"]
+    assert json_etag != ndjson_etag
+
+
+def test_validators_use_the_shared_write_counter_by_default(client, server):
+    assert server.CONDITIONAL_GET == "auto"
+    assert server.status_broadcaster.local_publish
+    before = client.get("/api/status").headers["ETag"]
+    client.post("/api/status", json={"client_name": "a"})
+    first = client.get("/api/status")
+    assert before.startswith('W/"db.')
+    assert first.headers["ETag"] != before
+
+    again = client.get("/api/status", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_another_workers_write_changes_the_etag_and_drops_cached_pages(client, server, monkeypatch):
+    monkeypatch.setattr(server, "read_cache", server.ReadCache(60, 16))
+    client.post("/api/status", json={"client_name": "a"})
+    etag = client.get("/api/status").headers["ETag"]
+
+    async def write_elsewhere():
+        # What another worker's create_status_check leaves behind; this process never hears of it
+        doc = server.status_check_to_doc(server.StatusCheck(client_name="b"))
+        await server.db.status_checks.insert_one(doc)
+        await server.db.counters.update_one(
+            {"_id": "status_version"}, {"$inc": {"seq": 1}, "$set": {"at": server.datetime.now(server.timezone.utc)}},
+        )
+
+    client.portal.call(write_elsewhere)
+    response = client.get("/api/status", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert sorted(check["client_name"] for check in response.json()) == ["a", "b"]
+
+
+def test_in_process_validators_while_the_change_stream_runs(client, server, monkeypatch):
+    monkeypatch.setattr(server.status_broadcaster, "local_publish", False)
+    etag = client.get("/api/status").headers["ETag"]
+    assert etag.startswith(f'W/"{server.read_cache.epoch}.status.')
+
+
+def test_no_validators_when_disabled(client, server, monkeypatch):
+    monkeypatch.setattr(server, "CONDITIONAL_GET", "0")
+    response = client.get("/api/status")
+    assert "ETag" not in response.headers
+    assert "Last-Modified" not in response.headers
+
+
+def test_large_body_is_gzipped_when_asked(client):
+    client.post("/api/status/batch", json=[{"client_name": f"node-{i}"} for i in range(50)])
+    response = client.get("/api/status", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert len(response.json()) == 50  # httpx decodes the body
+
+
+def test_identity_is_sent_uncompressed(client):
+    client.post("/api/status/batch", json=[{"client_name": f"node-{i}"} for i in range(50)])
+    response = client.get("/api/status", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert len(response.json()) == 50
+
+
+def test_small_body_is_not_compressed(client):
+    client.post("/api/status", json={"client_name": "a"})
+    response = client.get("/api/status", params={"limit": 1}, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_brotli_preferred_when_available(client):
+    pytest.importorskip("brotli")
+    client.post("/api/status/batch", json=[{"client_name": f"node-{i}"} for i in range(50)])
+    response = client.get("/api/status", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+
+
+def test_accept_encoding_negotiation(server):
+    choose = server.CompressionMiddleware.choose_encoding
+    assert choose("gzip, deflate") == "gzip"
+    assert choose("gzip;q=0") is None
+    assert choose("identity") is None
+    assert choose("") is None
+    assert choose("br;q=0, gzip;q=0.5") == "gzip"
+
+
+def test_unchanged_bodies_are_compressed_once(server):
+    middleware = server.CompressionMiddleware(app=None, max_entries=2)
+    body = b'{"rows": []}' * 200
+    first = middleware.compress_once("gzip", body)
+    assert middleware.compress_once("gzip", bytes(body)) is first
+    assert (middleware.hits, middleware.misses) == (1, 1)
+    assert gzip.decompress(first) == body
+
+    for other in (b"a" * 2000, b"b" * 2000):
+        middleware.compress_once("gzip", other)
+    assert len(middleware.cache) == 2  # the oldest entry was evicted
+    middleware.compress_once("gzip", body)
+    assert middleware.misses == 4
+
+
+def test_hash_collision_is_a_miss(server, monkeypatch):
+    middleware = server.CompressionMiddleware(app=None, max_entries=4)
+    first, second = b"a" * 2000, b"b" * 2000
+    monkeypatch.setattr(server, "hash", lambda body: 42, raising=False)  # Every body collides
+    assert gzip.decompress(middleware.compress_once("gzip", first)) == first
+    assert gzip.decompress(middleware.compress_once("gzip", second)) == second
+    assert (middleware.hits, middleware.misses) == (0, 2)
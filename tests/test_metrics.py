@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(server, monkeypatch):
+    # The collectors are module globals, shared with every other test
+    for name in ("http_requests_total", "http_request_seconds"):
+        metric = getattr(server, name)
+        if isinstance(metric, server.Histogram):
+            fresh = server.Histogram(metric.name, metric.help_text, metric.labels, metric.buckets)
+        else:
+            fresh = server.Counter(metric.name, metric.help_text, metric.labels)
+        monkeypatch.setattr(server, name, fresh)
+
+
+def metric_lines(client):
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain")
+    return response.text.splitlines()
+
+
+def test_requests_are_counted_by_route_template(client):
+    client.get("/api/ally/chat/dm/node-a")
+    client.get("/api/ally/chat/dm/node-b")
+    lines = metric_lines(client)
+    assert 'omega_http_requests_total{method="GET",route="/api/ally/chat/dm/{node_id}",status="200"} 2' in lines
+    assert not any("node-a" in line for line in lines)
+
+
+def test_latency_buckets_are_cumulative(client):
+    client.get("/api/status")
+    lines = metric_lines(client)
+    prefix = 'omega_http_request_duration_seconds_bucket{method="GET",route="/api/status",'
+    counts = [int(line.rsplit(" ", 1)[1]) for line in lines if line.startswith(prefix)]
+    assert counts == sorted(counts)
+    assert 'le="+Inf"} 1' in next(line for line in lines if line.startswith(prefix + 'le="+Inf"'))
+    assert 'omega_http_request_duration_seconds_count{method="GET",route="/api/status"} 1' in lines
+
+
+def test_gauges_are_exported(client):
+    lines = metric_lines(client)
+    for name in ("omega_http_requests_in_flight", "omega_mongo_pool_in_use", "omega_read_cache_hits_total"):
+        assert any(line.startswith(name + " ") for line in lines), name
+
+
+def test_labels_are_escaped(server):
+    counter = server.Counter("test_total", "Test.", ("path",))
+    counter.inc(('a"b\\c',))
+    assert counter.render()[-1] == 'test_total{path="a\\"b\\\\c"} 1'
+
+
+def test_render_while_other_threads_observe(server):
+    histogram = server.Histogram("test_seconds", "Test.", ("command",), server.LATENCY_BUCKETS)
+
+    def observe(thread):
+        for i in range(50000):
+            histogram.observe((f"cmd{i % 50}",), 0.01 * (i % 7))
+
+    threads = [threading.Thread(target=observe, args=(n,)) for n in range(2)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        # Each series is read in one piece: its +Inf bucket always equals its count
+        values = [line.rsplit(" ", 1)[1] for line in histogram.render() if 'le="+Inf"' in line or "_count" in line]
+        assert values[0::2] == values[1::2]
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+
+def test_ready_when_mongo_answers(client, server):
+    response = client.get("/api/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"] is True
+    assert body["mongo"]["ok"] is True
+    assert body["pool"]["max_size"] == server.MONGO_MAX_POOL_SIZE
+
+
+def test_saturated_pool_is_not_ready(client, server, monkeypatch):
+    monkeypatch.setattr(server.pool_monitor, "in_use", server.MONGO_MAX_POOL_SIZE)
+    monkeypatch.setattr(server.pool_monitor, "waiting", 3)
+    response = client.get("/api/health/ready")
+    assert response.status_code == 503
+    assert response.json()["saturated"] is True
+
+
+@pytest.fixture
+def mongo_down(server, monkeypatch):
+    from pymongo.errors import ServerSelectionTimeoutError
+
+    database_class = type(server.client.admin)
+    command = database_class.command
+
+    async def unreachable(self, *args, **kwargs):
+        raise ServerSelectionTimeoutError("no servers")
+
+    monkeypatch.setattr(database_class, "command", unreachable)
+    return lambda: monkeypatch.setattr(database_class, "command", command)
+
+
+def test_unreachable_mongo_is_not_ready(client, mongo_down):
+    response = client.get("/api/health/ready")
+    assert response.status_code == 503
+    assert response.json()["mongo"]["ok"] is False
+
+
+def test_readiness_finishes_setup_skipped_at_boot(client, server, monkeypatch, mongo_down):
+    monkeypatch.setattr(server, "mongo_setup_done", False)  # as if Mongo was down at boot
+    assert client.get("/api/health/ready").status_code == 503
+    assert server.mongo_setup_done is False
+
+    mongo_down()  # Mongo comes back
+    assert client.get("/api/health/ready").status_code == 200
+    assert server.mongo_setup_done is True
+
+
+def test_pool_counts_stay_exact_across_threads(server):
+    monitor = server.PoolMonitor()
+
+    def churn():
+        for _ in range(10000):
+            monitor.connection_check_out_started(None)
+            monitor.connection_checked_out(None)
+            monitor.connection_checked_in(None)
+
+    threads = [threading.Thread(target=churn) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = monitor.stats()
+    assert (stats["in_use"], stats["waiting"]) == (0, 0)
+
+
+def index_specs(client, server, collection_name):
+    async def load():
+        return {index["name"]: index async for index in server.db[collection_name].list_indexes()}
+
+    return client.portal.call(load)
+
+
+def test_declared_indexes_are_created_at_startup(client, server):
+    for collection_name, indexes in server.declared_indexes().items():
+        present = index_specs(client, server, collection_name)
+        for index in indexes:
+            assert index.document["name"] in present, (collection_name, index.document["name"])
+    status = index_specs(client, server, "status_checks")
+    assert status["id_1"].get("unique") is True
+    assert not any("expireAfterSeconds" in index for index in status.values())
+
+
+def test_retention_adds_and_removes_the_ttl_index(client, server, monkeypatch):
+    monkeypatch.setattr(server, "STATUS_RETENTION_DAYS", 2)
+    client.portal.call(server.ensure_indexes)
+    ttl = index_specs(client, server, "status_checks")["timestamp_1"]
+    assert ttl["expireAfterSeconds"] == 2 * 86400
+
+    monkeypatch.setattr(server, "STATUS_RETENTION_DAYS", 0)
+    client.portal.call(server.ensure_indexes)
+    assert "timestamp_1" not in index_specs(client, server, "status_checks")
+
+
+def test_ensure_indexes_is_idempotent(client, server):
+    before = index_specs(client, server, "status_checks")
+    client.portal.call(server.ensure_indexes)
+    assert index_specs(client, server, "status_checks") == before
@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+
+@pytest.fixture
+def cache(server):
+    return server.ReadCache(ttl=60, max_entries=2)
+
+
+def counting_loader(value="page", delay=0.0):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+
+    return load, calls
+
+
+def test_repeated_reads_are_served_from_memory(cache):
+    load, calls = counting_loader()
+
+    async def main():
+        return [await cache.get_or_load(("status", 1), load) for _ in range(3)]
+
+    assert asyncio.run(main()) == ["page"] * 3
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_concurrent_misses_share_one_load(cache):
+    load, calls = counting_loader(delay=0.01)
+
+    async def main():
+        return await asyncio.gather(*[cache.get_or_load(("status", 1), load) for _ in range(5)])
+
+    assert asyncio.run(main()) == ["page"] * 5
+    assert len(calls) == 1
+    assert cache.coalesced == 4
+
+
+def test_followers_survive_a_cancelled_leader(cache):
+    load, calls = counting_loader(delay=0.02)
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_load(("status", 1), load))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(cache.get_or_load(("status", 1), load)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()  # e.g. its client disconnected
+        results = await asyncio.gather(*followers)
+        return leader.cancelled(), results
+
+    cancelled, results = asyncio.run(main())
+    assert cancelled
+    assert results == ["page"] * 3
+    assert len(calls) == 1
+
+
+def test_load_errors_reach_every_waiter(cache):
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("mongo down")
+
+    async def main():
+        return await asyncio.gather(*[cache.get_or_load(("status", 1), fail) for _ in range(3)], return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(main()))
+    assert not cache.entries
+    assert not cache.inflight
+
+
+def test_invalidate_drops_only_its_namespace(cache):
+    load, calls = counting_loader()
+
+    async def main():
+        await cache.get_or_load(("status", 1), load)
+        await cache.get_or_load(("rollup", 1), load)
+        cache.invalidate("status")
+        await cache.get_or_load(("status", 1), load)
+        await cache.get_or_load(("rollup", 1), load)
+
+    asyncio.run(main())
+    assert len(calls) == 3
+    assert cache.version("status")[0] == 1
+    assert cache.version("rollup")[0] == 0
+
+
+def test_load_racing_a_write_is_not_stored(cache):
+    async def main():
+        async def load():
+            cache.invalidate("status")  # a write lands while the page is read
+            return "stale"
+
+        assert await cache.get_or_load(("status", 1), load) == "stale"
+        return dict(cache.entries)
+
+    assert asyncio.run(main()) == {}
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    load, calls = counting_loader()
+
+    async def main():
+        for key in (1, 2, 1, 3):
+            await cache.get_or_load(("status", key), load)
+        return list(cache.entries)
+
+    assert asyncio.run(main()) == [("status", 1), ("status", 3)]
+    assert cache.evictions == 1
+
+
+def test_status_listing_is_cached_until_a_write(client, server, monkeypatch):
+    monkeypatch.setattr(server, "read_cache", server.ReadCache(60, 16))
+    client.post("/api/status", json={"client_name": "a"})
+    assert len(client.get("/api/status").json()) == 1
+
+    async def write_behind_the_cache():
+        await server.db.status_checks.insert_one({
+            "id": "direct", "client_name": "b", "timestamp": datetime.now(timezone.utc),
+        })
+
+    client.portal.call(write_behind_the_cache)
+    assert len(client.get("/api/status").json()) == 1  # served from memory
+
+    client.post("/api/status", json={"client_name": "c"})
+    assert len(client.get("/api/status").json()) == 3
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+START = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def seed(client, count):
+    items = [
+        {"client_name": f"node-{i % 3}", "timestamp": (START + timedelta(seconds=i)).isoformat()}
+        for i in range(count)
+    ]
+    assert client.post("/api/status/batch", json=items).status_code == 200
+
+
+def rollup(client, since, until, bucket=60):
+    return client.get("/api/status/rollup", params={
+        "bucket": bucket, "since": since.isoformat(), "until": until.isoformat(),
+    })
+
+
+def test_rollup_counts_checks_in_range(client):
+    seed(client, 90)  # 30 checks per client over 90 seconds
+    response = rollup(client, START, START + timedelta(minutes=2))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["source"] == "materialized"
+    totals = {row["client_name"]: row["total"] for row in body["clients"]}
+    assert totals == {"node-0": 30, "node-1": 30, "node-2": 30}
+    for row in body["clients"]:
+        assert sum(bucket["count"] for bucket in row["buckets"]) == row["total"]
+
+
+def test_rollup_excludes_checks_outside_the_range(client):
+    seed(client, 90)
+    response = rollup(client, START + timedelta(minutes=1), START + timedelta(minutes=2))
+    totals = {row["client_name"]: row["total"] for row in response.json()["clients"]}
+    assert sum(totals.values()) == 30  # only the second minute's bucket
+
+
+def test_rollup_rejects_inverted_range(client):
+    response = rollup(client, START, START - timedelta(hours=1))
+    assert response.status_code == 400
+
+
+class FakeMerge:
+    """Stands in for the $merge aggregation, which mongomock lacks"""
+
+    def __init__(self, fail=False):
+        self.pipelines = []
+        self.fail = fail
+
+    def __call__(self, pipeline):
+        self.pipelines.append(pipeline)
+        return self
+
+    async def to_list(self, length):
+        if self.fail:
+            raise RuntimeError("merge failed")
+        return []
+
+
+@pytest.fixture
+def merge(client, server, monkeypatch):
+    async def clear():
+        await server.db.migrations.delete_many({})
+
+    client.portal.call(clear)
+    fake = FakeMerge()
+    monkeypatch.setattr(server.db, "status_checks", server.db.status_checks)
+    monkeypatch.setattr(server.db.status_checks, "aggregate", fake)
+    return fake
+
+
+def migrations(client, server):
+    async def load():
+        return {doc["_id"]: doc for doc in await server.db.migrations.find().to_list(None)}
+
+    return client.portal.call(load)
+
+
+def test_backfill_claims_each_width_once(client, server, merge):
+    client.portal.call(server.backfill_status_rollups, START)
+    client.portal.call(server.backfill_status_rollups, START)  # e.g. a second worker
+    assert len(merge.pipelines) == len(server.STATUS_ROLLUP_WIDTHS)
+    for width in server.STATUS_ROLLUP_WIDTHS:
+        assert migrations(client, server)[f"status_rollups_backfill_{width}"]["state"] == "done"
+
+
+def test_backfill_skips_a_width_another_worker_is_running(client, server, merge):
+    width = server.STATUS_ROLLUP_WIDTHS[0]
+
+    async def claim():
+        await server.db.migrations.insert_one({"_id": f"status_rollups_backfill_{width}", "state": "running"})
+
+    client.portal.call(claim)
+    client.portal.call(server.backfill_status_rollups, START)
+    assert len(merge.pipelines) == len(server.STATUS_ROLLUP_WIDTHS) - 1
+    assert migrations(client, server)[f"status_rollups_backfill_{width}"]["state"] == "running"
+
+
+def test_backfill_cutoff_is_the_earliest_worker_start(client, server, merge):
+    later = START + timedelta(minutes=5)
+    client.portal.call(server.backfill_status_rollups, START)
+    merge.pipelines.clear()
+
+    async def reopen():
+        await server.db.migrations.delete_many({"_id": {"$ne": "status_rollups_live_since"}})
+
+    client.portal.call(reopen)
+    client.portal.call(server.backfill_status_rollups, later)
+    cutoff = merge.pipelines[0][0]["$match"]["_id"]["$lt"].generation_time
+    assert cutoff == START
+
+
+def test_failed_backfill_gives_up_its_claim(client, server, merge):
+    merge.fail = True
+    client.portal.call(server.backfill_status_rollups, START)
+    assert len(merge.pipelines) == 1  # stops at the first failure
+    assert not any(key.startswith("status_rollups_backfill_") for key in migrations(client, server))
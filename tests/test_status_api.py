@@ -0,0 +1,156 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+
+def seed(client, count, start=None):
+    start = start or datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    items = [
+        {"client_name": f"node-{i % 3}", "timestamp": (start + timedelta(seconds=i)).isoformat()}
+        for i in range(count)
+    ]
+    response = client.post("/api/status/batch", json=items)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_keyset_pagination_walks_every_check_once(client):
+    seed(client, 25)
+    seen, after = [], None
+    while True:
+        params = {"limit": 10}
+        if after:
+            params["after"] = after
+        response = client.get("/api/status", params=params)
+        assert response.status_code == 200
+        seen.extend(check["id"] for check in response.json())
+        after = response.headers.get("X-Next-Cursor")
+        if not after:
+            break
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+
+
+def test_pages_are_newest_first(client):
+    seed(client, 5)
+    timestamps = [check["timestamp"] for check in client.get("/api/status").json()]
+    assert timestamps == sorted(timestamps, reverse=True)
+
+
+def test_bad_cursor_is_rejected(client):
+    for cursor in ("garbage", "not-a-date,abc", "2026-01-01T00:00:00+00:00,"):
+        response = client.get("/api/status", params={"after": cursor})
+        assert response.status_code == 400
+
+
+def test_ndjson_streams_one_check_per_line(client):
+    seed(client, 4)
+    response = client.get("/api/status", params={"format": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == client.get("/api/status").json()
+
+
+def test_batch_reports_invalid_items_without_failing_the_rest(client):
+    response = client.post("/api/status/batch", json=[{"client_name": "a"}, {"nope": 1}, {"client_name": "b"}])
+    assert response.status_code == 200
+    body = response.json()
+    assert body["inserted"] == 2
+    assert body["failed"] == 1
+    assert [result["ok"] for result in body["results"]] == [True, False, True]
+
+
+def test_batch_accepts_mixed_naive_and_aware_timestamps(client):
+    # Same client and rollup bucket: rollups compare these timestamps directly
+    response = client.post("/api/status/batch", json=[
+        {"client_name": "a", "timestamp": "2026-01-01T10:00:05"},
+        {"client_name": "a", "timestamp": "2026-01-01T10:00:10+00:00"},
+        {"client_name": "a", "timestamp": "2026-01-01T12:00:20+02:00"},
+    ])
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 3
+    stored = client.get("/api/status").json()
+    assert {check["timestamp"][:19] for check in stored} == {
+        "2026-01-01T10:00:05", "2026-01-01T10:00:10", "2026-01-01T10:00:20",
+    }
+
+
+def test_batch_over_limit_is_rejected(client, server, monkeypatch):
+    monkeypatch.setattr(server, "STATUS_BATCH_MAX_ITEMS", 2)
+    response = client.post("/api/status/batch", json=[{"client_name": "a"}] * 3)
+    assert response.status_code == 413
+
+
+def test_since_until_select_a_half_open_range(client):
+    start = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    seed(client, 10, start)
+    response = client.get("/api/status", params={
+        "since": (start + timedelta(seconds=2)).isoformat(),
+        "until": (start + timedelta(seconds=5)).isoformat(),
+    })
+    assert response.status_code == 200
+    assert [check["timestamp"][17:19] for check in response.json()] == ["04", "03", "02"]
+
+
+def test_since_until_accept_naive_times_as_utc(client):
+    start = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    seed(client, 10, start)
+    response = client.get("/api/status", params={"since": "2026-01-01T12:00:08"})
+    assert len(response.json()) == 2
+
+
+def insert_legacy_checks(client, server, count):
+    async def insert():
+        await server.db.migrations.delete_many({})
+        await server.db.status_checks.insert_many([
+            {"id": f"legacy-{i}", "client_name": "old", "timestamp": f"2025-06-01T00:00:0{i}+00:00"}
+            for i in range(count)
+        ])
+
+    client.portal.call(insert)
+
+
+def test_migration_converts_string_timestamps(client, server):
+    insert_legacy_checks(client, server, 3)
+    assert client.portal.call(server.migrate_status_timestamps) is True
+
+    async def stored():
+        return await server.db.status_checks.find({"client_name": "old"}).to_list(None)
+
+    assert all(isinstance(check["timestamp"], datetime) for check in client.portal.call(stored))
+    response = client.get("/api/status", params={"until": "2025-06-01T00:00:02+00:00"})
+    assert [check["id"] for check in response.json()] == ["legacy-1", "legacy-0"]
+
+
+def test_migrations_wait_for_a_late_mongo(client, server, monkeypatch):
+    from pymongo.errors import ServerSelectionTimeoutError
+
+    insert_legacy_checks(client, server, 2)
+    collection_class = type(server.db.migrations)
+    find_one = collection_class.find_one
+    calls = []
+
+    async def unreachable_once(self, *args, **kwargs):
+        if self.name == "migrations":
+            calls.append(args)
+            if len(calls) == 1:
+                raise ServerSelectionTimeoutError("no servers")
+        return await find_one(self, *args, **kwargs)
+
+    monkeypatch.setattr(collection_class, "find_one", unreachable_once)
+    monkeypatch.setattr(server, "MONGO_SETUP_RETRY_SECONDS", 0)
+    client.portal.call(server.run_status_migrations, datetime.now(timezone.utc))
+
+    async def marker():
+        return await server.db.migrations.find_one({"_id": "status_checks_bson_timestamps"})
+
+    assert len(calls) >= 2
+    assert client.portal.call(marker) is not None
+    assert len(client.get("/api/status", params={"since": "2025-06-01T00:00:00+00:00"}).json()) == 2
+
+
+def test_late_setup_runs_the_migrations(client, server, monkeypatch):
+    insert_legacy_checks(client, server, 2)
+    monkeypatch.setattr(server, "mongo_setup_done", True)  # e.g. finished by a readiness probe
+    client.portal.call(server.retry_mongo_setup, datetime.now(timezone.utc))
+    assert len(client.get("/api/status", params={"since": "2025-06-01T00:00:00+00:00"}).json()) == 2
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+
+class Request:
+    """Just enough of a Starlette request for the event stream"""
+
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+def test_new_checks_are_pushed_to_subscribers(client, server):
+    async def listen():
+        request = Request()
+        stream = server.status_event_stream(request)
+        assert await stream.__anext__() == "retry: 5000\n\n"
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)  # subscribed and waiting
+        await server.create_status_check(server.StatusCheckCreate(client_name="pushed"))
+        event = await asyncio.wait_for(pending, 1)
+        request.disconnected = True
+        await stream.aclose()
+        return event
+
+    event = client.portal.call(listen)
+    lines = event.strip().split("\n")
+    assert lines[1] == "event: status"
+    check = json.loads(lines[2].removeprefix("data: "))
+    assert lines[0] == f"id: {check['id']}"
+    assert check["client_name"] == "pushed"
+    assert not server.status_broadcaster.subscribers
+
+
+def test_idle_stream_sends_keepalives(client, server, monkeypatch):
+    monkeypatch.setattr(server, "STATUS_STREAM_KEEPALIVE", 0.01)
+
+    async def listen():
+        stream = server.status_event_stream(Request())
+        await stream.__anext__()
+        event = await stream.__anext__()
+        await stream.aclose()
+        return event
+
+    assert client.portal.call(listen) == ": keepalive\n\n"
+
+
+def test_slow_subscriber_gets_one_resync(server):
+    broadcaster = server.StatusBroadcaster(queue_size=2)
+
+    async def publish():
+        queue = broadcaster.subscribe()
+        docs = [{"id": str(i), "client_name": "a", "timestamp": "2026-01-01T00:00:00+00:00"} for i in range(5)]
+        broadcaster.publish(docs)
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    # The backlog is dropped rather than left to grow
+    assert asyncio.run(publish()) == [broadcaster.RESYNC_EVENT]
+
+
+
+def test_reopened_change_stream_drops_cached_reads_first(server, monkeypatch):
+    monkeypatch.setattr(server.status_broadcaster, "local_publish", True)
+    seen = []
+
+    class Stream:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            seen.append(dict(server.read_cache.generations))
+            # Standalone mongod: the watcher falls back to local publishing and returns
+            raise server.OperationFailure("no change streams")
+
+    monkeypatch.setattr(type(server.db.status_checks), "watch", lambda self, pipeline: Stream(), raising=False)
+    asyncio.run(server.watch_status_changes())
+    assert seen == [{"status": 1, "rollup": 1}]
+    assert server.status_broadcaster.local_publish
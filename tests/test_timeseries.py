@@ -0,0 +1,63 @@
+import pytest
+
+
+def test_large_counter_keeps_exact_min_max_and_avg(server):
+    ring = server.RollupRing(60, 4)
+    for value in (8000000255.0, 8000000256.0, 8000000257.0):
+        ring.add(120.0, value)
+    points = ring.query(0, 180)
+    assert points["min"].tolist() == [8000000255.0]
+    assert points["max"].tolist() == [8000000257.0]
+    assert points["avg"].tolist() == [8000000256.0]
+
+
+def test_late_samples_are_dropped_and_the_ring_wraps(server):
+    ring = server.RollupRing(10, 3)
+    for t in (0, 10, 20, 30, 40):
+        ring.add(t, t)
+    ring.add(5, 999.0)  # Bucket 0 has already been overwritten
+    ring.add(35, 1.0)  # Bucket 3 is closed
+    assert (ring.size, ring.oldest()) == (3, 20.0)
+    points = ring.query(0, 100)
+    assert points["t"].tolist() == [20, 30, 40]
+    assert points["min"].tolist() == [20.0, 30.0, 40.0]
+
+
+def test_store_refuses_series_past_max_series(server):
+    store = server.TimeSeriesStore([(1, 10)], max_series=1)
+    store.add_fields("sensors", {"cpu": {"temp": 40.5}, "ok": True, "label": "x", "fan": 3}, 100.0)
+    assert list(store.series) == ["sensors.cpu.temp"]
+    assert store.dropped == 1
+
+
+@pytest.fixture
+def store(server, monkeypatch):
+    store = server.TimeSeriesStore([(1, 60), (60, 60)], max_series=8)
+    for t in range(1000, 1120):
+        store.add("metrics.load", float(t), float(t % 60))
+    monkeypatch.setattr(server, "timeseries_store", store)
+    return store
+
+
+def test_query_picks_the_finest_level_that_fits(client, store):
+    fine = client.get("/api/timeseries/metrics.load", params={"since": 1100, "until": 1110}).json()
+    assert fine["resolution"] == 1
+    assert fine["t"] == list(range(1100, 1111))
+    coarse = client.get("/api/timeseries/metrics.load", params={"since": 1000, "until": 1119}).json()
+    assert coarse["resolution"] == 60  # The 1 s ring no longer reaches back to 1000
+    assert coarse["t"] == [960, 1020, 1080]
+
+
+def test_query_truncates_to_the_newest_points(client, store):
+    body = client.get("/api/timeseries/metrics.load", params={"since": 1100, "until": 1119, "resolution": 1, "max_points": 5}).json()
+    assert body["truncated"] is True
+    assert body["t"] == [1115, 1116, 1117, 1118, 1119]
+    assert body["avg"] == [35.0, 36.0, 37.0, 38.0, 39.0]
+
+
+def test_query_errors(client, store):
+    assert client.get("/api/timeseries/nope").status_code == 404
+    assert client.get("/api/timeseries/metrics.load", params={"resolution": 5}).status_code == 400
+    assert client.get("/api/timeseries/metrics.load", params={"since": 2, "until": 1}).status_code == 400
+    listed = client.get("/api/timeseries").json()["series"]
+    assert [entry["name"] for entry in listed] == ["metrics.load"]
@@ -0,0 +1,77 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+visual_diff = pytest.importorskip("visual_diff")
+
+
+def save(path, array):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(array.astype(np.uint8)).save(path)
+    return path
+
+
+def blank(height=40, width=60, value=255):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+def test_identical_files_skip_decoding(tmp_path):
+    a = save(tmp_path / "a.png", blank())
+    entry = visual_diff.diff_pair("k", str(a), str(a), None)
+    assert (entry["changed_pixels"], entry["ssim"], entry["bbox"]) == (0, 1.0, None)
+
+
+def test_changed_region_is_boxed_and_masked(tmp_path):
+    changed = blank()
+    changed[10:20, 30:35] = 0
+    a, b = save(tmp_path / "a.png", blank()), save(tmp_path / "b.png", changed)
+    mask = tmp_path / "masks" / "k.png"
+    entry = visual_diff.diff_pair("k", str(a), str(b), str(mask))
+    assert entry["changed_pixels"] == 50
+    assert entry["bbox"] == [30, 10, 35, 20]
+    assert entry["ssim"] < 1.0
+    assert entry["mask"] == str(mask)
+    assert Image.open(mask).size == (60, 40)
+
+
+def test_small_color_noise_stays_under_the_threshold(tmp_path):
+    noisy = blank().astype(np.int16)
+    noisy[..., 2] -= 3  # a little chroma shift everywhere
+    a, b = save(tmp_path / "a.png", blank()), save(tmp_path / "b.png", noisy)
+    assert visual_diff.diff_pair("k", str(a), str(b), None)["changed_pixels"] == 0
+
+
+def test_pairs_of_different_size_are_padded(tmp_path):
+    a, b = save(tmp_path / "a.png", blank(40, 60)), save(tmp_path / "b.png", blank(50, 60))
+    entry = visual_diff.diff_pair("k", str(a), str(b), None)
+    assert entry["resized"] is True
+    assert entry["bbox"] == [0, 40, 60, 50]
+
+
+def test_ssim_matches_for_equal_images():
+    image = np.random.default_rng(1).integers(0, 255, (32, 32, 3)).astype(np.float32)
+    assert visual_diff.ssim(image, image) == pytest.approx(1.0)
+    assert visual_diff.ssim(image, 255 - image) < 0.5
+
+
+def test_report_ranks_the_worst_change_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(visual_diff, "OUTPUT_DIR", tmp_path)
+    base, cand = tmp_path / "base", tmp_path / "cand"
+    small, large = blank(), blank()
+    small[0:2, 0:2] = 0
+    large[0:20, 0:20] = 0
+    for name, candidate in (("same.png", blank()), ("small.png", small), ("large.png", large)):
+        save(base / "desktop_dark" / name, blank())
+        save(cand / "desktop_dark" / name, candidate)
+    save(base / "desktop_dark" / "gone.png", blank())
+    save(cand / "desktop_dark" / "new.png", blank())
+
+    report = visual_diff.run_diff(base, cand, tmp_path / "masks", workers=1, folders=["desktop_dark"])
+    assert [entry["key"] for entry in report["ranked"]] == [
+        "desktop_dark/large.png", "desktop_dark/small.png", "desktop_dark/same.png",
+    ]
+    assert report["total_changed"] == 2
+    assert report["total_regressions"] == 1  # 4 of 2400 pixels is under FAIL_OVER
+    assert report["missing"] == ["desktop_dark/gone.png"]
+    assert report["added"] == ["desktop_dark/new.png"]
+    assert (tmp_path / "VISUAL_DIFF_REPORT.json").exists()